@@ -0,0 +1,206 @@
+"""
+Pluggable cache for explanations and recommendation results.
+
+CACHE_BACKEND selects the store:
+  local (default)  in-process LRU; each uvicorn worker has its own copy
+  redis            shared across workers via CACHE_URL (redis://host:6379/0);
+                   any server speaking the Redis protocol works, and tests
+                   run it against fakeredis
+
+Values are strings; callers JSON-encode. Batch reads and writes go out in
+one round trip (MGET / a non-transactional pipeline). Keys embed a dataset
+version stored in the backend itself, so `bump_version()` after a data load
+invalidates every worker's entries at once without scanning or deleting
+keys; stale entries age out, and the local backend drops its own at once.
+Per-user versions do the same for a single user's results when new
+interactions arrive. They expire after CACHE_USER_VERSION_TTL of inactivity,
+which must outlast any entry keyed on them (RESULT_CACHE_TTL).
+"""
+from collections import OrderedDict
+from typing import Dict, List, Optional, Sequence
+import hashlib
+import json
+import os
+import threading
+import time
+
+BACKEND = os.getenv("CACHE_BACKEND", "local").lower()  # local | redis
+CACHE_URL = os.getenv("CACHE_URL", "redis://localhost:6379/0")
+PREFIX = os.getenv("CACHE_PREFIX", "recs")
+MAX_ENTRIES = int(os.getenv("CACHE_MAX_ENTRIES", "10000"))
+# how long a worker trusts its copy of the dataset version before re-reading it
+VERSION_CHECK_SECONDS = float(os.getenv("CACHE_VERSION_CHECK_SECONDS", "1"))
+USER_VERSION_TTL = float(os.getenv("CACHE_USER_VERSION_TTL", "3600"))
+
+
+class Cache:
+    """Backend interface plus versioned key helpers shared by all backends."""
+
+    def __init__(self):
+        self._version: Optional[int] = None
+        self._version_read_at = 0.0
+
+    def get(self, key: str) -> Optional[str]:
+        raise NotImplementedError
+
+    def set(self, key: str, value: str, ttl: Optional[float] = None) -> None:
+        raise NotImplementedError
+
+    def get_many(self, keys: Sequence[str]) -> List[Optional[str]]:
+        raise NotImplementedError
+
+    def set_many(self, items: Dict[str, str], ttl: Optional[float] = None) -> None:
+        raise NotImplementedError
+
+    def incr(self, key: str) -> int:
+        raise NotImplementedError
+
+    def clear(self) -> None:
+        raise NotImplementedError
+
+    # -- versioning ----------------------------------------------------------
+
+    def version(self) -> int:
+        now = time.monotonic()
+        if self._version is None or now - self._version_read_at >= VERSION_CHECK_SECONDS:
+            self._version = int(self.get(f"{PREFIX}:version") or 0)
+            self._version_read_at = now
+        return self._version
+
+    def bump_version(self) -> int:
+        """Invalidate everything keyed under the current dataset version."""
+        self._version = self.incr(f"{PREFIX}:version")
+        self._version_read_at = time.monotonic()
+        return self._version
+
+    def user_version(self, user_id: int) -> int:
+        return int(self.get(f"{PREFIX}:v{self.version()}:user:{user_id}") or 0)
+
+    def bump_user(self, user_id: int, ttl: Optional[float] = None) -> None:
+        # a fresh stamp rather than INCR: once the key expires and comes back,
+        # it can never repeat a value that older entries were keyed on
+        self.set(f"{PREFIX}:v{self.version()}:user:{user_id}", str(time.time_ns()), ttl or USER_VERSION_TTL)
+
+    def key(self, kind: str, *parts) -> str:
+        digest = hashlib.sha1(json.dumps(parts, sort_keys=True, default=str).encode()).hexdigest()
+        return f"{PREFIX}:v{self.version()}:{kind}:{digest}"
+
+
+class LocalCache(Cache):
+    def __init__(self, max_entries: int = MAX_ENTRIES):
+        super().__init__()
+        self.max_entries = max_entries
+        self._data: "OrderedDict[str, tuple]" = OrderedDict()
+        # the dataset version lives outside the LRU so eviction cannot reset it
+        self._counters: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def _get(self, key: str, now: float) -> Optional[str]:
+        if key in self._counters:
+            return str(self._counters[key])
+        entry = self._data.get(key)
+        if entry is None:
+            return None
+        value, expires = entry
+        if expires is not None and expires <= now:
+            del self._data[key]
+            return None
+        self._data.move_to_end(key)
+        return value
+
+    def _set(self, key: str, value: str, ttl: Optional[float], now: float) -> None:
+        self._data[key] = (value, now + ttl if ttl else None)
+        self._data.move_to_end(key)
+        while len(self._data) > self.max_entries:
+            self._data.popitem(last=False)
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            return self._get(key, time.monotonic())
+
+    def set(self, key: str, value: str, ttl: Optional[float] = None) -> None:
+        with self._lock:
+            self._set(key, value, ttl, time.monotonic())
+
+    def get_many(self, keys: Sequence[str]) -> List[Optional[str]]:
+        now = time.monotonic()
+        with self._lock:
+            return [self._get(k, now) for k in keys]
+
+    def set_many(self, items: Dict[str, str], ttl: Optional[float] = None) -> None:
+        now = time.monotonic()
+        with self._lock:
+            for k, v in items.items():
+                self._set(k, v, ttl, now)
+
+    def incr(self, key: str) -> int:
+        with self._lock:
+            value = self._counters.get(key, 0) + 1
+            self._counters[key] = value
+            return value
+
+    def bump_version(self) -> int:
+        version = super().bump_version()
+        with self._lock:
+            self._data.clear()  # every key embeds an older version
+        return version
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+            self._counters.clear()
+        self._version = None
+
+
+class RedisCache(Cache):
+    def __init__(self, url: str = CACHE_URL, client=None):
+        super().__init__()
+        if client is None:
+            import redis  # optional dependency, only needed for CACHE_BACKEND=redis
+            client = redis.Redis.from_url(url, decode_responses=True)
+        self.client = client
+
+    def get(self, key: str) -> Optional[str]:
+        return self.client.get(key)
+
+    def set(self, key: str, value: str, ttl: Optional[float] = None) -> None:
+        self.client.set(key, value, px=int(ttl * 1000) if ttl else None)
+
+    def get_many(self, keys: Sequence[str]) -> List[Optional[str]]:
+        return list(self.client.mget(keys)) if keys else []
+
+    def set_many(self, items: Dict[str, str], ttl: Optional[float] = None) -> None:
+        if not items:
+            return
+        pipe = self.client.pipeline(transaction=False)
+        for k, v in items.items():
+            pipe.set(k, v, px=int(ttl * 1000) if ttl else None)
+        pipe.execute()
+
+    def incr(self, key: str) -> int:
+        return int(self.client.incr(key))
+
+    def clear(self) -> None:
+        keys = list(self.client.scan_iter(match=f"{PREFIX}:*"))
+        if keys:
+            self.client.delete(*keys)
+        self._version = None
+
+
+_CACHE: Optional[Cache] = None
+_cache_lock = threading.Lock()
+
+
+def get_cache() -> Cache:
+    global _CACHE
+    with _cache_lock:
+        if _CACHE is None:
+            _CACHE = RedisCache() if BACKEND == "redis" else LocalCache()
+        return _CACHE
+
+
+def set_cache(cache: Optional[Cache]) -> None:
+    """Swap the process-wide cache (tests, or wiring a pre-built client)."""
+    global _CACHE
+    with _cache_lock:
+        _CACHE = cache
@@ -0,0 +1,121 @@
+"""
+Interaction log compaction.
+
+Raw interactions older than a cutoff are rolled into InteractionAggregate rows
+(count, first/last timestamp and a decayed count per user, product and event)
+and removed from the hot table, after being archived to zstd-compressed
+Parquet files (one per batch, named by id range so a rerun after a failure
+overwrites rather than duplicates). Profiles, seen-sets, /active-users and the
+stats row all read aggregates alongside raw rows, so compaction changes no
+results while keeping per-user and per-table query cost bounded.
+
+Run it with scripts/compact_interactions.py.
+"""
+from typing import Dict, List, Optional, Tuple
+from datetime import datetime
+import os
+
+from sqlmodel import Session, select, delete
+
+from .models import Interaction, InteractionAggregate
+from ..recs.profiles import decay
+
+ARCHIVE_DIR = os.getenv("INTERACTION_ARCHIVE_DIR", "archive")
+RETENTION_DAYS = float(os.getenv("INTERACTION_RETENTION_DAYS", "90"))
+
+AggKey = Tuple[int, int, str]
+
+
+def _write_parquet(path: str, rows: List[tuple]) -> None:
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError as e:
+        raise RuntimeError("archiving needs pyarrow (pip install pyarrow), or run without an archive") from e
+    columns = list(zip(*rows))
+    table = pa.table({
+        "id": pa.array(columns[0], pa.int64()),
+        "user_id": pa.array(columns[1], pa.int64()),
+        "product_id": pa.array(columns[2], pa.int64()),
+        "event": pa.array(columns[3], pa.string()),
+        "timestamp": pa.array(columns[4], pa.timestamp("us")),
+    })
+    tmp = path + ".tmp"
+    pq.write_table(table, tmp, compression="zstd")
+    os.replace(tmp, path)
+
+
+def _merge(agg: InteractionAggregate, count: int, decayed: float, first: datetime, last: datetime) -> None:
+    """Fold a batch's (count, decayed count as of `last`) into an aggregate row."""
+    new_last = max(agg.last_timestamp, last)
+    agg.decayed_count = decay(agg.decayed_count, agg.last_timestamp, new_last) + decay(decayed, last, new_last)
+    agg.count += count
+    agg.first_timestamp = min(agg.first_timestamp, first)
+    agg.last_timestamp = new_last
+
+
+def compact_interactions(
+    session: Session,
+    before: datetime,
+    archive_dir: Optional[str] = ARCHIVE_DIR,
+    batch_size: int = 50000,
+) -> Dict[str, int]:
+    """Compact raw interactions with timestamp < `before`; commits per batch.
+
+    Pass archive_dir=None to drop raw rows without archiving them.
+    """
+    if archive_dir:
+        os.makedirs(archive_dir, exist_ok=True)
+    totals = {"compacted": 0, "aggregates": 0, "batches": 0}
+    last_id = 0
+    while True:
+        rows = session.exec(
+            select(Interaction.id, Interaction.user_id, Interaction.product_id, Interaction.event, Interaction.timestamp)
+            .where(Interaction.timestamp < before, Interaction.id > last_id)
+            .order_by(Interaction.id)
+            .limit(batch_size)
+        ).all()
+        if not rows:
+            break
+        prev_id, last_id = last_id, rows[-1][0]
+        if archive_dir:
+            _write_parquet(os.path.join(archive_dir, f"interactions_{rows[0][0]:012d}_{last_id:012d}.parquet"), rows)
+
+        # per key: [count, decayed count as of last, first, last]; rows are
+        # in id order, not time order, so decay forward/backward as needed
+        batch: Dict[AggKey, list] = {}
+        for _, user_id, product_id, event, ts in rows:
+            acc = batch.get((user_id, product_id, event))
+            if acc is None:
+                batch[(user_id, product_id, event)] = [1, 1.0, ts, ts]
+            elif ts >= acc[3]:
+                acc[0], acc[1], acc[3] = acc[0] + 1, decay(acc[1], acc[3], ts) + 1.0, ts
+                acc[2] = min(acc[2], ts)
+            else:
+                acc[0], acc[1], acc[2] = acc[0] + 1, acc[1] + decay(1.0, ts, acc[3]), min(acc[2], ts)
+
+        existing = {}
+        user_ids = sorted({key[0] for key in batch})
+        for i in range(0, len(user_ids), 500):
+            for agg in session.exec(select(InteractionAggregate).where(InteractionAggregate.user_id.in_(user_ids[i:i + 500]))):
+                existing[(agg.user_id, agg.product_id, agg.event)] = agg
+        for key, (count, decayed, first, last) in batch.items():
+            agg = existing.get(key)
+            if agg is None:
+                session.add(InteractionAggregate(
+                    user_id=key[0], product_id=key[1], event=key[2],
+                    count=count, decayed_count=decayed, first_timestamp=first, last_timestamp=last,
+                ))
+                totals["aggregates"] += 1
+            else:
+                _merge(agg, count, decayed, first, last)
+                session.add(agg)
+
+        # same predicate as the batch select, as a range instead of a huge IN list
+        session.exec(delete(Interaction).where(
+            Interaction.timestamp < before, Interaction.id > prev_id, Interaction.id <= last_id
+        ))
+        session.commit()
+        totals["compacted"] += len(rows)
+        totals["batches"] += 1
+    return totals
@@ -1,26 +1,135 @@
 from sqlmodel import SQLModel, create_engine, Session
+from sqlalchemy import event
+from fastapi import Request, Response
 from .models import Product, User, Interaction
-from typing import Iterator
+from ..metrics import instrument_engine
+from typing import Dict, Iterator, Optional
+import itertools
+import math
 import os
+import time
 
 DB_URL = os.getenv("DATABASE_URL", "sqlite:///./recs.db")
+# Optional comma-separated read replicas for read-only handlers.
+READ_URLS = [u.strip() for u in os.getenv("DATABASE_READ_URL", "").split(",") if u.strip()]
+# After a write the client reads from the primary for this long (read-your-writes).
+READ_STICKY_SECONDS = float(os.getenv("DB_READ_STICKY_SECONDS", "5"))
+STICKY_COOKIE = "recs_primary_until"
 
-connect_args = {}
-if DB_URL.startswith("sqlite"):
-    connect_args = {"check_same_thread": False}
+# Pool sizing for server databases (ignored for in-memory SQLite).
+POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))  # seconds, -1 disables
+# auto: ping network databases on checkout, skip it for local SQLite files
+POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "auto").lower()
 
-engine = create_engine(
-    DB_URL, 
-    echo=False,
-    connect_args=connect_args,
-    pool_pre_ping=True  # verify connections before use
-)
+# Applied to every new SQLite connection. WAL lets readers run while a writer
+# is active; synchronous=NORMAL is durable across app crashes in WAL mode.
+SQLITE_PRAGMAS: Dict[str, str] = {
+    "journal_mode": os.getenv("SQLITE_JOURNAL_MODE", "WAL"),
+    "synchronous": os.getenv("SQLITE_SYNCHRONOUS", "NORMAL"),
+    "mmap_size": os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024)),
+    "cache_size": os.getenv("SQLITE_CACHE_SIZE", "-65536"),  # negative = KiB
+    "busy_timeout": os.getenv("SQLITE_BUSY_TIMEOUT", "5000"),  # ms
+}
+
+
+def _is_memory_sqlite(url: str) -> bool:
+    return url.startswith("sqlite") and (":memory:" in url or url.rstrip("/") in ("sqlite:", "sqlite:/"))
+
+
+def _pre_ping(url: str) -> bool:
+    if POOL_PRE_PING in ("1", "true", "yes", "on", "always"):
+        return True
+    if POOL_PRE_PING in ("0", "false", "no", "off", "never"):
+        return False
+    return not url.startswith("sqlite")
+
+
+def _install_sqlite_pragmas(db_engine, pragmas: Dict[str, str]) -> None:
+    @event.listens_for(db_engine, "connect")
+    def _set_pragmas(dbapi_conn, _record):
+        cursor = dbapi_conn.cursor()
+        try:
+            for name, value in pragmas.items():
+                if value != "":
+                    cursor.execute(f"PRAGMA {name}={value}")
+        finally:
+            cursor.close()
+
+
+def build_engine(url: str, sqlite_pragmas: Optional[Dict[str, str]] = None):
+    """Create an engine for `url` with the configured pool and SQLite tuning.
+
+    `sqlite_pragmas` overrides SQLITE_PRAGMAS; pass {} to keep SQLite defaults.
+    """
+    kwargs = {"echo": False, "pool_pre_ping": _pre_ping(url)}
+    if url.startswith("sqlite"):
+        kwargs["connect_args"] = {"check_same_thread": False}
+    if not _is_memory_sqlite(url):
+        kwargs.update(
+            pool_size=POOL_SIZE,
+            max_overflow=MAX_OVERFLOW,
+            pool_timeout=POOL_TIMEOUT,
+            pool_recycle=POOL_RECYCLE,
+        )
+    db_engine = create_engine(url, **kwargs)
+
+    if url.startswith("sqlite"):
+        pragmas = dict(SQLITE_PRAGMAS if sqlite_pragmas is None else sqlite_pragmas)
+        if _is_memory_sqlite(url):
+            pragmas.pop("journal_mode", None)  # WAL needs a file
+        if pragmas:
+            _install_sqlite_pragmas(db_engine, pragmas)
+    instrument_engine(db_engine)
+    return db_engine
+
+
+engine = build_engine(DB_URL)
+read_engines = [build_engine(url) for url in READ_URLS]
+_read_cycle = itertools.count()
 
 
 def init_db() -> None:
+    # replicas get their schema from the primary
     SQLModel.metadata.create_all(engine)
 
 
 def get_session() -> Iterator[Session]:
     with Session(engine) as session:
         yield session
+
+
+def _sticky(request: Optional[Request]) -> bool:
+    if request is None:
+        return False
+    try:
+        return float(request.cookies.get(STICKY_COOKIE, 0)) > time.time()
+    except ValueError:
+        return False
+
+
+def read_engine(request: Optional[Request] = None):
+    """Pick a replica round-robin, or the primary when none is configured or the
+    client wrote recently."""
+    if not read_engines or _sticky(request):
+        return engine
+    return read_engines[next(_read_cycle) % len(read_engines)]
+
+
+def get_read_session(request: Request) -> Iterator[Session]:
+    """Session for read-only handlers; may be served by a replica."""
+    with Session(read_engine(request)) as session:
+        yield session
+
+
+def stick_to_primary(response: Response) -> None:
+    """Route this client's reads to the primary for READ_STICKY_SECONDS after a write."""
+    if read_engines and READ_STICKY_SECONDS > 0:
+        response.set_cookie(
+            STICKY_COOKIE,
+            str(time.time() + READ_STICKY_SECONDS),
+            max_age=math.ceil(READ_STICKY_SECONDS),
+            httponly=True,
+        )
@@ -20,10 +20,70 @@ class User(SQLModel, table=True):
 
 class Interaction(SQLModel, table=True):
     id: Optional[int] = Field(default=None, primary_key=True)
-    user_id: int = Field(foreign_key="user.id")
+    user_id: int = Field(foreign_key="user.id", index=True)
     product_id: int = Field(foreign_key="product.id")
     event: str  
-    timestamp: datetime = Field(default_factory=datetime.utcnow)
+    timestamp: datetime = Field(default_factory=datetime.utcnow, index=True)
 
     user: Optional[User] = Relationship(back_populates="interactions")
     product: Optional[Product] = Relationship(back_populates="interactions")
+
+class InteractionAggregate(SQLModel, table=True):
+    """Compacted history: raw interactions older than the compaction cutoff,
+    rolled up per (user, product, event).
+
+    `decayed_count` is the event count decayed to `last_timestamp` with the
+    profile half-life, so profiles built from aggregates match the raw events.
+    """
+    user_id: int = Field(foreign_key="user.id", primary_key=True)
+    product_id: int = Field(foreign_key="product.id", primary_key=True)
+    event: str = Field(primary_key=True)
+    count: int = 0
+    decayed_count: float = 0.0
+    first_timestamp: datetime = Field(default_factory=datetime.utcnow)
+    last_timestamp: datetime = Field(default_factory=datetime.utcnow, index=True)
+
+class DatasetStats(SQLModel, table=True):
+    """Single-row summary of the loaded dataset, maintained by loads and ingestion."""
+    id: Optional[int] = Field(default=1, primary_key=True)
+    source: str = "unknown"
+    description: str = ""
+    products: int = 0
+    users: int = 0
+    interactions: int = 0
+    updated_at: datetime = Field(default_factory=datetime.utcnow)
+
+class CatalogVersion(SQLModel, table=True):
+    """Single-row stamp bumped whenever products are (re)loaded; in-process
+    catalog caches compare against it to know when to refresh."""
+    id: Optional[int] = Field(default=1, primary_key=True)
+    version: int = 0
+    updated_at: datetime = Field(default_factory=datetime.utcnow)
+
+class Job(SQLModel, table=True):
+    """Background job (data loads and imports), persisted so any worker can
+    report on it. `done`/`total` count rows in the current `stage`."""
+    id: str = Field(primary_key=True)
+    kind: str
+    status: str = Field(default="queued", index=True)  # queued | running | succeeded | failed | cancelled
+    stage: str = ""
+    done: int = 0
+    total: Optional[int] = None
+    cancel_requested: bool = False
+    worker: str = ""
+    result: Optional[str] = None  # JSON
+    error: Optional[str] = None
+    created_at: datetime = Field(default_factory=datetime.utcnow, index=True)
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+
+class UserTagScore(SQLModel, table=True):
+    """Time-decayed tag affinity per user.
+
+    `score` is valid as of `updated_at`; applying a new event decays it forward
+    and adds the event weight, so updates never rescan history.
+    """
+    user_id: int = Field(foreign_key="user.id", primary_key=True)
+    tag: str = Field(primary_key=True)
+    score: float = 0.0
+    updated_at: datetime = Field(default_factory=datetime.utcnow)
@@ -0,0 +1,91 @@
+from typing import Optional
+from datetime import datetime
+from sqlalchemy.exc import IntegrityError
+from sqlmodel import Session, select, func, update
+from .models import Product, User, Interaction, InteractionAggregate, DatasetStats, CatalogVersion
+
+STATS_ID = 1
+
+# load-source name -> (source id reported by /data-info, description)
+DATA_SOURCES = {
+    "api": ("api_real_products", "Real products from DummyJSON/FakeStore APIs"),
+    "synthetic": ("synthetic_realistic", "Generated realistic e-commerce data"),
+    "sample": ("sample_data", "Built-in sample data"),
+    "csv": ("csv_import", "Imported from CSV files"),
+}
+
+
+def refresh_stats(session: Session, source: Optional[str] = None, commit: bool = True) -> DatasetStats:
+    """Recount the tables and store the result, tagging it with `source` when given.
+
+    Meant for bulk loads and imports; per-event ingestion uses record_interactions().
+    Also bumps the catalog version, since every caller has just rewritten products.
+    With commit=False the rows are only flushed into the caller's transaction.
+    """
+    stats = _count(session, session.get(DatasetStats, STATS_ID) or DatasetStats(id=STATS_ID), source)
+    session.add(stats)
+    _bump_catalog_version(session)
+    if commit:
+        session.commit()
+    else:
+        session.flush()
+    return stats
+
+
+def _bump_catalog_version(session: Session) -> None:
+    row = session.get(CatalogVersion, STATS_ID) or CatalogVersion(id=STATS_ID)
+    row.version += 1
+    row.updated_at = datetime.utcnow()
+    session.add(row)
+
+
+def catalog_version(session: Session) -> int:
+    row = session.get(CatalogVersion, STATS_ID, populate_existing=True)
+    return row.version if row is not None else 0
+
+
+def _count(session: Session, stats: DatasetStats, source: Optional[str]) -> DatasetStats:
+    stats.products = session.exec(select(func.count(Product.id))).one()
+    stats.users = session.exec(select(func.count(User.id))).one()
+    # compacted events still count: raw rows plus the events rolled into aggregates
+    stats.interactions = session.exec(select(func.count(Interaction.id))).one() + \
+        session.exec(select(func.coalesce(func.sum(InteractionAggregate.count), 0))).one()
+    if source is not None:
+        stats.source, stats.description = DATA_SOURCES.get(source, (source, "Custom or manually loaded data"))
+    elif not stats.description:
+        stats.source, stats.description = "custom", "Custom or manually loaded data"
+    if not stats.products:
+        stats.source, stats.description = "unknown", "No data loaded"
+    stats.updated_at = datetime.utcnow()
+    return stats
+
+
+def record_interactions(session: Session, count: int = 1) -> None:
+    """Bump the interaction counter in place; commits with the caller's transaction."""
+    session.exec(
+        update(DatasetStats)
+        .where(DatasetStats.id == STATS_ID)
+        .values(interactions=DatasetStats.interactions + count, updated_at=datetime.utcnow())
+    )
+
+
+def get_stats(session: Session, primary=None) -> DatasetStats:
+    """The stored stats row. A database populated before the row existed is
+    counted once and the row is stored through `primary`, the writable engine
+    (`session` may be on a read replica); without one every call recounts."""
+    stats = session.get(DatasetStats, STATS_ID)
+    if stats is not None:
+        return stats
+    if primary is None:
+        return _count(session, DatasetStats(id=STATS_ID), None)
+    with Session(primary, expire_on_commit=False) as write:
+        stats = write.get(DatasetStats, STATS_ID)
+        if stats is None:
+            stats = _count(write, DatasetStats(id=STATS_ID), None)
+            write.add(stats)
+            try:
+                write.commit()
+            except IntegrityError:  # another worker stored it first
+                write.rollback()
+                stats = write.get(DatasetStats, STATS_ID)
+        return stats
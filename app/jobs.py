@@ -0,0 +1,212 @@
+"""
+Background jobs for long-running data loads and imports.
+
+Endpoints that (re)load the dataset submit a job and return its id right
+away. The work runs on one background thread per process, so loads never
+race each other within a worker. Job state lives in the `job` table, so any
+worker can answer GET /jobs/{id}:
+
+    queued -> running -> succeeded (with `result`) | failed (with `error`) | cancelled
+
+A job function receives a `JobHandle` as its first argument. It reports
+progress with `handle.progress(stage, done, total)` and calls
+`handle.check_cancelled()` between batches. That raises `JobCancelled` once
+POST /jobs/{id}/cancel has been called; the load's transaction rolls back
+and the previous dataset stays in place.
+
+Progress is written to the table at most every JOB_PROGRESS_SECONDS. While
+a load holds the database's write lock (SQLite has a single writer), it
+reports with persist=False. Only the running worker's in-memory view, which
+GET /jobs/{id}/events streams, moves during that phase.
+"""
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+import json
+import logging
+import os
+import socket
+import threading
+import time
+import uuid
+
+from sqlalchemy.exc import OperationalError
+from sqlmodel import Session, select
+
+from .db.database import engine, init_db
+from .db.models import Job
+
+log = logging.getLogger(__name__)
+
+PROGRESS_SECONDS = float(os.getenv("JOB_PROGRESS_SECONDS", "1"))
+CANCEL_POLL_SECONDS = float(os.getenv("JOB_CANCEL_POLL_SECONDS", "1"))
+WORKER = f"{socket.gethostname()}:{os.getpid()}"
+TERMINAL = ("succeeded", "failed", "cancelled")
+
+
+class JobCancelled(Exception):
+    pass
+
+
+def job_dict(job: Job) -> dict:
+    data = job.model_dump()
+    data["result"] = json.loads(job.result) if job.result else None
+    return data
+
+
+class JobHandle:
+    """A running job's view of itself: progress reporting and cancellation checks."""
+
+    def __init__(self, runner: "JobRunner", job: Job):
+        self.id = job.id
+        self.state = job_dict(job)  # replaced, never mutated, so readers need no lock
+        self._runner = runner
+        self._cancel = threading.Event()
+        self._persisted_at = 0.0
+        self._cancel_checked_at = time.monotonic()
+
+    def progress(self, stage: str, done: int = 0, total: Optional[int] = None, persist: bool = True) -> None:
+        stage_changed = stage != self.state["stage"]
+        self.state = {**self.state, "stage": stage, "done": done, "total": total}
+        now = time.monotonic()
+        if persist and (stage_changed or now - self._persisted_at >= PROGRESS_SECONDS):
+            self._persisted_at = now
+            self._runner._save(self.id, stage=stage, done=done, total=total)
+
+    def cancelled(self) -> bool:
+        now = time.monotonic()
+        if not self._cancel.is_set() and now - self._cancel_checked_at >= CANCEL_POLL_SECONDS:
+            # a cancel sent to another worker only reaches us through the table
+            self._cancel_checked_at = now
+            if self._runner._cancel_requested(self.id):
+                self._cancel.set()
+        return self._cancel.is_set()
+
+    def check_cancelled(self) -> None:
+        if self.cancelled():
+            raise JobCancelled()
+
+
+class JobRunner:
+    def __init__(self, db_engine=engine):
+        self.engine = db_engine
+        self._live: Dict[str, JobHandle] = {}
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="jobs")
+
+    def _save(self, job_id: str, **fields) -> None:
+        with Session(self.engine) as session:
+            job = session.get(Job, job_id)
+            if job is not None:
+                for name, value in fields.items():
+                    setattr(job, name, value)
+                session.add(job)
+                session.commit()
+
+    def _cancel_requested(self, job_id: str) -> bool:
+        with Session(self.engine) as session:
+            return bool(session.exec(select(Job.cancel_requested).where(Job.id == job_id)).first())
+
+    def submit(self, kind: str, fn: Callable[..., dict], *args, **kwargs) -> dict:
+        job = Job(id=uuid.uuid4().hex, kind=kind, worker=WORKER)
+        with Session(self.engine) as session:
+            session.add(job)
+            session.commit()
+            session.refresh(job)
+        handle = JobHandle(self, job)
+        with self._lock:
+            self._live[job.id] = handle
+        self._executor.submit(self._run, handle, fn, args, kwargs)
+        return handle.state
+
+    def _update(self, handle: JobHandle, **fields) -> None:
+        handle.state = {**handle.state, **fields}
+        if "result" in fields:
+            fields["result"] = json.dumps(fields["result"], default=str)
+        self._save(handle.id, **fields)
+
+    def _run(self, handle: JobHandle, fn: Callable[..., dict], args, kwargs) -> None:
+        try:
+            try:
+                handle.check_cancelled()
+                self._update(handle, status="running", started_at=datetime.utcnow())
+                result = fn(handle, *args, **kwargs)
+                self._update(handle, status="succeeded", result=result, finished_at=datetime.utcnow())
+            except JobCancelled:
+                self._update(handle, status="cancelled", finished_at=datetime.utcnow())
+            except Exception as e:
+                log.exception("job %s (%s) failed", handle.id, handle.state["kind"])
+                self._update(handle, status="failed", error=str(e) or type(e).__name__, finished_at=datetime.utcnow())
+        except Exception:
+            # the final state could not be persisted; keep serving it from memory
+            log.exception("could not record the outcome of job %s", handle.id)
+            return
+        with self._lock:
+            self._live.pop(handle.id, None)
+
+    def get(self, job_id: str) -> Optional[dict]:
+        with self._lock:
+            handle = self._live.get(job_id)
+        if handle is not None:
+            return handle.state
+        with Session(self.engine) as session:
+            job = session.get(Job, job_id)
+            return job_dict(job) if job is not None else None
+
+    def list(self, limit: int = 50) -> List[dict]:
+        """Most recent jobs of every worker, newest first."""
+        with Session(self.engine) as session:
+            jobs = session.exec(select(Job).order_by(Job.created_at.desc()).limit(limit)).all()
+        with self._lock:
+            live = {job_id: handle.state for job_id, handle in self._live.items()}
+        return [live.get(job.id) or job_dict(job) for job in jobs]
+
+    def cancel(self, job_id: str) -> Optional[dict]:
+        """Ask a job to stop; a no-op once it has finished."""
+        state = self.get(job_id)
+        if state is None or state["status"] in TERMINAL:
+            return state
+        with self._lock:
+            handle = self._live.get(job_id)
+        if handle is not None:
+            # ours: no write needed, which matters while its load holds SQLite's write lock
+            handle._cancel.set()
+            handle.state = {**handle.state, "cancel_requested": True}
+        else:
+            self._save(job_id, cancel_requested=True)
+        return self.get(job_id)
+
+    def shutdown(self, wait: bool = False) -> None:
+        """Cancel this worker's jobs: running loads roll back, queued ones never start."""
+        with self._lock:
+            handles = list(self._live.values())
+        for handle in handles:
+            handle._cancel.set()
+        self._executor.shutdown(wait=wait, cancel_futures=True)
+        for handle in handles:
+            if handle.state["status"] == "queued":
+                try:
+                    self._update(handle, status="cancelled", finished_at=datetime.utcnow())
+                except OperationalError:
+                    log.warning("could not mark queued job %s cancelled", handle.id)
+
+
+_runner: Optional[JobRunner] = None
+_runner_lock = threading.Lock()
+
+
+def get_runner() -> JobRunner:
+    global _runner
+    with _runner_lock:
+        if _runner is None:
+            init_db()  # the job table must exist before the first submit
+            _runner = JobRunner()
+        return _runner
+
+
+def shutdown() -> None:
+    global _runner
+    with _runner_lock:
+        if _runner is not None:
+            _runner.shutdown()
+            _runner = None
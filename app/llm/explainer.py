@@ -1,14 +1,21 @@
-from typing import Optional
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterator, List, Optional, Sequence, Tuple, Union
 import os
 import asyncio
 import re
-
-PROMPT_TEMPLATE = (
-    "You are a helpful shopping assistant. Explain in 1-3 concise sentences why the product '{name}' is recommended to this user "
-    "based on their past behavior and interests provided below. Be specific: cite which past items (by name) or which tags caused the match, and mention the interaction type when relevant (viewed, added to cart, purchased).\n\nContext: {signals}\n\nExplanation:"
-)
+import weakref
+from ..metrics import span, cache_hit, cache_miss, llm_fallback
+from ..cache import get_cache
+from ..singleflight import SingleFlight
+from .signals import Signals
+from .prompt import PROMPT_TEMPLATE, build_prompt, record_prompt  # noqa: F401  (re-exported)
+from . import hf_worker
 
 BACKEND = os.getenv("LLM_BACKEND", "auto").lower()  # auto | openai | hf | none
+# seconds to keep LLM explanations in the shared cache (0 disables)
+EXPLANATION_CACHE_TTL = float(os.getenv("EXPLANATION_CACHE_TTL", "3600"))
+
 
 def _want_openai() -> bool:
     if BACKEND == "openai":
@@ -18,11 +25,42 @@ def _want_openai() -> bool:
     return bool(os.getenv("OPENAI_API_KEY"))
 
 
-async def _openai_explain(product_name: str, signals: str) -> str:
+_deterministic_only: ContextVar[bool] = ContextVar("deterministic_only", default=False)
+
+
+@contextmanager
+def deterministic() -> Iterator[None]:
+    """Explain with the deterministic explainer inside the block, whatever the
+    backend; warm-up uses it so a worker start never pays for an LLM call."""
+    token = _deterministic_only.set(True)
     try:
+        yield
+    finally:
+        _deterministic_only.reset(token)
+
+
+def _use_llm() -> bool:
+    return not _deterministic_only.get() and (_want_openai() or BACKEND == "hf")
+
+
+# one client (and connection pool) per event loop: constructing AsyncOpenAI
+# costs ~30ms of CPU, far more than a pooled request to a fast endpoint
+_openai_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, object]" = weakref.WeakKeyDictionary()
+
+
+def _openai_client():
+    loop = asyncio.get_running_loop()
+    client = _openai_clients.get(loop)
+    if client is None:
         from openai import AsyncOpenAI
-        client = AsyncOpenAI()
-        prompt = PROMPT_TEMPLATE.format(name=product_name, signals=signals)
+        client = _openai_clients[loop] = AsyncOpenAI()
+    return client
+
+
+async def _openai_explain(product_name: str, signals: Union[str, Signals], prompt: str) -> str:
+    try:
+        client = _openai_client()
+        record_prompt(product_name, prompt)
         resp = await client.chat.completions.create(
             model=os.getenv("OPENAI_MODEL", "gpt-4o-mini"),
             messages=[
@@ -34,16 +72,21 @@ async def _openai_explain(product_name: str, signals: str) -> str:
         )
         return resp.choices[0].message.content.strip()
     except Exception:
+        llm_fallback("openai")
         return _deterministic_explain(product_name, signals)
 
 
 _HF_PIPELINE = None
+HF_GENERATE_KWARGS = {"max_new_tokens": 80, "do_sample": True, "temperature": 0.7, "num_return_sequences": 1}
 
 def _get_hf_pipeline():
     global _HF_PIPELINE
     if _HF_PIPELINE is not None:
+        cache_hit("hf_pipeline")
         return _HF_PIPELINE
+    cache_miss("hf_pipeline")
     try:
+        hf_worker.set_torch_threads(hf_worker.TORCH_THREADS)
         from transformers import pipeline
         model_id = os.getenv("HF_MODEL", "google/flan-t5-small")
         cache_dir = os.getenv("HF_CACHE_DIR")
@@ -61,40 +104,98 @@ def _get_hf_pipeline():
         return None
 
 
-async def _hf_explain(product_name: str, signals: str) -> str:
+def _hf_fallback(product_name: str, signals: Union[str, Signals]) -> str:
+    llm_fallback("hf")
+    return _deterministic_explain(product_name, signals)
+
+
+async def _hf_explain(product_name: str, signals: Union[str, Signals], prompt: str) -> str:
+    if hf_worker.WORKER_MODE == "process":
+        try:
+            text = await hf_worker.get_pool().generate(prompt, **HF_GENERATE_KWARGS)
+            record_prompt(product_name, prompt)
+        except hf_worker.QueueFull:  # rejected before reaching a worker
+            text = ""
+        except Exception:  # worker failure
+            record_prompt(product_name, prompt)
+            text = ""
+        return text or _hf_fallback(product_name, signals)
+
     pipe = _get_hf_pipeline()
-    if pipe is None: # fallback deterministic
-        return _deterministic_explain(product_name, signals)
-    prompt = PROMPT_TEMPLATE.format(name=product_name, signals=signals)
+    if pipe is None:
+        return _hf_fallback(product_name, signals)
+    record_prompt(product_name, prompt)
 
     def _run():
-        out = pipe(
-            prompt,
-            max_new_tokens=80,
-            do_sample=True,
-            temperature=0.7,
-            num_return_sequences=1,
-        )
-    text = out[0].get("generated_text", "").strip()
-    return text or _deterministic_explain(product_name, signals)
+        out = pipe(prompt, **HF_GENERATE_KWARGS)
+        text = out[0].get("generated_text", "").strip()
+        return text or _hf_fallback(product_name, signals)
 
     return await asyncio.to_thread(_run)
 
 
-async def explain(product_name: str, signals: str) -> str:
+_flight = SingleFlight("explain")
+
+
+async def explain(product_name: str, signals: Union[str, Signals], prompt: Optional[str] = None) -> str:
+    """Explain one product; `prompt` is build_prompt's output when the caller already has it."""
+    if not _use_llm():
+        with span("llm.deterministic"):
+            return _deterministic_explain(product_name, signals)
+    prompt = prompt if prompt is not None else build_prompt(product_name, signals)
+    # identical concurrent prompts share one LLM call
+    return await _flight.do(prompt, lambda: _llm_explain(product_name, signals, prompt))
+
+
+async def _llm_explain(product_name: str, signals: Union[str, Signals], prompt: str) -> str:
     if _want_openai():
-        return await _openai_explain(product_name, signals)
-    if BACKEND == "hf":
-        return await _hf_explain(product_name, signals)
-    return _deterministic_explain(product_name, signals)
+        with span("llm.openai"):
+            return await _openai_explain(product_name, signals, prompt)
+    with span("llm.hf"):
+        return await _hf_explain(product_name, signals, prompt)
+
 
+async def explain_many(items: Sequence[Tuple[str, Union[str, Signals]]]) -> List[str]:
+    """Explain several products, serving LLM output from the cache where possible.
 
-def _deterministic_explain(product_name: str, signals: str) -> str:
-    """Create a short deterministic explanation from the provided signal string.
+    Cached explanations are fetched in one batch read and new ones written in
+    one batch write. The deterministic explainer is cheaper than a cache
+    lookup, so it is never cached, and neither are LLM calls that fell back
+    to it.
+    """
+    if EXPLANATION_CACHE_TTL <= 0 or not _use_llm():
+        return list(await asyncio.gather(*(explain(name, sig) for name, sig in items)))
+
+    cache = get_cache()
+    model = os.getenv("OPENAI_MODEL", "gpt-4o-mini") if _want_openai() else os.getenv("HF_MODEL", "google/flan-t5-small")
+    prompts = [build_prompt(name, sig) for name, sig in items]
+    keys = [cache.key("explain", model, prompt) for prompt in prompts]
+    texts = cache.get_many(keys)
+    missing = [i for i, text in enumerate(texts) if text is None]
+    for _ in range(len(items) - len(missing)):
+        cache_hit("explanations")
+    for _ in missing:
+        cache_miss("explanations")
+
+    fresh = await asyncio.gather(*(explain(*items[i], prompts[i]) for i in missing))
+    to_store = {}
+    for i, text in zip(missing, fresh):
+        texts[i] = text
+        if text != _deterministic_explain(*items[i]):
+            to_store[keys[i]] = text
+    cache.set_many(to_store, EXPLANATION_CACHE_TTL)
+    return texts
+
+
+def _deterministic_explain(product_name: str, signals: Union[str, Signals]) -> str:
+    """Create a short deterministic explanation from the provided signals.
 
     This uses simple heuristics to surface recent purchases/add_to_cart, shared tags,
     and product popularity hints so the explanation is informative even without an LLM.
+    Structured signals are read directly; plain strings are parsed with regexes.
     """
+    if isinstance(signals, Signals):
+        return _explain_from_signals(product_name, signals)
     if not signals:
         return f"{product_name}: Recommended because it matches your interests and past activity."
 
@@ -124,3 +225,25 @@ def _deterministic_explain(product_name: str, signals: str) -> str:
 
     text = " ".join(parts)
     return f"{product_name}: {text}"
+
+
+def _explain_from_signals(product_name: str, signals: Signals) -> str:
+    parts = []
+    if signals.cited:
+        first = signals.cited[0]
+        parts.append(f"You recently purchased or added to cart {first.name} ({first.event}).")
+    if signals.overlaps:
+        first = signals.overlaps[0]
+        parts.append(f"This item shares tags {', '.join(first.common_tags)} with {first.recent_name} ({first.event}).")
+
+    if not parts:
+        summary = signals.to_text()
+        if not summary:
+            return f"{product_name}: Recommended because it matches your interests and past activity."
+        if len(summary) > 200:
+            summary = summary[:197] + "..."
+        parts.append(f"Based on: {summary}")
+
+    if signals.popularity is not None:
+        parts.append(f"It also has popularity score {signals.popularity}.")
+    return f"{product_name}: {' '.join(parts)}"
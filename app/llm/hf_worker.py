@@ -0,0 +1,111 @@
+"""
+Process-pool offload for HuggingFace generation (HF_WORKER_MODE=process).
+
+Generation in a thread shares the GIL and torch's intra-op threads with the
+uvicorn event loop. In process mode each of HF_WORKERS spawned workers loads
+the HF_MODEL pipeline once, pins torch to HF_TORCH_THREADS threads and serves
+prompts. At most HF_QUEUE_SIZE prompts may be queued or running; beyond that
+`generate` raises QueueFull and the caller falls back to the deterministic
+explainer instead of stacking latency.
+"""
+from typing import Optional
+import asyncio
+import os
+import threading
+
+WORKER_MODE = os.getenv("HF_WORKER_MODE", "thread").lower()  # thread | process
+WORKERS = int(os.getenv("HF_WORKERS", "1"))
+TORCH_THREADS = int(os.getenv("HF_TORCH_THREADS", "0"))  # 0 leaves torch's default
+QUEUE_SIZE = int(os.getenv("HF_QUEUE_SIZE", "32"))
+
+
+class QueueFull(Exception):
+    pass
+
+
+def set_torch_threads(n: int) -> None:
+    if n <= 0:
+        return
+    try:
+        import torch
+        torch.set_num_threads(n)
+        torch.set_num_interop_threads(1)
+    except Exception:  # torch missing, or interop threads already fixed
+        pass
+
+
+def _init_worker(torch_threads: int) -> None:
+    if torch_threads > 0:
+        # must be set before torch initialises its thread pools
+        os.environ["OMP_NUM_THREADS"] = str(torch_threads)
+        os.environ["MKL_NUM_THREADS"] = str(torch_threads)
+    set_torch_threads(torch_threads)
+    from . import explainer
+    explainer._get_hf_pipeline()
+
+
+def _generate(prompt: str, kwargs: dict) -> str:
+    from . import explainer
+    pipe = explainer._get_hf_pipeline()
+    if pipe is None:
+        return ""
+    out = pipe(prompt, **kwargs)
+    return out[0].get("generated_text", "").strip()
+
+
+class HFWorkerPool:
+    def __init__(self, workers: int = WORKERS, torch_threads: int = TORCH_THREADS, queue_size: int = QUEUE_SIZE):
+        self.workers = max(1, workers)
+        self.queue_size = queue_size
+        self._pending = 0
+        self._lock = threading.Lock()
+        # imported here so thread mode never pays for multiprocessing at startup
+        import multiprocessing
+        from concurrent.futures import ProcessPoolExecutor
+        self._executor = ProcessPoolExecutor(
+            max_workers=self.workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker,
+            initargs=(torch_threads,),
+        )
+
+    async def generate(self, prompt: str, **kwargs) -> str:
+        with self._lock:
+            if self._pending >= self.queue_size:
+                raise QueueFull()
+            self._pending += 1
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._executor, _generate, prompt, kwargs)
+        finally:
+            with self._lock:
+                self._pending -= 1
+
+    def warm(self) -> None:
+        """Block until every worker has started and loaded the pipeline."""
+        futures = [self._executor.submit(_generate, "warm up", {"max_new_tokens": 1}) for _ in range(self.workers)]
+        for f in futures:
+            f.result()
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+_POOL: Optional[HFWorkerPool] = None
+_pool_lock = threading.Lock()
+
+
+def get_pool() -> HFWorkerPool:
+    global _POOL
+    with _pool_lock:
+        if _POOL is None:
+            _POOL = HFWorkerPool()
+        return _POOL
+
+
+def shutdown() -> None:
+    global _POOL
+    with _pool_lock:
+        if _POOL is not None:
+            _POOL.shutdown()
+            _POOL = None
@@ -0,0 +1,141 @@
+"""
+Token-budgeted prompts for LLM explanations.
+
+The signals for a product can cite every recent item plus each overlap with
+its shared tags, and embedding all of it verbatim makes prompt size (and so
+LLM latency and cost) grow with the user's history. `build_prompt` instead
+breaks the signals into elements, ranks them by weight (event weight times
+shared tags for overlaps, event weight for cited items), keeps the best ones
+that fit LLM_PROMPT_TOKEN_BUDGET and renders them in the usual order. A
+behavior request's note is split into its listed products and tags, which
+outrank everything else and are kept round-robin across the note's clauses,
+so a long list is shortened rather than dropped.
+
+Token counts come from a fast local estimate, not a model tokenizer: one
+token per punctuation mark and one per started six characters of a word,
+which tracks BPE tokenizers on short English text closely enough to budget
+with. The backends call `record_prompt` for each prompt they actually send,
+which logs its estimate at DEBUG and observes it in the
+`recs_llm_prompt_tokens` histogram; cache keys built from prompts are not counted.
+"""
+from itertools import groupby
+from typing import List, Optional, Tuple, Union
+import logging
+import os
+import re
+
+from ..metrics import PROMPT_TOKENS, ENABLED as METRICS_ENABLED
+from ..recs.profiles import EVENT_WEIGHTS
+from .signals import Signals
+
+log = logging.getLogger(__name__)
+
+PROMPT_TEMPLATE = (
+    "You are a helpful shopping assistant. Explain in 1-3 concise sentences why the product '{name}' is recommended to this user "
+    "based on their past behavior and interests provided below. Be specific: cite which past items (by name) or which tags caused the match, and mention the interaction type when relevant (viewed, added to cart, purchased).\n\nContext: {signals}\n\nExplanation:"
+)
+
+TOKEN_BUDGET = int(os.getenv("LLM_PROMPT_TOKEN_BUDGET", "192"))  # whole prompt; <= 0 disables trimming
+
+_TOKEN_RE = re.compile(r"\w+|[^\w\s]")
+
+
+def estimate_tokens(text: str) -> int:
+    return sum(1 + (len(piece) - 1) // 6 for piece in _TOKEN_RE.findall(text))
+
+
+_TEMPLATE_TOKENS = estimate_tokens(PROMPT_TEMPLATE.format(name="", signals=""))
+
+CITED_HEADER = "User recently purchased/added to cart: "
+_CITED_HEADER_TOKENS = estimate_tokens(CITED_HEADER)
+
+# element kinds, in the order they are rendered
+CITED, OVERLAP, REASON, NOTE, POPULARITY = range(5)
+
+
+def _elements(signals: Signals) -> List[Tuple[float, int, object, str]]:
+    """(weight, kind, position, text) for every piece of the signals."""
+    out = []
+    for i, c in enumerate(signals.cited):
+        out.append((EVENT_WEIGHTS.get(c.event, 1.0) + 1.0, CITED, i, f"{c.name} ({c.event})"))
+    for i, o in enumerate(signals.overlaps):
+        weight = EVENT_WEIGHTS.get(o.event, 1.0) * len(o.common_tags)
+        out.append((weight, OVERLAP, i, f"shared tags {', '.join(o.common_tags)} with {o.recent_name} ({o.event})"))
+    # all a behavior request has to go on: "similar to ...: a, b; aligned with interests: x, y"
+    for ci, clause in enumerate(p for p in (signals.behavior_note or "").split("; ") if p):
+        head, sep, body = clause.partition(": ")
+        if not sep or body.startswith("["):
+            out.append((100.0, NOTE, (ci, 0, ""), clause))
+            continue
+        for ii, item in enumerate(body.split(", ")):
+            out.append((100.0 - ii, NOTE, (ci, ii, head), item))
+    if signals.reason:
+        out.append((0.5, REASON, 0, signals.reason))
+    if signals.popularity is not None:
+        out.append((0.75, POPULARITY, 0, f"product popularity score: {signals.popularity}"))
+    return out
+
+
+def _render(kept: List[Tuple[float, int, object, str]]) -> str:
+    kept = sorted(kept, key=lambda e: (e[1], e[2]))
+    cited = [e[3] for e in kept if e[1] == CITED]
+    parts = [CITED_HEADER + ", ".join(cited)] if cited else []
+    overlaps = [e[3] for e in kept if e[1] == OVERLAP]
+    if overlaps:
+        parts.append("; ".join(overlaps))
+    parts.extend(e[3] for e in kept if e[1] == REASON)
+    for _, group in groupby((e for e in kept if e[1] == NOTE), key=lambda e: e[2][0]):
+        group = list(group)
+        head = group[0][2][2]
+        parts.append(f"{head}: {', '.join(e[3] for e in group)}" if head else group[0][3])
+    parts.extend(e[3] for e in kept if e[1] == POPULARITY)
+    return "; ".join(parts)
+
+
+def _header(element: Tuple[float, int, object, str]) -> Optional[Tuple[object, int]]:
+    """(key, tokens) of the list header the first kept element of its list pays for."""
+    if element[1] == CITED:
+        return CITED, _CITED_HEADER_TOKENS
+    if element[1] == NOTE and element[2][2]:
+        return (NOTE, element[2][0]), estimate_tokens(element[2][2] + ": ")
+    return None
+
+
+def budget_signals(signals: Union[str, Signals], budget: int) -> Tuple[str, int]:
+    """Signals text trimmed to `budget` estimated tokens, and how many elements were dropped."""
+    if isinstance(signals, Signals):
+        elements = _elements(signals)
+    else:
+        # plain strings: clauses are already in priority order
+        elements = [(-i, OVERLAP, i, part) for i, part in enumerate(p for p in (signals or "").split("; ") if p)]
+    if budget <= 0:
+        return _render(elements), 0
+
+    kept, used, headers = [], 0, set()
+    for element in sorted(elements, key=lambda e: (-e[0], e[1], e[2])):
+        cost = estimate_tokens(element[3]) + 2  # separator / list punctuation
+        header = _header(element)
+        if header is not None and header[0] not in headers:
+            cost += header[1]
+        if used + cost <= budget:
+            kept.append(element)
+            used += cost
+            if header is not None:
+                headers.add(header[0])
+    return _render(kept), len(elements) - len(kept)
+
+
+def build_prompt(product_name: str, signals: Union[str, Signals], budget: Optional[int] = None) -> str:
+    budget = TOKEN_BUDGET if budget is None else budget
+    signals_budget = budget - _TEMPLATE_TOKENS - estimate_tokens(product_name) if budget > 0 else 0
+    text, _ = budget_signals(signals, max(signals_budget, 1) if budget > 0 else 0)
+    return PROMPT_TEMPLATE.format(name=product_name, signals=text)
+
+
+def record_prompt(product_name: str, prompt: str) -> None:
+    """Account for a prompt that is being sent to an LLM."""
+    if METRICS_ENABLED or log.isEnabledFor(logging.DEBUG):
+        tokens = estimate_tokens(prompt)
+        if METRICS_ENABLED:
+            PROMPT_TOKENS.observe(tokens)
+        log.debug("prompt for %r: ~%d tokens (budget %d)", product_name, tokens, TOKEN_BUDGET)
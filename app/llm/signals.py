@@ -0,0 +1,81 @@
+"""
+Structured explanation signals.
+
+The recommendation handler builds one `Signals` per recommended product from
+what scoring already produced (the matched tags) plus a per-request index of
+the user's recent items by tag. The deterministic explainer reads the fields
+directly; LLM backends render them with `to_text()`.
+"""
+from typing import Dict, List, Optional
+from dataclasses import dataclass, field
+
+INTENT_EVENTS = ("purchase", "add_to_cart")
+
+
+@dataclass
+class RecentItem:
+    name: str
+    event: str
+    tags: List[str]
+
+
+@dataclass
+class Overlap:
+    recent_name: str
+    event: str
+    common_tags: List[str]
+
+
+@dataclass
+class Signals:
+    cited: List[RecentItem] = field(default_factory=list)
+    overlaps: List[Overlap] = field(default_factory=list)
+    reason: Optional[str] = None
+    behavior_note: Optional[str] = None
+    popularity: Optional[int] = None
+
+    def to_text(self) -> str:
+        parts = []
+        if self.cited:
+            parts.append("User recently purchased/added to cart: " + ", ".join(f"{c.name} ({c.event})" for c in self.cited))
+        if self.overlaps:
+            parts.append("; ".join(f"shared tags {', '.join(o.common_tags)} with {o.recent_name} ({o.event})" for o in self.overlaps))
+        if self.reason:
+            parts.append(self.reason)
+        if self.behavior_note:
+            parts.append(self.behavior_note)
+        if self.popularity is not None:
+            parts.append(f"product popularity score: {self.popularity}")
+        return "; ".join(parts)
+
+    def __str__(self) -> str:
+        return self.to_text()
+
+
+class UserSignalContext:
+    """Per-request view of a user's recent items, indexed by tag."""
+
+    def __init__(self, recent_items: List[RecentItem], reason: str = "based on past interactions and matching tags"):
+        self.recent_items = recent_items
+        self.reason = reason
+        self.cited = [r for r in recent_items if r.event in INTENT_EVENTS]
+        self._by_tag: Dict[str, List[int]] = {}
+        for idx, item in enumerate(recent_items):
+            for t in set(item.tags):
+                self._by_tag.setdefault(t, []).append(idx)
+
+    def for_product(self, matched_tags: List[str], popularity: Optional[int]) -> Signals:
+        common: Dict[int, List[str]] = {}
+        for t in matched_tags:
+            for idx in self._by_tag.get(t, ()):
+                common.setdefault(idx, []).append(t)
+        overlaps = [
+            Overlap(recent_name=self.recent_items[idx].name, event=self.recent_items[idx].event, common_tags=tags)
+            for idx, tags in sorted(common.items())
+        ]
+        return Signals(cited=self.cited, overlaps=overlaps, reason=self.reason, popularity=popularity)
+
+
+def behavior_signals(note: str, popularity: Optional[int]) -> Signals:
+    return Signals(behavior_note=note, popularity=popularity)
+
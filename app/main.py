@@ -1,18 +1,33 @@
-from fastapi import FastAPI, Depends
+from fastapi import FastAPI, Depends, HTTPException, Query
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse, Response
-from pydantic import BaseModel
-from typing import List, Optional
-from .db.database import init_db, get_session
-from .db.models import Product, User, Interaction
-from .recs.engine import recommend_for_user, recommend_from_behavior
-from sqlmodel import Session, select
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import FileResponse, Response, PlainTextResponse, JSONResponse, StreamingResponse
+from pydantic import BaseModel, Field
+from typing import Awaitable, Callable, List, Literal, Optional, Tuple
+from .db.database import engine, init_db, get_session, get_read_session, read_engine, read_engines, stick_to_primary
+from .db.models import Product, User, Interaction, InteractionAggregate, UserTagScore
+from .db.stats import get_stats, refresh_stats, record_interactions
+from .recs.engine import ScoredProduct, score_for_user, score_from_behavior
+from .recs.profiles import apply_event, rebuild_profiles
+from .recs import catalog, seen, sharded
+from sqlmodel import Session, select, func, delete, union
+from collections import OrderedDict
 import asyncio
-from .llm.explainer import explain
+from .llm.explainer import explain_many
+from .llm import explainer, hf_worker
+from .llm.signals import RecentItem, UserSignalContext, behavior_signals
+from . import jobs, metrics, profiling, warmup
+from .cache import USER_VERSION_TTL, get_cache
+from .singleflight import SingleFlight
+from .metrics import span
 from dotenv import load_dotenv
+from datetime import datetime, timezone
 import os
 import csv
+import json
+import threading
+import time
 
 app = FastAPI(title="Product Recommender API")
 
@@ -23,6 +38,8 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+if profiling.ENABLED:
+    app.add_middleware(profiling.ProfilingMiddleware)
 
 @app.on_event("startup")
 def on_startup():
@@ -31,6 +48,14 @@ def on_startup():
     if os.path.exists(env_path):
         load_dotenv(env_path)
     init_db()
+    warmup.start(_synthetic_recommendation)
+
+
+@app.on_event("shutdown")
+def on_shutdown():
+    jobs.shutdown()
+    hf_worker.shutdown()
+    sharded.reset()
 
 class Behavior(BaseModel):
     product_ids: Optional[List[int]] = None
@@ -40,6 +65,18 @@ class RecRequest(BaseModel):
     user_id: Optional[int] = None
     user_behavior: Optional[Behavior] = None
     k: int = 5
+    # diversity: prefer at most this many results sharing any one tag; a soft
+    # cap, since the best skipped products fill slots the caps leave empty
+    max_per_tag: Optional[int] = Field(default=None, ge=1)
+    # user_id requests: skip products the user already bought / viewed
+    exclude_purchased: bool = True
+    exclude_viewed: bool = False
+
+class InteractionIn(BaseModel):
+    user_id: int
+    product_id: int
+    event: Literal["view", "add_to_cart", "purchase"] = "view"
+    timestamp: Optional[datetime] = None
 
 class ProductOut(BaseModel):
     id: int
@@ -49,17 +86,50 @@ class ProductOut(BaseModel):
     explanation: str
 
 
-def _split_tags(tag_str: Optional[str]) -> List[str]:
-    if not tag_str:
-        return []
-    return [t.strip() for t in tag_str.split(",") if t.strip()]
+ACTIVE_USERS_COUNT_TTL = float(os.getenv("ACTIVE_USERS_COUNT_TTL", "30"))
+# seconds to keep /recommendations responses in the shared cache (0 disables)
+RESULT_CACHE_TTL = float(os.getenv("RESULT_CACHE_TTL", "30"))
+# insertion order is age order, so expired entries sit at the front
+_active_count_cache: "OrderedDict[Optional[datetime], Tuple[float, int]]" = OrderedDict()
+ACTIVE_USERS_COUNT_MAX = 256  # distinct `since` values; rolling windows make a new one per call
+_active_count_lock = threading.Lock()
+JOB_EVENTS_POLL_SECONDS = 0.5
+
+
+def _invalidate_dataset_caches() -> None:
+    """Drop per-process caches derived from the dataset; call after any load."""
+    _active_count_cache.clear()
+    seen.clear()
+    catalog.invalidate()
+    sharded.reset()
+    get_cache().bump_version()
+
+
+def _as_utc_naive(ts: Optional[datetime]) -> Optional[datetime]:
+    # timestamps are stored as naive UTC (datetime.utcnow)
+    if ts is not None and ts.tzinfo is not None:
+        return ts.astimezone(timezone.utc).replace(tzinfo=None)
+    return ts
+
+
+def _parse_timestamp(value: Optional[str]) -> Optional[datetime]:
+    if not value:
+        return None
+    try:
+        return _as_utc_naive(datetime.fromisoformat(value.replace("Z", "+00:00")))
+    except ValueError:
+        return None
 
 @app.post("/load-sample-data")
 def load_sample_data(session: Session = Depends(get_session)):
     init_db()
     if session.exec(select(Product)).first():
         return {"status": "already-loaded"}
+    return {"status": "loaded", **_swap_dataset(session, "sample", lambda: _insert_sample(session))}
+
 
+def _insert_sample(session: Session) -> dict:
+    """Insert the built-in sample dataset; the caller commits."""
     products = [
         Product(name="Trail Running Shoes", description="Cushioned trail shoes", price=129.0, tags="running,trail,shoes", popularity=8),
         Product(name="Road Running Shoes", description="Lightweight road shoes", price=119.0, tags="running,road,shoes", popularity=9),
@@ -68,17 +138,13 @@ def load_sample_data(session: Session = Depends(get_session)):
         Product(name="Hiking Backpack", description="30L daypack", price=89.0, tags="hiking,trail,backpack", popularity=8),
         Product(name="Noise Cancelling Headphones", description="Over-ear ANC", price=249.0, tags="audio,electronics,headphones", popularity=10),
     ]
-    for p in products:
-        session.add(p)
     users = [User(name="Alice"), User(name="Bob")]
-    for u in users:
-        session.add(u)
-    session.commit()
+    session.add_all(products + users)
+    session.flush()
 
     alice_id = users[0].id
     bob_id = users[1].id
-    all_products = session.exec(select(Product)).all()
-    name_to_id = {p.name: p.id for p in all_products}
+    name_to_id = {p.name: p.id for p in products}
 
     interactions = [
         Interaction(user_id=alice_id, product_id=name_to_id["Trail Running Shoes"], event="view"),
@@ -87,48 +153,95 @@ def load_sample_data(session: Session = Depends(get_session)):
         Interaction(user_id=bob_id, product_id=name_to_id["Hiking Backpack"], event="view"),
         Interaction(user_id=bob_id, product_id=name_to_id["Noise Cancelling Headphones"], event="purchase"),
     ]
-    for it in interactions:
-        session.add(it)
-    session.commit()
-
-    return {"status": "loaded", "users": [u.id for u in users], "products": [p.id for p in products]}
+    session.add_all(interactions)
+    session.flush()
+    return {"users": [u.id for u in users], "products": [p.id for p in products]}
 
 @app.post("/recommendations", response_model=List[ProductOut])
-async def recommendations(req: RecRequest, session: Session = Depends(get_session)):
+async def recommendations(req: RecRequest, session: Session = Depends(get_read_session)):
+    with metrics.count_queries("recommendations"), span("recommendations.total"):
+        return await _recommendations(req, session)
+
+
+async def _recommendations(req: RecRequest, session: Session) -> List[ProductOut]:
     init_db()
     if req.user_id is None and req.user_behavior is None:
         return []
+    if RESULT_CACHE_TTL <= 0:
+        return await _compute_recommendations(req, session)
+
+    # user results are keyed by the user's version too, bumped on ingestion
+    cache = get_cache()
+    scope = cache.user_version(req.user_id) if req.user_id is not None else None
+    key = cache.key("recs", scope, req.model_dump())
+    cached = cache.get(key)
+    if cached is not None:
+        metrics.cache_hit("recommendations")
+        return [ProductOut(**item) for item in json.loads(cached)]
+    metrics.cache_miss("recommendations")
+    result = await _compute_recommendations(req, session)
+    cache.set(key, json.dumps([r.model_dump() for r in result]), RESULT_CACHE_TTL)
+    return result
+
+
+_engine_flight = SingleFlight("engine")
+
+
+def _score_user(session: Session, req: RecRequest) -> List[ScoredProduct]:
+    with span("recommendations.seen"):
+        exclude = seen.exclusion_for(session, req.user_id, req.exclude_purchased, req.exclude_viewed)
+    return score_for_user(session, req.user_id, req.k, max_per_tag=req.max_per_tag, exclude=exclude)
 
+
+def _score_behavior(session: Session, req: RecRequest) -> List[ScoredProduct]:
+    pb = req.user_behavior
+    return score_from_behavior(session, pb.product_ids, pb.tags, req.k, max_per_tag=req.max_per_tag)
+
+
+def _run_engine(
+    session: Session, req: RecRequest, score: Callable[[Session, RecRequest], List[ScoredProduct]]
+) -> Awaitable[List[ScoredProduct]]:
+    """Run `score` in a worker thread; identical concurrent requests against the
+    same database and user version share one run."""
+    scope = get_cache().user_version(req.user_id) if req.user_id is not None else None
+    key = (str(session.get_bind().url), scope, req.model_dump_json())
+    if profiling.capturing():
+        async def call():
+            return score(session, req)  # inline, so the request's profile includes it
+    else:
+        def call():
+            return asyncio.to_thread(score, session, req)
+    return _engine_flight.do(key, call)
+
+
+async def _compute_recommendations(req: RecRequest, session: Session) -> List[ProductOut]:
     if req.user_id is not None:
-        products = recommend_for_user(session, req.user_id, req.k)
-
-        recent = session.exec(
-            select(Interaction).where(Interaction.user_id == req.user_id).order_by(Interaction.id.desc()).limit(10)
-        ).all()
-        recent_items = []
-        recent_map = {}
-        for it in recent:
-            prod = session.get(Product, it.product_id)
-            if not prod:
-                continue
-            recent_items.append({"name": prod.name, "event": it.event, "tags": _split_tags(prod.tags)})
-            recent_map[prod.id] = prod
-
-        signals = {
-            "recent_items": recent_items,
-            "reason": "based on past interactions and matching tags",
-        }
+        with span("recommendations.engine"):
+            scored = await _run_engine(session, req, _score_user)
+
+        with span("recommendations.recent_items"):
+            recent = session.exec(
+                select(Interaction.event, Interaction.product_id)
+                .where(Interaction.user_id == req.user_id)
+                .order_by(Interaction.id.desc())
+                .limit(10)
+            ).all()
+            products = catalog.get_catalog(session)
+            context = UserSignalContext([
+                RecentItem(name=p.name, event=event, tags=list(p.tag_keys))
+                for event, p in ((event, products.get(pid)) for event, pid in recent) if p is not None
+            ])
+
+        signals = [context.for_product(s.matched_tags, s.product.popularity) for s in scored]
     else:
         pb = req.user_behavior
-        products = recommend_from_behavior(session, pb.product_ids, pb.tags, req.k)
+        with span("recommendations.engine"):
+            scored = await _run_engine(session, req, _score_behavior)
 
         sig_parts = []
         if pb.product_ids:
-            names = []
-            for pid in (pb.product_ids or []):
-                p = session.get(Product, pid)
-                if p:
-                    names.append(p.name)
+            products = catalog.get_catalog(session)
+            names = [p.name for p in map(products.get, pb.product_ids) if p is not None]
             if names:
                 sig_parts.append(f"similar to items you interacted with: {', '.join(names)}")
             else:
@@ -136,41 +249,12 @@ async def recommendations(req: RecRequest, session: Session = Depends(get_sessio
         if pb.tags:
             sig_parts.append(f"aligned with interests: {', '.join(pb.tags)}")
 
-        signals = {"behavior_note": "; ".join(sig_parts) or "your provided interests"}
-
-    async def _explain_for_product(p):
-        parts = []
-        if isinstance(signals, dict) and signals.get("recent_items"):
-            cand_tags = set(_split_tags(p.tags))
-            overlaps = []
-            cited = []
-            for recent in signals["recent_items"]:
-                common = cand_tags.intersection(set(recent.get("tags", [])))
-                if common:
-                    overlaps.append({"recent_name": recent["name"], "common_tags": list(common), "event": recent["event"]})
-                if recent.get("event") in ("purchase", "add_to_cart"):
-                    cited.append({"name": recent["name"], "event": recent["event"]})
-
-            if cited:
-                parts.append("User recently purchased/added to cart: " + ", ".join([f"{c['name']} ({c['event']})" for c in cited]))
-            if overlaps:
-                ov_text = "; ".join([f"shared tags {', '.join(o['common_tags'])} with {o['recent_name']} ({o['event']})" for o in overlaps])
-                parts.append(ov_text)
-            parts.append(signals.get("reason", "based on past behavior"))
-
-        elif isinstance(signals, dict) and signals.get("behavior_note"):
-            parts.append(signals.get("behavior_note"))
-        else:
-            parts.append(str(signals))
-
-        if getattr(p, "popularity", None) is not None:
-            parts.append(f"product popularity score: {getattr(p, 'popularity')}")
-
-        signal_str = "; ".join(parts)
-        return await explain(p.name, signal_str)
-
-    tasks = [_explain_for_product(p) for p in products]
-    explanations = await asyncio.gather(*tasks)
+        note = "; ".join(sig_parts) or "your provided interests"
+        signals = [behavior_signals(note, s.product.popularity) for s in scored]
+
+    products = [s.product for s in scored]
+    with span("recommendations.explain"):
+        explanations = await explain_many([(p.name, sig) for p, sig in zip(products, signals)])
 
     result: List[ProductOut] = []
     for p, exp in zip(products, explanations):
@@ -179,57 +263,79 @@ async def recommendations(req: RecRequest, session: Session = Depends(get_sessio
                 id=p.id,
                 name=p.name,
                 price=p.price,
-                tags=[t.strip() for t in p.tags.split(',') if t.strip()],
+                tags=list(p.tags),
                 explanation=exp,
             )
         )
     return result
 
 
+def _synthetic_recommendation() -> None:
+    """One behavior-based request through the full handler, used by warm-up.
+    Explanations stay deterministic: the LLM backend is loaded by its own warm-up
+    step, and a real OpenAI call per worker start would cost money."""
+    req = RecRequest(user_behavior=Behavior(tags=["warmup"]), k=1)
+    with Session(read_engine()) as session, explainer.deterministic():
+        asyncio.run(_recommendations(req, session))
+
+
 @app.get("/")
 def root():
     return {"status": "ok", "demo": "/demo", "api_docs": "/docs"}
 
 
+@app.get("/health")
+def health():
+    """Liveness: the process is up and serving. Does no I/O."""
+    return {"status": "ok"}
+
+
+@app.get("/ready")
+def ready():
+    """Readiness: 200 once warm-up (including a synthetic recommendation) has succeeded."""
+    body = warmup.status()
+    return JSONResponse(body, status_code=200 if body["ready"] else 503)
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def metrics_endpoint():
+    """Prometheus text exposition; empty unless METRICS_ENABLED=1."""
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+
+@app.get("/debug/profiles")
+def debug_profiles():
+    """Recent cProfile captures (PROFILING_ENABLED=1, X-Profile header or sampling)."""
+    return {"enabled": profiling.ENABLED, "dir": profiling.PROFILE_DIR, "profiles": profiling.list_profiles()}
+
+
+@app.get("/debug/profiles/{name}")
+def debug_profile_download(name: str):
+    path = profiling.profile_path(name)
+    if path is None:
+        raise HTTPException(status_code=404, detail="profile not found")
+    return FileResponse(path, media_type="application/octet-stream", filename=name)
+
+
 @app.get("/data-info")
-def data_info(session: Session = Depends(get_session)):
+def data_info(session: Session = Depends(get_read_session)):
     """Get information about currently loaded data."""
-    from sqlmodel import func
-    
-    product_count = session.exec(select(func.count(Product.id))).one()
-    user_count = session.exec(select(func.count(User.id))).one()
-    interaction_count = session.exec(select(func.count(Interaction.id))).one()
-    
-    sample_products = session.exec(select(Product).limit(3)).all()
-    product_names = [p.name for p in sample_products]
-    
-    data_source = "unknown"
-    if any("Essence" in name or "iPhone" in name or "Samsung" in name for name in product_names):
-        data_source = "api_real_products"
-        description = "Real products from DummyJSON/FakeStore APIs"
-    elif any("Trail Running" in name or "Yoga Mat" in name for name in product_names):
-        data_source = "synthetic_realistic"
-        description = "Generated realistic e-commerce data"
-    elif any("brazilian" in str(sample_products).lower()):
-        data_source = "kaggle_brazilian"
-        description = "Kaggle Brazilian E-Commerce dataset"
-    else:
-        data_source = "custom"
-        description = "Custom or manually loaded data"
-    
+    stats = get_stats(session, primary=engine)
+    product_names = [p.name for p in catalog.get_catalog(session).products[:3]]
+
     return {
-        "source": data_source,
-        "description": description,
+        "source": stats.source,
+        "description": stats.description,
         "stats": {
-            "products": product_count,
-            "users": user_count,
-            "interactions": interaction_count
+            "products": stats.products,
+            "users": stats.users,
+            "interactions": stats.interactions
         },
-        "sample_products": product_names[:3]
+        "sample_products": product_names,
+        "updated_at": stats.updated_at,
     }
 
 
-
 static_dir = os.path.join(os.path.dirname(__file__), "static")
 data_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "data"))
 if os.path.isdir(static_dir):
@@ -237,153 +343,343 @@ if os.path.isdir(static_dir):
 if os.path.isdir(data_dir):
     app.mount("/data", StaticFiles(directory=data_dir), name="data")
 
+def _active_user_ids(since: Optional[datetime] = None, after_id: Optional[int] = None):
+    """Distinct ids of users with raw or compacted interactions (UNION dedupes)."""
+    raw = select(Interaction.user_id.label("user_id"))
+    compacted = select(InteractionAggregate.user_id.label("user_id"))
+    if since is not None:
+        raw = raw.where(Interaction.timestamp >= since)
+        compacted = compacted.where(InteractionAggregate.last_timestamp >= since)
+    if after_id is not None:
+        raw = raw.where(Interaction.user_id > after_id)
+        compacted = compacted.where(InteractionAggregate.user_id > after_id)
+    return union(raw, compacted)
+
+
 @app.get("/active-users")
-def active_users(session: Session = Depends(get_session)):
-    user_ids = set()
-    for row in session.exec(select(Interaction.user_id)).all():
-        user_ids.add(row)
-    users = session.exec(select(User).where(User.id.in_(user_ids))).all()
-    return [{"id": u.id, "name": u.name} for u in users]
+def active_users(
+    response: Response,
+    after_id: Optional[int] = None,
+    limit: int = Query(500, ge=1, le=5000),
+    since: Optional[datetime] = None,
+    session: Session = Depends(get_read_session),
+):
+    """Users with at least one interaction, ordered by id.
+
+    Keyset paginated: pass the `X-Next-Cursor` response header back as
+    `after_id` to fetch the next page. `since` restricts to users active at
+    or after that timestamp.
+    """
+    active = _active_user_ids(_as_utc_naive(since), after_id).subquery()
+    stmt = select(User.id, User.name).join(active, active.c.user_id == User.id)
+    rows = session.exec(stmt.order_by(User.id).limit(limit)).all()
+
+    if len(rows) == limit:
+        response.headers["X-Next-Cursor"] = str(rows[-1][0])
+    return [{"id": uid, "name": name} for uid, name in rows]
+
+
+def _remember_active_count(since: Optional[datetime], now: float, count: int) -> None:
+    with _active_count_lock:
+        _active_count_cache.pop(since, None)
+        _active_count_cache[since] = (now, count)
+        while _active_count_cache:
+            stamp = next(iter(_active_count_cache.values()))[0]
+            if now - stamp < ACTIVE_USERS_COUNT_TTL and len(_active_count_cache) <= ACTIVE_USERS_COUNT_MAX:
+                break
+            _active_count_cache.popitem(last=False)
+
+
+@app.get("/active-users/count")
+def active_users_count(since: Optional[datetime] = None, session: Session = Depends(get_read_session)):
+    """Number of distinct active users, cached for ACTIVE_USERS_COUNT_TTL seconds."""
+    since = _as_utc_naive(since)
+    now = time.monotonic()
+    cached = _active_count_cache.get(since)
+    if cached is not None and now - cached[0] < ACTIVE_USERS_COUNT_TTL:
+        metrics.cache_hit("active_users_count")
+        return {"count": cached[1], "since": since, "cached": True}
+    metrics.cache_miss("active_users_count")
+
+    count = session.exec(select(func.count()).select_from(_active_user_ids(since).subquery())).one()
+    _remember_active_count(since, now, count)
+    return {"count": count, "since": since, "cached": False}
+
+
+@app.post("/interactions", status_code=201)
+def ingest_interaction(event: InteractionIn, response: Response, session: Session = Depends(get_session)):
+    """Record a single user event."""
+    if session.get(User, event.user_id) is None:
+        raise HTTPException(status_code=404, detail="user not found")
+    product = catalog.get_catalog(session).get(event.product_id)
+    if product is None:
+        raise HTTPException(status_code=404, detail="product not found")
+
+    inter = Interaction(user_id=event.user_id, product_id=event.product_id, event=event.event)
+    if event.timestamp is not None:
+        inter.timestamp = _as_utc_naive(event.timestamp)
+    session.add(inter)
+    apply_event(session, inter.user_id, product.tag_keys, inter.event, inter.timestamp)
+    record_interactions(session)
+    session.commit()
+    seen.record((engine, *read_engines), inter.user_id, inter.product_id, inter.event)
+    get_cache().bump_user(inter.user_id, max(USER_VERSION_TTL, RESULT_CACHE_TTL))
+    stick_to_primary(response)
+    return {"id": inter.id, "user_id": inter.user_id, "product_id": inter.product_id, "event": inter.event}
 
 
 @app.post("/load-data-source")
-def load_data_source(source: str, session: Session = Depends(get_session)):
+def load_data_source(source: str, response: Response, session: Session = Depends(get_session)):
     """
     Load data from a specific source.
     Sources: 'api', 'synthetic', 'sample'
-    """
-    for item in session.exec(select(Interaction)):
-        session.delete(item)
-    for item in session.exec(select(Product)):
-        session.delete(item)
-    for item in session.exec(select(User)):
-        session.delete(item)
-    session.commit()
 
+    'api' and 'synthetic' run as background jobs: the response is 202 with a
+    job id to follow at /jobs/{id} or /jobs/{id}/events. 'sample' is tiny and
+    loads inline.
+    """
+    if source in ("api", "synthetic"):
+        job = jobs.get_runner().submit(f"load:{source}", _load_source_job, source)
+        response.status_code = 202
+        return _accepted(job)
+    if source != "sample":
+        return {"status": "error", "message": f"Unknown source: {source}"}
+
+    stick_to_primary(response)
     try:
-        if source == "api":
-            from scripts.fetch_real_products import fetch_dummyjson_products, fetch_fakestore_products, generate_realistic_users, generate_interactions
+        return {"status": "loaded", **_swap_dataset(session, "sample", lambda: _insert_sample(session))}
+    except Exception as e:
+        return {"status": "error", "message": str(e)}
 
-            try:
-                products = fetch_dummyjson_products()
-            except Exception:
-                products = fetch_fakestore_products()
 
-            users = generate_realistic_users(20)
-            interactions = generate_interactions(products, users, 200)
+@app.post("/import-csv")
+def import_csv(response: Response):
+    """Replace the dataset with the CSV files in ./data, as a background job.
+    Files: data/products.csv, data/users.csv, data/interactions.csv
+    """
+    root = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+    job = jobs.get_runner().submit("import:csv", _import_csv_job, os.path.join(root, "data"))
+    response.status_code = 202
+    return _accepted(job)
 
-        elif source == "synthetic":
-            from scripts.generate_realistic_data import PRODUCTS as gen_products, USER_PERSONAS, generate_interactions as gen_interactions
 
-            products = [
-                {"id": p["id"], "name": p["name"], "description": p.get("description", ""), "price": p.get("price", 0), "tags": p.get("tags", ""), "popularity": p.get("popularity", 0)}
-                for p in gen_products
-            ]
-            users = [{"id": u["id"], "name": u["name"]} for u in USER_PERSONAS]
-            interactions = gen_interactions()
+def _accepted(job: dict) -> dict:
+    return {"status": "accepted", "job_id": job["id"], "status_url": f"/jobs/{job['id']}", "events_url": f"/jobs/{job['id']}/events"}
 
-        elif source == "sample":
-            return load_sample_data(session)
 
-        else:
-            return {"status": "error", "message": f"Unknown source: {source}"}
+def _load_source_job(job: jobs.JobHandle, source: str) -> dict:
+    # fetch / generate before touching the tables, so serving is unaffected meanwhile
+    if source == "api":
+        from scripts.fetch_real_products import fetch_products, generate_realistic_users, generate_interactions
 
-        orig_prod_to_db = {}
-        for prod in products:
-            p = Product(name=prod.get("name", ""), description=prod.get("description", ""), price=float(prod.get("price", 0) or 0), tags=prod.get("tags", ""), popularity=int(prod.get("popularity", 0) or 0))
-            session.add(p)
-            session.flush()
-            orig_id = prod.get("id")
-            if orig_id is not None:
-                orig_prod_to_db[int(orig_id)] = p.id
-
-        orig_user_to_db = {}
-        for u in users:
-            user_obj = User(name=u.get("name", ""))
-            session.add(user_obj)
-            session.flush()
-            orig_uid = u.get("id")
-            if orig_uid is not None:
-                orig_user_to_db[int(orig_uid)] = user_obj.id
-
-        created_inter = 0
-        from datetime import datetime
-        for it in interactions:
-            orig_uid = int(it.get("user_id") or it.get("user_id_new"))
-            orig_pid = int(it.get("product_id") or it.get("product_id_new") or it.get("product_id"))
-            db_uid = orig_user_to_db.get(orig_uid)
-            db_pid = orig_prod_to_db.get(orig_pid)
-            if db_uid is None or db_pid is None:
-                continue
-            ts = it.get("timestamp")
-            ts_val = None
-            if ts:
-                try:
-                    ts_val = datetime.fromisoformat(ts.replace("Z", "+00:00"))
-                except Exception:
-                    ts_val = None
-            inter = Interaction(user_id=db_uid, product_id=db_pid, event=it.get("event", "view"), timestamp=ts_val)
-            session.add(inter)
-            created_inter += 1
+        job.progress("fetching")
+        products = fetch_products()
+        users = generate_realistic_users(20)
+        interactions = generate_interactions(products, users, 200)
+    else:
+        from scripts.generate_realistic_data import PRODUCTS as gen_products, USER_PERSONAS, generate_interactions as gen_interactions
 
-        session.commit()
+        job.progress("generating")
+        products = [
+            {"id": p["id"], "name": p["name"], "description": p.get("description", ""), "price": p.get("price", 0), "tags": p.get("tags", ""), "popularity": p.get("popularity", 0)}
+            for p in gen_products
+        ]
+        users = [{"id": u["id"], "name": u["name"]} for u in USER_PERSONAS]
+        interactions = gen_interactions()
+    job.check_cancelled()
 
-        return {"status": "success", "source": source, "import_result": {"products": len(products), "users": len(users), "interactions": created_inter}}
+    with Session(engine) as session:
+        counts = _swap_dataset(session, source, lambda: _insert_dataset(session, products, users, interactions, job), job)
+    return {"status": "success", "source": source, "import_result": counts}
 
-    except Exception as e:
-        session.rollback()
-        return {"status": "error", "message": str(e)}
-def import_csv(session: Session = Depends(get_session)):
-    """Import products, users, and interactions from CSV files in ./data.
-    Files: data/products.csv, data/users.csv, data/interactions.csv
+
+def _import_csv_job(job: jobs.JobHandle, data_dir: str) -> dict:
+    with Session(engine) as session:
+        return _import_csv_files(session, data_dir, job)
+
+
+def _swap_dataset(session: Session, source: str, fill: Callable[[], dict], job: Optional[jobs.JobHandle] = None) -> dict:
+    """Replace the whole dataset in one transaction and return fill()'s result.
+
+    The old rows are deleted, `fill` inserts the new ones and profiles and
+    stats are rebuilt before a single commit, so readers see either the old
+    dataset or the new one, and a failed or cancelled load changes nothing.
     """
-    root = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
-    data_dir = os.path.join(root, "data")
+    try:
+        if job is not None:
+            job.progress("swapping")  # last persisted stage: the transaction below holds the write lock
+        _clear_dataset(session)
+        result = fill()
+        if job is not None:
+            job.progress("profiles", persist=False)
+            job.check_cancelled()
+        rebuild_profiles(session, commit=False)
+        refresh_stats(session, source=source, commit=False)
+        if job is not None:
+            job.check_cancelled()
+        session.commit()
+    except BaseException:
+        session.rollback()
+        raise
+    _invalidate_dataset_caches()
+    return result
+
+
+def _clear_dataset(session: Session) -> None:
+    """Delete every dataset row; the caller commits."""
+    for model in (UserTagScore, InteractionAggregate, Interaction, Product, User):
+        session.exec(delete(model))
+
+
+def _tick(job: Optional[jobs.JobHandle], stage: str, done: int) -> None:
+    """Report progress and honour cancellation every 1000 rows inside a swap."""
+    if job is not None and done % 1000 == 0:
+        job.progress(stage, done, persist=False)
+        job.check_cancelled()
+
+
+def _insert_dataset(session: Session, products: List[dict], users: List[dict], interactions: List[dict], job: Optional[jobs.JobHandle] = None) -> dict:
+    """Insert a fetched/generated dataset under new ids; the caller commits."""
+    orig_prod_to_db = {}
+    for i, prod in enumerate(products, 1):
+        p = Product(name=prod.get("name", ""), description=prod.get("description", ""), price=float(prod.get("price", 0) or 0), tags=prod.get("tags", ""), popularity=int(prod.get("popularity", 0) or 0))
+        session.add(p)
+        session.flush()
+        orig_id = prod.get("id")
+        if orig_id is not None:
+            orig_prod_to_db[int(orig_id)] = p.id
+        _tick(job, "products", i)
+
+    orig_user_to_db = {}
+    for i, u in enumerate(users, 1):
+        user_obj = User(name=u.get("name", ""))
+        session.add(user_obj)
+        session.flush()
+        orig_uid = u.get("id")
+        if orig_uid is not None:
+            orig_user_to_db[int(orig_uid)] = user_obj.id
+        _tick(job, "users", i)
+
+    created_inter = 0
+    for i, it in enumerate(interactions, 1):
+        _tick(job, "interactions", i)
+        orig_uid = int(it.get("user_id") or it.get("user_id_new"))
+        orig_pid = int(it.get("product_id") or it.get("product_id_new") or it.get("product_id"))
+        db_uid = orig_user_to_db.get(orig_uid)
+        db_pid = orig_prod_to_db.get(orig_pid)
+        if db_uid is None or db_pid is None:
+            continue
+        inter = Interaction(user_id=db_uid, product_id=db_pid, event=it.get("event", "view"))
+        ts_val = _parse_timestamp(it.get("timestamp"))
+        if ts_val is not None:
+            inter.timestamp = ts_val
+        session.add(inter)
+        created_inter += 1
+
+    session.flush()
+    return {"products": len(products), "users": len(users), "interactions": created_inter}
+
+
+@app.get("/jobs")
+def list_jobs(limit: int = Query(50, ge=1, le=500)):
+    """Most recent background jobs of every worker, newest first."""
+    return jobs.get_runner().list(limit)
+
+
+@app.get("/jobs/{job_id}")
+def job_status(job_id: str):
+    job = jobs.get_runner().get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Unknown job")
+    return job
+
+
+@app.get("/jobs/{job_id}/events")
+async def job_events(job_id: str):
+    """Server-sent events: the job's state each time it changes, until it finishes."""
+    runner = jobs.get_runner()
+    if await asyncio.to_thread(runner.get, job_id) is None:
+        raise HTTPException(status_code=404, detail="Unknown job")
+
+    async def stream():
+        last = None
+        while True:
+            state = await asyncio.to_thread(runner.get, job_id)
+            if state != last:
+                yield f"data: {json.dumps(jsonable_encoder(state))}\n\n"
+                last = state
+            if state is None or state["status"] in jobs.TERMINAL:
+                return
+            await asyncio.sleep(JOB_EVENTS_POLL_SECONDS)
+
+    return StreamingResponse(stream(), media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
+
+
+@app.post("/jobs/{job_id}/cancel")
+def cancel_job(job_id: str):
+    """Stop a queued or running job; a running load rolls back and the previous dataset stays."""
+    job = jobs.get_runner().cancel(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Unknown job")
+    return job
+
+
+def _import_csv_files(session: Session, data_dir: str, job: Optional[jobs.JobHandle] = None) -> dict:
+    """Replace the dataset with the CSV files in `data_dir`, keeping their ids."""
     prod_path = os.path.join(data_dir, "products.csv")
     users_path = os.path.join(data_dir, "users.csv")
     inter_path = os.path.join(data_dir, "interactions.csv")
 
     created = {"products": 0, "users": 0, "interactions": 0}
 
-    if os.path.exists(prod_path):
-        with open(prod_path, newline="", encoding="utf-8") as f:
-            for row in csv.DictReader(f):
-                p = Product(
-                    id=int(row["id"]) if row.get("id") else None,
-                    name=row.get("name", ""),
-                    description=row.get("description", ""),
-                    price=float(row.get("price", 0) or 0),
-                    tags=row.get("tags", ""),
-                    popularity=int(row.get("popularity", 0) or 0),
-                )
-                session.add(p)
-                created["products"] += 1
-
-    if os.path.exists(users_path):
-        with open(users_path, newline="", encoding="utf-8") as f:
-            for row in csv.DictReader(f):
-                u = User(
-                    id=int(row["id"]) if row.get("id") else None,
-                    name=row.get("name", "")
-                )
-                session.add(u)
-                created["users"] += 1
-
-    session.commit()
-
-    if os.path.exists(inter_path):
-        with open(inter_path, newline="", encoding="utf-8") as f:
-            for row in csv.DictReader(f):
-                it = Interaction(
-                    id=int(row["id"]) if row.get("id") else None,
-                    user_id=int(row.get("user_id")),
-                    product_id=int(row.get("product_id")),
-                    event=row.get("event", "view"),
-                )
-                session.add(it)
-                created["interactions"] += 1
-        session.commit()
+    def fill() -> dict:
+        if os.path.exists(prod_path):
+            with open(prod_path, newline="", encoding="utf-8") as f:
+                for row in csv.DictReader(f):
+                    p = Product(
+                        id=int(row["id"]) if row.get("id") else None,
+                        name=row.get("name", ""),
+                        description=row.get("description", ""),
+                        price=float(row.get("price", 0) or 0),
+                        tags=row.get("tags", ""),
+                        popularity=int(row.get("popularity", 0) or 0),
+                    )
+                    session.add(p)
+                    created["products"] += 1
+                    _tick(job, "products", created["products"])
+
+        if os.path.exists(users_path):
+            with open(users_path, newline="", encoding="utf-8") as f:
+                for row in csv.DictReader(f):
+                    u = User(
+                        id=int(row["id"]) if row.get("id") else None,
+                        name=row.get("name", "")
+                    )
+                    session.add(u)
+                    created["users"] += 1
+                    _tick(job, "users", created["users"])
+
+        session.flush()
+
+        if os.path.exists(inter_path):
+            with open(inter_path, newline="", encoding="utf-8") as f:
+                for row in csv.DictReader(f):
+                    it = Interaction(
+                        id=int(row["id"]) if row.get("id") else None,
+                        user_id=int(row.get("user_id")),
+                        product_id=int(row.get("product_id")),
+                        event=row.get("event", "view"),
+                    )
+                    ts = _parse_timestamp(row.get("timestamp"))
+                    if ts is not None:
+                        it.timestamp = ts
+                    session.add(it)
+                    created["interactions"] += 1
+                    _tick(job, "interactions", created["interactions"])
+            session.flush()
+        return created
 
+    _swap_dataset(session, "csv", fill, job)
     return {"status": "imported", **created}
 
 
@@ -0,0 +1,191 @@
+"""
+Lightweight in-process metrics: stage timing histograms, SQL query counts and
+cache hit/miss counters, rendered in Prometheus text format for /metrics.
+
+Everything is off unless METRICS_ENABLED=1; when disabled `span()` hands back a
+shared no-op context manager and no SQLAlchemy listeners are installed.
+"""
+from contextlib import contextmanager, nullcontext
+from contextvars import ContextVar
+from typing import Dict, List, Optional, Tuple
+import os
+import threading
+import time
+
+ENABLED = os.getenv("METRICS_ENABLED", "0").lower() in ("1", "true", "yes", "on")
+
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+COUNT_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500)
+
+_NOOP = nullcontext()
+_INF = 'le="+Inf"'
+_lock = threading.Lock()
+_query_tally: ContextVar[Optional[List[int]]] = ContextVar("recs_query_tally", default=None)
+
+
+def _fmt_labels(labels: Tuple[Tuple[str, str], ...], extra: str = "") -> str:
+    parts = [f'{k}="{v}"' for k, v in labels]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _fmt_value(v: float) -> str:
+    return repr(float(v)) if isinstance(v, float) else str(v)
+
+
+class Histogram:
+    def __init__(self, name: str, help_text: str, buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.buckets = tuple(buckets)
+        self._series: Dict[Tuple[Tuple[str, str], ...], list] = {}
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = tuple(sorted(labels.items()))
+        with _lock:
+            series = self._series.get(key)
+            if series is None:
+                # per-bucket counts, then sum, then count
+                series = self._series[key] = [0] * len(self.buckets) + [0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[i] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with _lock:
+            items = sorted((k, list(v)) for k, v in self._series.items())
+        for labels, series in items:
+            for bound, count in zip(self.buckets, series):
+                bucket = _fmt_labels(labels, 'le="%s"' % bound)
+                lines.append(f"{self.name}_bucket{bucket} {count}")
+            lines.append(f"{self.name}_bucket{_fmt_labels(labels, _INF)} {series[-1]}")
+            lines.append(f"{self.name}_sum{_fmt_labels(labels)} {_fmt_value(series[-2])}")
+            lines.append(f"{self.name}_count{_fmt_labels(labels)} {series[-1]}")
+        return lines
+
+    def reset(self) -> None:
+        with _lock:
+            self._series.clear()
+
+
+class Counter:
+    def __init__(self, name: str, help_text: str):
+        self.name = name
+        self.help = help_text
+        self._values: Dict[Tuple[Tuple[str, str], ...], float] = {}
+
+    def inc(self, amount: float = 1, **labels: str) -> None:
+        key = tuple(sorted(labels.items()))
+        with _lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels: str) -> float:
+        return self._values.get(tuple(sorted(labels.items())), 0)
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with _lock:
+            items = sorted(self._values.items())
+        for labels, value in items:
+            lines.append(f"{self.name}{_fmt_labels(labels)} {_fmt_value(value)}")
+        return lines
+
+    def reset(self) -> None:
+        with _lock:
+            self._values.clear()
+
+
+STAGE_SECONDS = Histogram("recs_stage_duration_seconds", "Time spent in each request stage.")
+REQUEST_SQL_QUERIES = Histogram("recs_request_sql_queries", "SQL statements issued per request.", COUNT_BUCKETS)
+SQL_QUERIES = Counter("recs_sql_queries_total", "SQL statements executed.")
+CACHE_REQUESTS = Counter("recs_cache_requests_total", "Cache lookups by cache and result (hit/miss).")
+PROMPT_TOKENS = Histogram("recs_llm_prompt_tokens", "Estimated tokens per LLM explanation prompt.", (32, 64, 96, 128, 192, 256, 384, 512, 1024))
+SINGLEFLIGHT_CALLS = Counter("recs_singleflight_calls_total", "Coalesced calls by group and role (leader ran it, follower shared it).")
+LLM_FALLBACKS = Counter("recs_llm_fallbacks_total", "LLM explanations replaced by the deterministic explainer, by backend.")
+
+REGISTRY = [STAGE_SECONDS, REQUEST_SQL_QUERIES, SQL_QUERIES, CACHE_REQUESTS, PROMPT_TOKENS, SINGLEFLIGHT_CALLS, LLM_FALLBACKS]
+
+
+@contextmanager
+def _timed(stage: str):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        STAGE_SECONDS.observe(time.perf_counter() - start, stage=stage)
+
+
+def span(stage: str):
+    """Time a block into the stage histogram: `with span("engine.sort"): ...`"""
+    if not ENABLED:
+        return _NOOP
+    return _timed(stage)
+
+
+@contextmanager
+def _counting(endpoint: str):
+    tally = [0]
+    token = _query_tally.set(tally)
+    try:
+        yield
+    finally:
+        _query_tally.reset(token)
+        REQUEST_SQL_QUERIES.observe(tally[0], endpoint=endpoint)
+
+
+def count_queries(endpoint: str):
+    """Record how many SQL statements run inside the block for `endpoint`."""
+    if not ENABLED:
+        return _NOOP
+    return _counting(endpoint)
+
+
+def cache_hit(cache: str) -> None:
+    if ENABLED:
+        CACHE_REQUESTS.inc(cache=cache, result="hit")
+
+
+def cache_miss(cache: str) -> None:
+    if ENABLED:
+        CACHE_REQUESTS.inc(cache=cache, result="miss")
+
+
+def singleflight_call(group: str, leader: bool) -> None:
+    if ENABLED:
+        SINGLEFLIGHT_CALLS.inc(group=group, role="leader" if leader else "follower")
+
+
+def llm_fallback(backend: str) -> None:
+    if ENABLED:
+        LLM_FALLBACKS.inc(backend=backend)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    SQL_QUERIES.inc()
+    tally = _query_tally.get()
+    if tally is not None:
+        tally[0] += 1
+
+
+def instrument_engine(db_engine) -> None:
+    """Count SQL statements on `db_engine`; a no-op when metrics are disabled."""
+    if not ENABLED:
+        return
+    from sqlalchemy import event
+    event.listen(db_engine, "before_cursor_execute", _before_cursor_execute)
+
+
+def render() -> str:
+    lines: List[str] = []
+    for metric in REGISTRY:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+def reset() -> None:
+    for metric in REGISTRY:
+        metric.reset()
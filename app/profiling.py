@@ -0,0 +1,109 @@
+"""
+Opt-in cProfile capture for slow requests.
+
+Set PROFILING_ENABLED=1 to install the middleware. A request to one of
+PROFILE_PATHS (default /recommendations) is then profiled when it carries an
+`X-Profile: 1` header or wins the PROFILE_SAMPLE_RATE draw; the pstats dump is
+written to PROFILE_DIR and can be inspected with `python -m pstats` or
+snakeviz. With the flag unset the middleware is never added to the app.
+
+cProfile only sees the thread it was enabled on, so code that would hand
+work to a thread checks `capturing()` and runs it inline instead.
+"""
+from contextvars import ContextVar
+from typing import List
+import cProfile
+import os
+import random
+import threading
+import time
+
+ENABLED = os.getenv("PROFILING_ENABLED", "0").lower() in ("1", "true", "yes", "on")
+SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", "0") or 0)
+PROFILE_DIR = os.path.abspath(os.getenv("PROFILE_DIR", "profiles"))
+PROFILE_PATHS = tuple(p.strip() for p in os.getenv("PROFILE_PATHS", "/recommendations").split(",") if p.strip())
+PROFILE_KEEP = int(os.getenv("PROFILE_KEEP", "50"))
+HEADER = b"x-profile"
+
+# cProfile cannot run two profilers on one thread, and every async request
+# shares the event loop thread, so at most one capture runs at a time.
+_active = threading.Lock()
+_capturing: ContextVar[bool] = ContextVar("profiling_capturing", default=False)
+
+
+def capturing() -> bool:
+    """True inside a request that is being profiled."""
+    return _capturing.get()
+
+
+class ProfilingMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] not in PROFILE_PATHS or not _wanted(scope):
+            await self.app(scope, receive, send)
+            return
+        if not _active.acquire(blocking=False):
+            await self.app(scope, receive, send)
+            return
+
+        profiler = cProfile.Profile()
+        start = time.perf_counter()
+        token = _capturing.set(True)
+        try:
+            profiler.enable()
+            try:
+                await self.app(scope, receive, send)
+            finally:
+                profiler.disable()
+                _capturing.reset(token)
+            _dump(profiler, scope["path"], time.perf_counter() - start)
+        finally:
+            _active.release()
+
+
+def _wanted(scope) -> bool:
+    for name, value in scope.get("headers", []):
+        if name == HEADER and value not in (b"0", b"false", b""):
+            return True
+    return SAMPLE_RATE > 0 and random.random() < SAMPLE_RATE
+
+
+def _dump(profiler: cProfile.Profile, path: str, elapsed: float) -> None:
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    slug = path.strip("/").replace("/", "_") or "root"
+    name = f"{time.strftime('%Y%m%dT%H%M%S')}-{slug}-{int(elapsed * 1000)}ms-{os.getpid()}.prof"
+    profiler.dump_stats(os.path.join(PROFILE_DIR, name))
+    _prune()
+
+
+def _prune() -> None:
+    files = list_profiles()
+    for info in files[PROFILE_KEEP:]:
+        try:
+            os.remove(os.path.join(PROFILE_DIR, info["name"]))
+        except OSError:
+            pass
+
+
+def list_profiles() -> List[dict]:
+    """Newest-first listing of captured profiles."""
+    if not os.path.isdir(PROFILE_DIR):
+        return []
+    out = []
+    for name in os.listdir(PROFILE_DIR):
+        if not name.endswith(".prof"):
+            continue
+        st = os.stat(os.path.join(PROFILE_DIR, name))
+        out.append({"name": name, "bytes": st.st_size, "created": st.st_mtime})
+    out.sort(key=lambda x: x["created"], reverse=True)
+    return out
+
+
+def profile_path(name: str):
+    """Resolve a profile name from list_profiles() to a path, or None."""
+    if name != os.path.basename(name) or not name.endswith(".prof"):
+        return None
+    path = os.path.join(PROFILE_DIR, name)
+    return path if os.path.isfile(path) else None
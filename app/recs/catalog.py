@@ -0,0 +1,117 @@
+"""
+In-process product catalog.
+
+Scoring, explanations and /recommendations responses only need a handful of
+product fields, so each process keeps the whole catalog as compact
+`ProductRecord`s (slotted, tags pre-parsed) instead of loading ORM rows per
+request. The catalog is read through on first use and rebuilt when the
+CatalogVersion stamp, bumped by every load and import, changes. Loads in this
+process invalidate it directly; other workers notice within
+CATALOG_VERSION_CHECK_SECONDS, and between checks no query is issued at all.
+
+Catalogs are kept per database engine, so a benchmark or test database never
+sees another's products.
+"""
+from typing import Dict, List, Optional, Tuple
+import os
+import threading
+import time
+import weakref
+
+from sqlmodel import Session, select
+
+from ..db.models import Product
+from ..db.stats import catalog_version
+from ..metrics import cache_hit, cache_miss, span
+from .profiles import parse_tags
+
+VERSION_CHECK_SECONDS = float(os.getenv("CATALOG_VERSION_CHECK_SECONDS", "2"))
+
+
+class ProductRecord:
+    __slots__ = ("id", "name", "description", "price", "popularity", "tags", "tag_keys")
+
+    def __init__(self, id: int, name: str, description: str, price: float, popularity: int, tag_str: Optional[str]):
+        self.id = id
+        self.name = name
+        self.description = description
+        self.price = price
+        self.popularity = popularity
+        # display tags as stored, and the lowercased keys scoring matches on
+        self.tags: Tuple[str, ...] = tuple(t.strip() for t in (tag_str or "").split(",") if t.strip())
+        self.tag_keys: Tuple[str, ...] = tuple(parse_tags(tag_str))
+
+    def __repr__(self) -> str:
+        return f"ProductRecord(id={self.id!r}, name={self.name!r})"
+
+
+class Catalog:
+    def __init__(self, records: List[ProductRecord], version: int):
+        self.products = records  # id order
+        self.by_id: Dict[int, ProductRecord] = {r.id: r for r in records}
+        self.version = version
+        self.checked_at = time.monotonic()
+
+    def get(self, product_id: int) -> Optional[ProductRecord]:
+        return self.by_id.get(product_id)
+
+    def __len__(self) -> int:
+        return len(self.products)
+
+
+def _load(session: Session, version: int) -> Catalog:
+    rows = session.exec(
+        select(Product.id, Product.name, Product.description, Product.price, Product.popularity, Product.tags)
+        .order_by(Product.id)
+    ).all()
+    return Catalog([ProductRecord(*row) for row in rows], version)
+
+
+_catalogs: "weakref.WeakKeyDictionary[object, Catalog]" = weakref.WeakKeyDictionary()
+_pinned: "weakref.WeakKeyDictionary[object, Catalog]" = weakref.WeakKeyDictionary()
+_lock = threading.Lock()
+
+
+def load_catalog(session: Session) -> Catalog:
+    """A fresh, uncached snapshot of the session's catalog."""
+    return _load(session, catalog_version(session))
+
+
+def pin(session: Session, catalog: Catalog) -> None:
+    """Serve `catalog` for the session's database from now on, with no version
+    checks; batch jobs use it to score every user against one snapshot."""
+    with _lock:
+        _pinned[session.get_bind()] = catalog
+
+
+def get_catalog(session: Session) -> Catalog:
+    """The catalog for the session's database, rebuilt if the version moved."""
+    bind = session.get_bind()
+    catalog = _pinned.get(bind)
+    if catalog is not None:
+        return catalog
+    catalog = _catalogs.get(bind)
+    now = time.monotonic()
+    if catalog is not None and now - catalog.checked_at < VERSION_CHECK_SECONDS:
+        cache_hit("catalog")
+        return catalog
+    version = catalog_version(session)
+    if catalog is not None and catalog.version == version:
+        catalog.checked_at = now
+        cache_hit("catalog")
+        return catalog
+
+    cache_miss("catalog")
+    with _lock:
+        catalog = _catalogs.get(bind)
+        if catalog is None or catalog.version != version:
+            with span("catalog.load"):
+                catalog = _catalogs[bind] = _load(session, version)
+        return catalog
+
+
+def invalidate() -> None:
+    """Drop every cached catalog; called after loads in this process.
+    Pinned snapshots stay."""
+    with _lock:
+        _catalogs.clear()
@@ -0,0 +1,49 @@
+"""
+Top-k selection over scored candidates.
+
+Candidates are (score, item, tags) tuples in catalog order. Both selectors
+break score ties by catalog order, matching a stable descending sort.
+"""
+from typing import Dict, Iterable, List, Sequence, Tuple, TypeVar
+import heapq
+
+T = TypeVar("T")
+Candidate = Tuple[float, T, Sequence[str]]
+
+
+def top_k(candidates: Iterable[Candidate], k: int) -> List[Candidate]:
+    """Plain top-k in O(n log k); same result as sorted(..., reverse=True)[:k]."""
+    return heapq.nlargest(k, candidates, key=lambda c: c[0])
+
+
+def diversified_top_k(candidates: Iterable[Candidate], k: int, max_per_tag: int) -> List[Candidate]:
+    """Greedy top-k where no tag appears on more than `max_per_tag` picks.
+
+    The greedy pass only needs the head of the ranking, so it walks a bounded
+    heap top-m (m = 4k, doubled while the caps reject too much) instead of
+    sorting the catalog: O(n log m) with m a small multiple of k. If the caps
+    leave fewer than k picks, the best skipped candidates fill the remainder,
+    so the cap is soft: k results come back whenever k candidates exist.
+    """
+    if k <= 0:
+        return []
+    pool = candidates if isinstance(candidates, list) else list(candidates)
+    m = max(4 * k, 16)
+    while True:
+        head = heapq.nlargest(m, pool, key=lambda c: c[0])
+        picked: List[Candidate] = []
+        skipped: List[Candidate] = []
+        per_tag: Dict[str, int] = {}
+        for cand in head:
+            tags = set(cand[2])
+            if any(per_tag.get(t, 0) >= max_per_tag for t in tags):
+                skipped.append(cand)
+                continue
+            for t in tags:
+                per_tag[t] = per_tag.get(t, 0) + 1
+            picked.append(cand)
+            if len(picked) == k:
+                return picked
+        if m >= len(pool):
+            return picked + skipped[: k - len(picked)]
+        m *= 2
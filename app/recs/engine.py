@@ -1,68 +1,141 @@
-from typing import List, Dict, Optional
-from sqlmodel import Session, select
-from ..db.models import Product, Interaction
-
-
-def recommend_for_user(session: Session, user_id: int, k: int = 5) -> List[Product]:
-    interactions = session.exec(
-        select(Interaction).where(Interaction.user_id == user_id)
-    ).all()
-
-    liked_tags: Dict[str, int] = {}
-    for inter in interactions: # weight events
-        weight = 1
-        if inter.event == "view":
-            weight = 1
-        elif inter.event == "add_to_cart":
-            weight = 3
-        elif inter.event == "purchase":
-            weight = 5
-        product = session.get(Product, inter.product_id)
-        if not product:
-            continue
-        for t in [t.strip().lower() for t in product.tags.split(",") if t.strip()]:
-            liked_tags[t] = liked_tags.get(t, 0) + weight
-
-    products = session.exec(select(Product)).all()
-    scored = []
-    for p in products:
-        p_tags = [t.strip().lower() for t in p.tags.split(",") if t.strip()]
-        tag_score = sum(liked_tags.get(t, 0) for t in p_tags)
-        popularity_boost = min(p.popularity, 10)  # small cap
-        score = tag_score + 0.5 * popularity_boost
-        scored.append((score, p))
-
-    scored.sort(key=lambda x: x[0], reverse=True)
-    return [p for _, p in scored[:k]]
+from typing import Container, List, Dict, Optional
+from dataclasses import dataclass
+from sqlmodel import Session
+from ..metrics import span
+from .catalog import ProductRecord, get_catalog
+from .profiles import user_profile
+from .diversity import diversified_top_k, top_k
+from . import sharded
 
 
-def recommend_from_behavior(
+@dataclass
+class ScoredProduct:
+    product: ProductRecord
+    score: float
+    # product tags that hit the user's profile, in product tag order
+    matched_tags: List[str]
+
+
+def _rank(
+    session: Session,
+    liked_tags: Dict[str, float],
+    k: int,
+    max_per_tag: Optional[int] = None,
+    exclude: Optional[Container[int]] = None,
+) -> List[ScoredProduct]:
+    if sharded.enabled() and not max_per_tag:
+        with sharded.acquire(session) as scorer:
+            if scorer is not None:
+                return _rank_sharded(session, scorer, liked_tags, k, exclude)
+
+    catalog = get_catalog(session)
+    with span("engine.catalog_scan"):
+        # id order makes ties deterministic and matches the sharded scorer
+        scored = []
+        for p in catalog.products:
+            if exclude and p.id in exclude:
+                continue
+            p_tags = p.tag_keys
+            tag_score = sum(liked_tags.get(t, 0) for t in p_tags)
+            popularity_boost = min(p.popularity, 10)  # small cap
+            score = tag_score + 0.5 * popularity_boost
+            scored.append((score, p, p_tags))
+
+    with span("engine.sort"):
+        if max_per_tag:
+            best = diversified_top_k(scored, k, max_per_tag)
+        else:
+            best = top_k(scored, k)
+    return [
+        ScoredProduct(product=p, score=score, matched_tags=[t for t in p_tags if t in liked_tags])
+        for score, p, p_tags in best
+    ]
+
+
+def _rank_sharded(
+    session: Session,
+    scorer: "sharded.ShardedScorer",
+    liked_tags: Dict[str, float],
+    k: int,
+    exclude: Optional[Container[int]] = None,
+) -> List[ScoredProduct]:
+    with span("engine.sharded_scan"):
+        best = scorer.top_k(liked_tags, k, exclude)
+    catalog = scorer.catalog
+    result = []
+    for score, pid in best:
+        p = catalog.get(pid)
+        result.append(ScoredProduct(product=p, score=score, matched_tags=[t for t in p.tag_keys if t in liked_tags]))
+    return result
+
+
+def score_for_user(
+    session: Session,
+    user_id: int,
+    k: int = 5,
+    max_history: Optional[int] = None,
+    max_per_tag: Optional[int] = None,
+    exclude: Optional[Container[int]] = None,
+) -> List[ScoredProduct]:
+    """Top-k products for a user; product ids in `exclude` (e.g. a seen-set) are skipped."""
+    with span("engine.interactions"):
+        # time-decayed, event-weighted tag affinities (see profiles.py)
+        liked_tags = user_profile(session, user_id, max_history)
+    return _rank(session, liked_tags, k, max_per_tag, exclude)
+
+
+def score_profile(
+    session: Session,
+    liked_tags: Dict[str, float],
+    k: int = 5,
+    max_per_tag: Optional[int] = None,
+    exclude: Optional[Container[int]] = None,
+) -> List[ScoredProduct]:
+    """Top-k products for an already loaded tag profile (batch jobs load them in bulk)."""
+    return _rank(session, liked_tags, k, max_per_tag, exclude)
+
+
+def score_from_behavior(
     session: Session,
     product_ids: Optional[List[int]] = None,
     tags: Optional[List[str]] = None,
     k: int = 5,
-) -> List[Product]:
-    liked_tags: Dict[str, int] = {}
+    max_per_tag: Optional[int] = None,
+) -> List[ScoredProduct]:
+    liked_tags: Dict[str, float] = {}
     tags = [t.strip().lower() for t in (tags or []) if t.strip()]
 
-    for pid in product_ids or []:
-        p = session.get(Product, pid)
-        if not p:
-            continue
-        for t in [t.strip().lower() for t in p.tags.split(",") if t.strip()]:
-            liked_tags[t] = liked_tags.get(t, 0) + 2
+    with span("engine.behavior_products"):
+        catalog = get_catalog(session)
+        for pid in product_ids or []:
+            p = catalog.get(pid)
+            if not p:
+                continue
+            for t in p.tag_keys:
+                liked_tags[t] = liked_tags.get(t, 0) + 2
 
     for t in tags:
         liked_tags[t] = liked_tags.get(t, 0) + 3
 
-    products = session.exec(select(Product)).all()
-    scored = []
-    for p in products:
-        p_tags = [t.strip().lower() for t in p.tags.split(",") if t.strip()]
-        tag_score = sum(liked_tags.get(t, 0) for t in p_tags)
-        popularity_boost = min(p.popularity, 10)
-        score = tag_score + 0.5 * popularity_boost
-        scored.append((score, p))
-
-    scored.sort(key=lambda x: x[0], reverse=True)
-    return [p for _, p in scored[:k]]
+    return _rank(session, liked_tags, k, max_per_tag)
+
+
+def recommend_for_user(
+    session: Session,
+    user_id: int,
+    k: int = 5,
+    max_history: Optional[int] = None,
+    max_per_tag: Optional[int] = None,
+    exclude: Optional[Container[int]] = None,
+) -> List[ProductRecord]:
+    return [s.product for s in score_for_user(session, user_id, k, max_history, max_per_tag, exclude)]
+
+
+def recommend_from_behavior(
+    session: Session,
+    product_ids: Optional[List[int]] = None,
+    tags: Optional[List[str]] = None,
+    k: int = 5,
+    max_per_tag: Optional[int] = None,
+) -> List[ProductRecord]:
+    return [s.product for s in score_from_behavior(session, product_ids, tags, k, max_per_tag)]
@@ -0,0 +1,201 @@
+"""
+Time-decayed user tag profiles.
+
+Each event adds its type weight to the tags of the product, and older events
+fade with a half-life of RECS_DECAY_HALF_LIFE_DAYS. Decay is measured back from
+the user's own latest event rather than the wall clock, so a dormant user keeps
+the shape of their profile instead of collapsing to popularity-only results.
+
+Profiles are stored per (user, tag) as a score plus the time it is valid at,
+which lets ingestion fold in a new event in O(tags) without touching history.
+When a user has no stored profile it is derived from at most RECS_MAX_HISTORY
+of their most recent interactions, with compacted aggregates (see
+app/db/compaction.py) standing in for raw events that have been archived.
+"""
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+from datetime import datetime
+from itertools import groupby, islice
+from operator import itemgetter
+import os
+from sqlmodel import Session, select, delete
+from ..db.models import Product, Interaction, InteractionAggregate, UserTagScore
+
+EVENT_WEIGHTS = {"view": 1.0, "add_to_cart": 3.0, "purchase": 5.0}
+HALF_LIFE_DAYS = float(os.getenv("RECS_DECAY_HALF_LIFE_DAYS", "30"))  # <= 0 disables decay
+MAX_HISTORY = int(os.getenv("RECS_MAX_HISTORY", "200"))
+
+
+def parse_tags(tag_str: Optional[str]) -> List[str]:
+    return [t.strip().lower() for t in (tag_str or "").split(",") if t.strip()]
+
+
+def decay(score: float, since: Optional[datetime], until: Optional[datetime]) -> float:
+    """Decay `score` from time `since` forward to `until`."""
+    if HALF_LIFE_DAYS <= 0 or since is None or until is None or until <= since:
+        return score
+    days = (until - since).total_seconds() / 86400.0
+    return score * 0.5 ** (days / HALF_LIFE_DAYS)
+
+
+def _fold(raw: List[tuple], aggregates: List[tuple], limit: int) -> Tuple[Dict[str, float], Optional[datetime]]:
+    """Profile from raw (event, ts, tags) rows, newest first, topped up with
+    compacted (event, last_ts, decayed_count, tags) rows up to `limit` rows."""
+    raw = raw[:limit]
+    aggregates = aggregates[:max(0, limit - len(raw))]
+    anchor = max([ts for _, ts, _ in raw if ts is not None] + [ts for _, ts, _, _ in aggregates if ts is not None], default=None)
+    liked: Dict[str, float] = {}
+    for event, ts, tags in raw:
+        weight = decay(EVENT_WEIGHTS.get(event, 1.0), ts, anchor)
+        for t in parse_tags(tags):
+            liked[t] = liked.get(t, 0.0) + weight
+    for event, ts, decayed_count, tags in aggregates:
+        weight = decay(EVENT_WEIGHTS.get(event, 1.0) * decayed_count, ts, anchor)
+        for t in parse_tags(tags):
+            liked[t] = liked.get(t, 0.0) + weight
+    return liked, anchor
+
+
+def _history(session: Session, user_id: int, limit: int) -> Tuple[Dict[str, float], Optional[datetime]]:
+    raw = session.exec(
+        select(Interaction.event, Interaction.timestamp, Product.tags)
+        .join(Product, Product.id == Interaction.product_id)
+        .where(Interaction.user_id == user_id)
+        .order_by(Interaction.timestamp.desc(), Interaction.id.desc())
+        .limit(limit)
+    ).all()
+    aggregates = []
+    if len(raw) < limit:
+        aggregates = session.exec(
+            select(InteractionAggregate.event, InteractionAggregate.last_timestamp, InteractionAggregate.decayed_count, Product.tags)
+            .join(Product, Product.id == InteractionAggregate.product_id)
+            .where(InteractionAggregate.user_id == user_id)
+            .order_by(InteractionAggregate.last_timestamp.desc())
+            .limit(limit - len(raw))
+        ).all()
+    return _fold(list(raw), list(aggregates), limit)
+
+
+def profile_from_history(session: Session, user_id: int, max_history: Optional[int] = None) -> Dict[str, float]:
+    """Build a profile from the user's latest `max_history` interactions.
+
+    Raw events come first; compacted aggregates fill any remaining rows, so
+    the cost stays bounded however long the user's history is.
+    """
+    return _history(session, user_id, max_history or MAX_HISTORY)[0]
+
+
+def _decayed(rows: List[UserTagScore]) -> Dict[str, float]:
+    anchor = max(r.updated_at for r in rows)
+    return {r.tag: decay(r.score, r.updated_at, anchor) for r in rows}
+
+
+def load_profile(session: Session, user_id: int) -> Optional[Dict[str, float]]:
+    """Stored profile decayed to the user's latest update, or None if absent."""
+    rows = session.exec(select(UserTagScore).where(UserTagScore.user_id == user_id)).all()
+    if not rows:
+        return None
+    return _decayed(rows)
+
+
+def load_profiles(session: Session, first_user_id: int, last_user_id: int) -> Dict[int, Dict[str, float]]:
+    """Stored profiles of every user with an id in [first, last], in one query;
+    users without a stored profile are absent."""
+    rows = session.exec(
+        select(UserTagScore)
+        .where(UserTagScore.user_id >= first_user_id, UserTagScore.user_id <= last_user_id)
+        .order_by(UserTagScore.user_id)
+    )
+    return {user_id: _decayed(list(group)) for user_id, group in groupby(rows, key=lambda r: r.user_id)}
+
+
+def user_profile(session: Session, user_id: int, max_history: Optional[int] = None) -> Dict[str, float]:
+    """Stored profile, or one derived from history when there is none. An
+    explicit `max_history` always derives it, since stored profiles are built
+    with RECS_MAX_HISTORY."""
+    if max_history is not None:
+        return profile_from_history(session, user_id, max_history)
+    profile = load_profile(session, user_id)
+    if profile is None:
+        profile = profile_from_history(session, user_id, max_history)
+    return profile
+
+
+def apply_event(session: Session, user_id: int, tags: Iterable[str], event: str, ts: Optional[datetime] = None) -> None:
+    """Fold one event into the stored profile; the caller adds the event's
+    Interaction first and commits.
+
+    A user without a stored profile (e.g. history from before profiles were
+    stored) is seeded from history instead, which already includes this event.
+    """
+    if session.exec(select(UserTagScore.tag).where(UserTagScore.user_id == user_id).limit(1)).first() is None:
+        liked, anchor = _history(session, user_id, MAX_HISTORY)
+        if liked:
+            stamp = anchor or ts or datetime.utcnow()
+            session.add_all(UserTagScore(user_id=user_id, tag=t, score=sc, updated_at=stamp) for t, sc in liked.items())
+            return
+    ts = ts or datetime.utcnow()
+    weight = EVENT_WEIGHTS.get(event, 1.0)
+    for tag in tags:
+        row = session.get(UserTagScore, (user_id, tag))
+        if row is None:
+            session.add(UserTagScore(user_id=user_id, tag=tag, score=weight, updated_at=ts))
+        elif ts >= row.updated_at:
+            row.score = decay(row.score, row.updated_at, ts) + weight
+            row.updated_at = ts
+            session.add(row)
+        else:
+            # late-arriving event: decay it forward to the row's timestamp
+            row.score += decay(weight, ts, row.updated_at)
+            session.add(row)
+
+
+def _grouped_by_user(rows, limit: int) -> Iterator[Tuple[int, List[tuple]]]:
+    for user_id, group in groupby(rows, key=itemgetter(0)):
+        yield user_id, [r[1:] for r in islice(group, limit)]
+
+
+def _merge_users(raw_groups, agg_groups) -> Iterator[Tuple[int, List[tuple], List[tuple]]]:
+    """Join two user-ordered (user_id, rows) streams into (user_id, raw, aggregates)."""
+    raw_next, agg_next = next(raw_groups, None), next(agg_groups, None)
+    while raw_next is not None or agg_next is not None:
+        if agg_next is None or (raw_next is not None and raw_next[0] < agg_next[0]):
+            yield raw_next[0], raw_next[1], []
+            raw_next = next(raw_groups, None)
+        elif raw_next is None or agg_next[0] < raw_next[0]:
+            yield agg_next[0], [], agg_next[1]
+            agg_next = next(agg_groups, None)
+        else:
+            yield raw_next[0], raw_next[1], agg_next[1]
+            raw_next, agg_next = next(raw_groups, None), next(agg_groups, None)
+
+
+def rebuild_profiles(session: Session, max_history: Optional[int] = None, commit: bool = True) -> int:
+    """Recompute every stored profile from history in one ordered pass; commits
+    unless `commit` is False (the caller's transaction then carries it)."""
+    limit = max_history or MAX_HISTORY
+    session.exec(delete(UserTagScore))
+    raw = session.exec(
+        select(Interaction.user_id, Interaction.event, Interaction.timestamp, Product.tags)
+        .join(Product, Product.id == Interaction.product_id)
+        .order_by(Interaction.user_id, Interaction.timestamp.desc(), Interaction.id.desc())
+        .execution_options(yield_per=5000)
+    )
+    aggregates = session.exec(
+        select(InteractionAggregate.user_id, InteractionAggregate.event, InteractionAggregate.last_timestamp,
+               InteractionAggregate.decayed_count, Product.tags)
+        .join(Product, Product.id == InteractionAggregate.product_id)
+        .order_by(InteractionAggregate.user_id, InteractionAggregate.last_timestamp.desc())
+        .execution_options(yield_per=5000)
+    )
+
+    users = 0
+    for user_id, raw_rows, agg_rows in _merge_users(_grouped_by_user(raw, limit), _grouped_by_user(aggregates, limit)):
+        liked, anchor = _fold(raw_rows, agg_rows, limit)
+        stamp = anchor or datetime.utcnow()
+        session.add_all(UserTagScore(user_id=user_id, tag=t, score=sc, updated_at=stamp) for t, sc in liked.items())
+        users += 1
+    if commit:
+        session.commit()
+    else:
+        session.flush()
+    return users
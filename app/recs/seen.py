@@ -0,0 +1,169 @@
+"""
+Per-user seen-sets for excluding already purchased (and optionally viewed)
+products from recommendations.
+
+Each user's seen products are kept as two sorted int arrays, purchased and
+viewed, in an LRU cache of SEEN_CACHE_SIZE users. A miss loads them with one
+DISTINCT query; after that, membership is a bisect over a few hundred ints
+per candidate with no query at all. POST /interactions folds new events into
+the cached arrays, dataset loads clear the cache, and entries older than
+SEEN_CACHE_TTL seconds are reloaded so other worker processes' ingestion
+shows up eventually. Caches are kept per database engine, like the catalog,
+so evaluation, export and test databases never share entries.
+"""
+from array import array
+from bisect import bisect_left, insort
+from collections import OrderedDict
+from typing import Dict, Iterable, Optional, Tuple
+import os
+import threading
+import time
+import weakref
+
+from sqlmodel import Session, select
+
+from ..db.models import Interaction, InteractionAggregate
+from .. import metrics
+
+CACHE_SIZE = int(os.getenv("SEEN_CACHE_SIZE", "10000"))
+CACHE_TTL = float(os.getenv("SEEN_CACHE_TTL", "60"))
+
+PURCHASE_EVENTS = ("purchase",)
+VIEW_EVENTS = ("view",)
+
+
+def _sorted_array(ids: Iterable[int]) -> array:
+    return array("q", sorted(set(ids)))
+
+
+def _contains(arr: array, pid: int) -> bool:
+    i = bisect_left(arr, pid)
+    return i < len(arr) and arr[i] == pid
+
+
+class SeenSet:
+    __slots__ = ("purchased", "viewed", "loaded_at")
+
+    def __init__(self, purchased: Iterable[int] = (), viewed: Iterable[int] = ()):
+        self.purchased = _sorted_array(purchased)
+        self.viewed = _sorted_array(viewed)
+        self.loaded_at = time.monotonic()
+
+    def add(self, product_id: int, event: str) -> None:
+        arr = self.purchased if event in PURCHASE_EVENTS else self.viewed if event in VIEW_EVENTS else None
+        if arr is not None and not _contains(arr, product_id):
+            insort(arr, product_id)
+
+    def exclusion(self, purchased: bool = True, viewed: bool = False) -> "Exclusion":
+        arrays = tuple(a for a, on in ((self.purchased, purchased), (self.viewed, viewed)) if on and a)
+        return Exclusion(arrays)
+
+
+class Exclusion:
+    """Container view over the selected seen arrays, used as `pid in exclusion`."""
+
+    __slots__ = ("_arrays",)
+
+    def __init__(self, arrays: Tuple[array, ...] = ()):
+        self._arrays = arrays
+
+    def __contains__(self, pid: int) -> bool:
+        return any(_contains(a, pid) for a in self._arrays)
+
+    def __iter__(self):
+        for a in self._arrays:
+            yield from a
+
+    def __bool__(self) -> bool:
+        return bool(self._arrays)
+
+    def __len__(self) -> int:
+        return sum(len(a) for a in self._arrays)
+
+
+_caches: "weakref.WeakKeyDictionary[object, OrderedDict[int, SeenSet]]" = weakref.WeakKeyDictionary()
+_lock = threading.Lock()
+
+
+def _load(session: Session, user_id: int) -> SeenSet:
+    events = PURCHASE_EVENTS + VIEW_EVENTS
+    rows = session.exec(
+        select(Interaction.product_id, Interaction.event)
+        .where(Interaction.user_id == user_id, Interaction.event.in_(events))
+        .union(
+            select(InteractionAggregate.product_id, InteractionAggregate.event)
+            .where(InteractionAggregate.user_id == user_id, InteractionAggregate.event.in_(events))
+        )
+    ).all()
+    return SeenSet(
+        purchased=(pid for pid, event in rows if event in PURCHASE_EVENTS),
+        viewed=(pid for pid, event in rows if event in VIEW_EVENTS),
+    )
+
+
+def load_range(session: Session, first_user_id: int, last_user_id: int) -> Dict[int, SeenSet]:
+    """Uncached seen-sets of every user with an id in [first, last] that has
+    seen anything, in one query; for batch jobs walking all users."""
+    events = PURCHASE_EVENTS + VIEW_EVENTS
+    rows = session.exec(
+        select(Interaction.user_id, Interaction.product_id, Interaction.event)
+        .where(Interaction.user_id >= first_user_id, Interaction.user_id <= last_user_id, Interaction.event.in_(events))
+        .union(
+            select(InteractionAggregate.user_id, InteractionAggregate.product_id, InteractionAggregate.event)
+            .where(
+                InteractionAggregate.user_id >= first_user_id,
+                InteractionAggregate.user_id <= last_user_id,
+                InteractionAggregate.event.in_(events),
+            )
+        )
+    ).all()
+    grouped: Dict[int, Tuple[list, list]] = {}
+    for user_id, pid, event in rows:
+        purchased, viewed = grouped.setdefault(user_id, ([], []))
+        (purchased if event in PURCHASE_EVENTS else viewed).append(pid)
+    return {user_id: SeenSet(purchased, viewed) for user_id, (purchased, viewed) in grouped.items()}
+
+
+def seen_set(session: Session, user_id: int) -> SeenSet:
+    """The user's cached seen-set, loading it on a miss or after CACHE_TTL."""
+    bind = session.get_bind()
+    now = time.monotonic()
+    with _lock:
+        users = _caches.get(bind)
+        entry = users.get(user_id) if users is not None else None
+        if entry is not None and now - entry.loaded_at < CACHE_TTL:
+            users.move_to_end(user_id)
+            metrics.cache_hit("seen_set")
+            return entry
+    metrics.cache_miss("seen_set")
+    entry = _load(session, user_id)
+    with _lock:
+        users = _caches.get(bind)
+        if users is None:
+            users = _caches[bind] = OrderedDict()
+        users[user_id] = entry
+        users.move_to_end(user_id)
+        while len(users) > CACHE_SIZE:
+            users.popitem(last=False)
+    return entry
+
+
+def exclusion_for(session: Session, user_id: int, purchased: bool = True, viewed: bool = False) -> Optional[Exclusion]:
+    if not (purchased or viewed):
+        return None
+    return seen_set(session, user_id).exclusion(purchased, viewed)
+
+
+def record(binds: Iterable[object], user_id: int, product_id: int, event: str) -> None:
+    """Fold a newly ingested event into the user's cached seen-set for each of
+    `binds` (the primary and its read replicas), where cached."""
+    with _lock:
+        for bind in binds:
+            entry = _caches[bind].get(user_id) if bind in _caches else None
+            if entry is not None:
+                entry.add(product_id, event)
+
+
+def clear() -> None:
+    with _lock:
+        _caches.clear()
@@ -0,0 +1,183 @@
+"""
+Sharded catalog scoring across worker processes (RECS_SHARDS > 1).
+
+The catalog is packed once into a single shared-memory block as flat arrays
+(product ids, popularity boosts, CSR tag offsets and interned tag ids), and a
+spawned pool of RECS_SHARDS workers attaches to it without copying. A request
+converts the liked-tag weights to tag ids, scatters one contiguous slice per
+shard, each shard returns its local top-k, and the parent merges them with a
+heap. Scores are computed in the same order as `engine._rank`, and ties break
+by catalog (product id) order on both sides, so results are identical to the
+single-process engine.
+
+Per-tag diversity caps need more than a local top-k from each shard, so
+`_rank` keeps those requests in-process. The packed block is built from the
+in-process catalog (catalog.py): one scorer per database, rebuilt when that
+database's catalog version moves. A replaced scorer keeps its workers until
+the calls already using it have finished.
+"""
+from array import array
+from contextlib import contextmanager
+from typing import Dict, FrozenSet, Iterable, Iterator, List, Optional, Tuple
+import heapq
+import os
+import threading
+
+from sqlmodel import Session
+
+from .catalog import Catalog, get_catalog
+
+SHARDS = int(os.getenv("RECS_SHARDS", "0"))  # 0/1 = score in-process
+MIN_PRODUCTS = int(os.getenv("RECS_SHARD_MIN_PRODUCTS", "50000"))  # smaller catalogs stay in-process
+
+_views: Optional[Tuple[memoryview, ...]] = None
+_shm = None
+
+
+def _layout(n: int, nnz: int) -> List[Tuple[str, int, int]]:
+    """(typecode, byte offset, length) of ids, boosts, offsets and tag ids in the block."""
+    parts = [("q", n), ("d", n), ("q", n + 1), ("i", nnz)]
+    out, pos = [], 0
+    for code, length in parts:
+        out.append((code, pos, length))
+        pos += array(code).itemsize * length
+    return out
+
+
+def _attach(name: str, n: int, nnz: int) -> None:
+    global _shm, _views
+    from multiprocessing import shared_memory
+    try:
+        _shm = shared_memory.SharedMemory(name=name, track=False)  # Python 3.13+
+    except TypeError:
+        # older Pythons register the block again, but spawned workers share
+        # the parent's resource tracker, so the parent's unlink still settles it
+        _shm = shared_memory.SharedMemory(name=name)
+    buf = _shm.buf
+    _views = tuple(
+        buf[pos:pos + array(code).itemsize * length].cast(code) for code, pos, length in _layout(n, nnz)
+    )
+
+
+def _score_shard(start: int, end: int, weights: Dict[int, float], k: int, exclude: FrozenSet[int]) -> List[Tuple[float, int]]:
+    """Local top-k of catalog rows [start, end) as (score, row) pairs."""
+    ids, boosts, offsets, tags = _views
+    get = weights.get
+
+    def scored():
+        for i in range(start, end):
+            if exclude and ids[i] in exclude:
+                continue
+            yield sum(get(tags[j], 0) for j in range(offsets[i], offsets[i + 1])) + boosts[i], i
+
+    return heapq.nlargest(k, scored(), key=lambda r: (r[0], -r[1]))
+
+
+class ShardedScorer:
+    def __init__(self, catalog: Catalog, shards: int = SHARDS):
+        self.catalog = catalog
+        self.tag_ids: Dict[str, int] = {}
+        ids, boosts, offsets, tags = array("q"), array("d"), array("q", [0]), array("i")
+        for p in catalog.products:
+            ids.append(p.id)
+            boosts.append(0.5 * min(p.popularity, 10))  # same boost as engine._rank
+            for t in p.tag_keys:
+                tags.append(self.tag_ids.setdefault(t, len(self.tag_ids)))
+            offsets.append(len(tags))
+        self.product_ids = ids
+        self.n = len(ids)
+
+        import multiprocessing
+        from multiprocessing import shared_memory
+        from concurrent.futures import ProcessPoolExecutor
+        layout = _layout(self.n, len(tags))
+        size = max(1, layout[-1][1] + tags.itemsize * len(tags))
+        self._shm = shared_memory.SharedMemory(create=True, size=size)
+        for arr, (_, pos, _) in zip((ids, boosts, offsets, tags), layout):
+            raw = arr.tobytes()
+            self._shm.buf[pos:pos + len(raw)] = raw
+
+        self.shards = max(1, shards)
+        step = -(-self.n // self.shards) if self.n else 1
+        self.ranges = [(lo, min(lo + step, self.n)) for lo in range(0, self.n, step)] or [(0, 0)]
+        self._executor = ProcessPoolExecutor(
+            max_workers=self.shards,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_attach,
+            initargs=(self._shm.name, self.n, len(tags)),
+        )
+        self._refs = 0  # calls in flight, guarded by the module lock
+        self._retired = False
+
+    def top_k(self, liked_tags: Dict[str, float], k: int, exclude: Optional[Iterable[int]] = None) -> List[Tuple[float, int]]:
+        """Global top-k as (score, product_id), best first."""
+        weights = {self.tag_ids[t]: w for t, w in liked_tags.items() if t in self.tag_ids}
+        excluded = frozenset(exclude) if exclude else frozenset()
+        futures = [self._executor.submit(_score_shard, lo, hi, weights, k, excluded) for lo, hi in self.ranges]
+        merged = heapq.nlargest(k, (r for f in futures for r in f.result()), key=lambda r: (r[0], -r[1]))
+        return [(score, self.product_ids[row]) for score, row in merged]
+
+    def close(self) -> None:
+        self._executor.shutdown(wait=True, cancel_futures=True)
+        self._shm.close()
+        self._shm.unlink()
+
+
+_scorers: Dict[object, ShardedScorer] = {}  # by bind
+_lock = threading.Lock()
+
+
+def enabled() -> bool:
+    return SHARDS > 1
+
+
+def _retire(scorer: ShardedScorer) -> None:
+    """Close `scorer` once no call is using it; the caller has unlisted it."""
+    with _lock:
+        scorer._retired = True
+        idle = scorer._refs == 0
+    if idle:
+        scorer.close()
+
+
+def _release(scorer: ShardedScorer) -> None:
+    with _lock:
+        scorer._refs -= 1
+        idle = scorer._retired and scorer._refs == 0
+    if idle:
+        scorer.close()
+
+
+@contextmanager
+def acquire(session: Session) -> Iterator[Optional[ShardedScorer]]:
+    """The scorer for the session's database and its current catalog, kept
+    open for the block; None when the catalog is too small to be worth sharding."""
+    catalog = get_catalog(session)
+    bind = session.get_bind()
+    stale = None
+    with _lock:
+        scorer = _scorers.get(bind)
+        if scorer is None or scorer.catalog.version != catalog.version:
+            stale = _scorers.pop(bind, None)
+            scorer = None
+            if len(catalog) >= MIN_PRODUCTS:
+                scorer = _scorers[bind] = ShardedScorer(catalog)
+        if scorer is not None:
+            scorer._refs += 1
+    if stale is not None:
+        _retire(stale)
+    try:
+        yield scorer
+    finally:
+        if scorer is not None:
+            _release(scorer)
+
+
+def reset() -> None:
+    """Drop every packed catalog; workers exit once their in-flight calls are
+    done, and the next request rebuilds them."""
+    with _lock:
+        stale = list(_scorers.values())
+        _scorers.clear()
+    for scorer in stale:
+        _retire(scorer)
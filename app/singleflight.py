@@ -0,0 +1,55 @@
+"""
+Request coalescing ("single flight") for async work.
+
+While a call for a key is in flight, further callers with the same key await
+the same future instead of starting their own, so a burst of identical
+/recommendations requests runs the engine and each LLM prompt once. Nothing
+is kept after the call finishes; this is deduplication, not caching (see
+app/cache.py for that).
+
+Futures belong to an event loop, so in-flight calls are tracked per loop.
+"""
+from typing import Awaitable, Callable, Dict, Hashable, TypeVar
+import asyncio
+import weakref
+
+from .metrics import singleflight_call
+
+T = TypeVar("T")
+
+
+class SingleFlight:
+    def __init__(self, name: str):
+        self.name = name
+        self._loops: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[Hashable, asyncio.Future]]" = weakref.WeakKeyDictionary()
+
+    def _inflight(self) -> Dict[Hashable, asyncio.Future]:
+        loop = asyncio.get_running_loop()
+        calls = self._loops.get(loop)
+        if calls is None:
+            calls = self._loops[loop] = {}
+        return calls
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[T]]) -> T:
+        """Run `fn()` for `key`, or join the run already in flight for it.
+
+        The shared future is shielded, so a caller that is cancelled (client
+        disconnect) does not cancel the work for everyone else.
+        """
+        calls = self._inflight()
+        fut = calls.get(key)
+        if fut is not None:
+            singleflight_call(self.name, leader=False)
+            return await asyncio.shield(fut)
+
+        singleflight_call(self.name, leader=True)
+        fut = asyncio.ensure_future(fn())
+        calls[key] = fut
+        fut.add_done_callback(lambda f: calls.pop(key, None) if calls.get(key) is f else None)
+        return await asyncio.shield(fut)
+
+    def in_flight(self) -> int:
+        try:
+            return len(self._inflight())
+        except RuntimeError:  # no running loop
+            return 0
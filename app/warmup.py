@@ -0,0 +1,116 @@
+"""
+Startup warm-up and readiness.
+
+On startup a warm-up thread connects to the database, loads the selected LLM
+backend, builds the in-process product catalog, exercises the engine's read
+path and finally runs one synthetic /recommendations request end to end.
+`/ready` reports 503 until that has succeeded, so a load balancer only sends
+traffic to warm workers; `/health` stays a constant-time liveness check.
+
+WARMUP_ON_STARTUP selects the mode:
+  background (default)  warm up in a thread, serve /health meanwhile
+  blocking              hold startup until warm-up finishes
+  off                   skip it and report ready right away
+Failed runs are retried with backoff.
+"""
+import logging
+import os
+import threading
+import time
+from typing import Callable, Dict, Optional
+
+from sqlmodel import Session, select
+
+from .db.database import engine, init_db, read_engines
+from .db.models import Product
+
+log = logging.getLogger(__name__)
+
+_mode = os.getenv("WARMUP_ON_STARTUP", "background").lower()
+MODE = {"1": "blocking", "true": "blocking", "0": "off", "false": "off", "no": "off"}.get(_mode, _mode)
+RETRY_MAX_SECONDS = float(os.getenv("WARMUP_RETRY_MAX_SECONDS", "30"))
+
+_ready = threading.Event()
+_state: Dict[str, object] = {"state": "starting", "attempts": 0, "steps": {}, "error": None}
+_thread: Optional[threading.Thread] = None
+
+
+def _warm_llm() -> None:
+    from .llm import explainer, hf_worker
+    if explainer._want_openai():
+        import openai  # noqa: F401  (import cost only; no request is made)
+    elif explainer.BACKEND == "hf":
+        if hf_worker.WORKER_MODE == "process":
+            hf_worker.get_pool().warm()
+        else:
+            explainer._get_hf_pipeline()
+
+
+def _warm_catalog() -> None:
+    from .recs.catalog import get_catalog
+    for db_engine in [engine, *read_engines]:  # one catalog per engine
+        with Session(db_engine) as session:
+            get_catalog(session)
+
+
+def _warm_engine() -> None:
+    from .recs.engine import score_from_behavior
+    with Session(engine) as session:
+        first = session.exec(select(Product.id).limit(1)).first()
+        score_from_behavior(session, [first] if first is not None else [], ["warmup"], k=1)
+
+
+def warm_up(synthetic: Optional[Callable[[], None]] = None) -> Dict[str, float]:
+    """Run each warm-up step and return its duration in seconds; raises on failure."""
+    steps = [("db", init_db), ("llm", _warm_llm), ("catalog", _warm_catalog), ("engine", _warm_engine)]
+    if synthetic is not None:
+        steps.append(("synthetic_recommendation", synthetic))
+    timings: Dict[str, float] = {}
+    for name, step in steps:
+        start = time.perf_counter()
+        step()
+        timings[name] = round(time.perf_counter() - start, 4)
+    log.info("warm-up finished: %s", timings)
+    return timings
+
+
+def _run(synthetic: Optional[Callable[[], None]]) -> None:
+    delay = 1.0
+    while True:
+        _state["state"] = "warming"
+        _state["attempts"] = int(_state["attempts"]) + 1
+        try:
+            _state["steps"] = warm_up(synthetic)
+            _state["error"] = None
+            _state["state"] = "ready"
+            _ready.set()
+            return
+        except Exception as e:
+            log.exception("warm-up failed; retrying in %.0fs", delay)
+            _state["state"] = "retrying"
+            _state["error"] = str(e)
+            time.sleep(delay)
+            delay = min(delay * 2, RETRY_MAX_SECONDS)
+
+
+def start(synthetic: Optional[Callable[[], None]] = None) -> None:
+    """Kick off warm-up according to MODE; called from the app's startup hook."""
+    global _thread
+    if MODE == "off":
+        _state["state"] = "ready"
+        _ready.set()
+        return
+    if _thread is not None and _thread.is_alive():
+        return
+    _thread = threading.Thread(target=_run, args=(synthetic,), name="warmup", daemon=True)
+    _thread.start()
+    if MODE == "blocking":
+        _thread.join()
+
+
+def is_ready() -> bool:
+    return _ready.is_set()
+
+
+def status() -> Dict[str, object]:
+    return {"ready": _ready.is_set(), **_state}
@@ -0,0 +1,41 @@
+"""
+End-to-end API benchmarks through FastAPI's TestClient.
+
+The app binds its engine to DATABASE_URL at import time, so `run.py` points
+DATABASE_URL at a scratch SQLite file and forces LLM_BACKEND=none (the
+deterministic explainer) before this module imports `app.main`.
+"""
+import random
+from typing import Dict
+
+from .fixtures import TAG_VOCAB, make_dataset, seed_engine
+from .harness import flatten, time_calls
+
+
+def run(size: int, repeat: int = 20, k: int = 5) -> Dict[str, float]:
+    from fastapi.testclient import TestClient
+    from app.db.database import engine
+    from app.main import app
+
+    n_users = max(10, size // 10)
+    seed_engine(engine, make_dataset(size, n_users, size * 5))
+    rng = random.Random(size)
+    results: Dict[str, float] = {}
+
+    with TestClient(app) as client:
+        def by_user():
+            r = client.post("/recommendations", json={"user_id": rng.randint(1, n_users), "k": k})
+            r.raise_for_status()
+
+        def by_behavior():
+            body = {"user_behavior": {"product_ids": [rng.randint(1, size)], "tags": rng.sample(TAG_VOCAB, 2)}, "k": k}
+            r = client.post("/recommendations", json=body)
+            r.raise_for_status()
+
+        def active_users():
+            client.get("/active-users").raise_for_status()
+
+        results.update(flatten(f"api.recommendations_user[{size}]", time_calls(by_user, repeat)))
+        results.update(flatten(f"api.recommendations_behavior[{size}]", time_calls(by_behavior, repeat)))
+        results.update(flatten(f"api.active_users[{size}]", time_calls(active_users, repeat)))
+    return results
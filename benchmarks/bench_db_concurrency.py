@@ -0,0 +1,102 @@
+"""
+Mixed read/write concurrency on SQLite: default rollback journal vs the tuned
+PRAGMAs from app.db.database (WAL, synchronous=NORMAL, mmap, cache).
+
+Reader threads run the engine's catalog-plus-profile read path while writer
+threads insert interactions and commit one at a time, as /interactions does.
+"""
+import os
+import random
+import threading
+import time
+from datetime import datetime
+from typing import Dict, List
+
+from sqlmodel import Session
+
+from app.db.database import build_engine
+from app.db.models import Interaction
+from app.recs.engine import recommend_for_user
+from .fixtures import make_dataset, seed_engine
+from .harness import summarize
+
+DEFAULT_PRAGMAS = {"busy_timeout": "5000"}  # stock SQLite apart from waiting on locks
+
+
+def _run_mix(db_engine, n_users: int, n_products: int, readers: int, writers: int, duration: float) -> Dict[str, float]:
+    stop = time.perf_counter() + duration
+    read_lat: List[float] = []
+    write_lat: List[float] = []
+    errors = [0]
+    lock = threading.Lock()
+
+    def reader(seed: int):
+        rng = random.Random(seed)
+        with Session(db_engine) as session:
+            while time.perf_counter() < stop:
+                start = time.perf_counter()
+                try:
+                    recommend_for_user(session, rng.randint(1, n_users), 5)
+                    session.rollback()  # end the read transaction like a request would
+                except Exception:
+                    errors[0] += 1
+                    session.rollback()
+                    continue
+                with lock:
+                    read_lat.append((time.perf_counter() - start) * 1000.0)
+
+    def writer(seed: int):
+        rng = random.Random(seed)
+        while time.perf_counter() < stop:
+            start = time.perf_counter()
+            try:
+                with Session(db_engine) as session:
+                    session.add(Interaction(
+                        user_id=rng.randint(1, n_users),
+                        product_id=rng.randint(1, n_products),
+                        event="view",
+                        timestamp=datetime.utcnow(),
+                    ))
+                    session.commit()
+            except Exception:
+                errors[0] += 1
+                continue
+            with lock:
+                write_lat.append((time.perf_counter() - start) * 1000.0)
+
+    threads = [threading.Thread(target=reader, args=(i,)) for i in range(readers)]
+    threads += [threading.Thread(target=writer, args=(1000 + i,)) for i in range(writers)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    out: Dict[str, float] = {
+        "reads_per_sec": round(len(read_lat) / duration, 1),
+        "writes_per_sec": round(len(write_lat) / duration, 1),
+        "errors": errors[0],
+    }
+    if read_lat:
+        stats = summarize(read_lat)
+        out["read_p50_ms"], out["read_p95_ms"] = stats["p50_ms"], stats["p95_ms"]
+    if write_lat:
+        stats = summarize(write_lat)
+        out["write_p50_ms"], out["write_p95_ms"] = stats["p50_ms"], stats["p95_ms"]
+    return out
+
+
+def run(workdir: str, size: int = 1000, readers: int = 4, writers: int = 2, duration: float = 3.0) -> Dict[str, float]:
+    n_users = max(10, size // 10)
+    dataset = make_dataset(size, n_users, size * 5)
+    results: Dict[str, float] = {}
+    for label, pragmas in (("default", DEFAULT_PRAGMAS), ("tuned", None)):
+        path = os.path.join(workdir, f"concurrency_{label}.db")
+        for suffix in ("", "-wal", "-shm"):
+            if os.path.exists(path + suffix):
+                os.remove(path + suffix)
+        db_engine = build_engine(f"sqlite:///{path}", sqlite_pragmas=pragmas)
+        seed_engine(db_engine, dataset)
+        mix = _run_mix(db_engine, n_users, size, readers, writers, duration)
+        db_engine.dispose()
+        results.update({f"db.concurrency.{label}[{size}].{k}": v for k, v in mix.items()})
+    return results
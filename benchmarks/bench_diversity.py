@@ -0,0 +1,22 @@
+"""
+Cost of top-k selection over scored candidates: full sort (the old engine
+path), heap top-k, and diversified top-k with per-tag caps.
+"""
+import random
+from typing import Dict, Iterable
+
+from app.recs.diversity import diversified_top_k, top_k
+from .fixtures import TAG_VOCAB
+from .harness import flatten, time_calls
+
+
+def run(sizes: Iterable[int], repeat: int = 20, k: int = 10) -> Dict[str, float]:
+    results: Dict[str, float] = {}
+    for size in sizes:
+        rng = random.Random(size)
+        cands = [(rng.random() * 50, i, rng.sample(TAG_VOCAB, rng.randint(2, 5))) for i in range(size)]
+        results.update(flatten(f"select.full_sort[{size}]", time_calls(lambda: sorted(cands, key=lambda c: c[0], reverse=True)[:k], repeat)))
+        results.update(flatten(f"select.top_k[{size}]", time_calls(lambda: top_k(cands, k), repeat)))
+        for cap in (1, 3):
+            results.update(flatten(f"select.diversified_cap{cap}[{size}]", time_calls(lambda: diversified_top_k(cands, k, cap), repeat)))
+    return results
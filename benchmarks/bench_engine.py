@@ -0,0 +1,40 @@
+"""
+Engine benchmarks: `recommend_for_user` and `recommend_from_behavior` across
+catalog sizes, against a freshly seeded SQLite file per size.
+"""
+import os
+import random
+from typing import Dict, Iterable
+
+from sqlmodel import Session
+
+from app.recs.engine import recommend_for_user, recommend_from_behavior
+from .fixtures import TAG_VOCAB, make_dataset, seed_engine, sqlite_engine
+from .harness import flatten, time_calls
+
+
+def run(workdir: str, sizes: Iterable[int], repeat: int = 20, k: int = 5) -> Dict[str, float]:
+    results: Dict[str, float] = {}
+    for size in sizes:
+        n_users = max(10, size // 10)
+        dataset = make_dataset(size, n_users, size * 5)
+        db_engine = sqlite_engine(os.path.join(workdir, f"engine_{size}.db"))
+        seed_engine(db_engine, dataset)
+        rng = random.Random(size)
+
+        with Session(db_engine) as session:
+            def for_user():
+                recommend_for_user(session, rng.randint(1, n_users), k)
+
+            def from_behavior():
+                recommend_from_behavior(
+                    session,
+                    product_ids=[rng.randint(1, size) for _ in range(3)],
+                    tags=rng.sample(TAG_VOCAB, 2),
+                    k=k,
+                )
+
+            results.update(flatten(f"engine.recommend_for_user[{size}]", time_calls(for_user, repeat)))
+            results.update(flatten(f"engine.recommend_from_behavior[{size}]", time_calls(from_behavior, repeat)))
+        db_engine.dispose()
+    return results
@@ -0,0 +1,33 @@
+"""
+CSV import throughput through the same code path as the API's CSV import.
+"""
+import os
+import time
+from typing import Dict, Iterable
+
+from sqlmodel import SQLModel, Session
+
+from .fixtures import make_dataset, sqlite_engine, write_csvs
+
+
+def run(workdir: str, sizes: Iterable[int]) -> Dict[str, float]:
+    from app.main import _import_csv_files
+
+    results: Dict[str, float] = {}
+    for size in sizes:
+        data_dir = os.path.join(workdir, f"csv_{size}")
+        dataset = make_dataset(max(10, size // 10), max(10, size // 20), size)
+        write_csvs(data_dir, dataset)
+        rows = sum(len(v) for v in dataset.values())
+
+        db_engine = sqlite_engine(os.path.join(workdir, f"import_{size}.db"))
+        SQLModel.metadata.create_all(db_engine)
+        with Session(db_engine) as session:
+            start = time.perf_counter()
+            _import_csv_files(session, data_dir)
+            elapsed = time.perf_counter() - start
+        db_engine.dispose()
+
+        results[f"import.csv[{size}].seconds"] = round(elapsed, 4)
+        results[f"import.csv[{size}].rows_per_sec"] = round(rows / elapsed, 1)
+    return results
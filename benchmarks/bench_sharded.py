@@ -0,0 +1,43 @@
+"""
+Scaling of sharded catalog scoring: the in-process engine scan against the
+shared-memory scorer with 1..N worker processes on one large catalog. Every
+sharded run is checked against the in-process ranking first.
+"""
+import os
+import random
+from typing import Dict, Iterable
+
+from sqlmodel import Session
+
+from app.recs import engine, sharded
+from app.recs.catalog import get_catalog
+from .fixtures import TAG_VOCAB, make_dataset, seed_engine, sqlite_engine
+from .harness import flatten, time_calls
+
+
+def run(workdir: str, size: int, shard_counts: Iterable[int], repeat: int = 10, k: int = 10) -> Dict[str, float]:
+    results: Dict[str, float] = {}
+    db_engine = sqlite_engine(os.path.join(workdir, f"sharded_{size}.db"))
+    seed_engine(db_engine, make_dataset(size, 10, 10))
+    rng = random.Random(size)
+    queries = [{t: rng.choice([1.0, 2.0, 3.0]) for t in rng.sample(TAG_VOCAB, 4)} for _ in range(repeat)]
+
+    def cycle(fn):
+        it = iter(queries * 2)
+        return lambda: fn(next(it))
+
+    with Session(db_engine) as session:
+        expected = [[(s.product.id, s.score) for s in engine._rank(session, q, k)] for q in queries[:3]]
+        results.update(flatten(f"sharded.in_process[{size}]", time_calls(cycle(lambda q: engine._rank(session, q, k)), repeat)))
+
+        for n in shard_counts:
+            scorer = sharded.ShardedScorer(get_catalog(session), shards=n)
+            try:
+                got = [[(pid, score) for score, pid in scorer.top_k(q, k)] for q in queries[:3]]  # also warms the pool
+                if got != expected:
+                    raise AssertionError(f"sharded ranking with {n} shards differs from the in-process engine")
+                results.update(flatten(f"sharded.shards{n}[{size}]", time_calls(cycle(lambda q: scorer.top_k(q, k)), repeat)))
+            finally:
+                scorer.close()
+    db_engine.dispose()
+    return results
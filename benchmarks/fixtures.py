@@ -0,0 +1,87 @@
+"""
+Deterministic synthetic datasets for the benchmarks.
+"""
+import csv
+import os
+import random
+from datetime import datetime, timedelta
+from typing import Dict, List
+
+from sqlmodel import SQLModel, Session, create_engine
+
+from app.db.models import Product, User, Interaction
+
+TAG_VOCAB = [
+    "electronics", "phone", "audio", "laptop", "tablet", "apple", "samsung", "sony",
+    "fitness", "running", "shoes", "yoga", "strength", "outdoor", "hiking", "backpack",
+    "home", "kitchen", "appliance", "coffee", "cleaning", "fashion", "clothing", "jacket",
+    "books", "reading", "gaming", "console", "portable", "wearable", "watch", "tv",
+]
+EVENTS = ["view", "view", "view", "add_to_cart", "purchase"]
+
+
+def make_dataset(n_products: int, n_users: int, n_interactions: int, seed: int = 42) -> Dict[str, List[dict]]:
+    rng = random.Random(seed)
+    products = []
+    for i in range(1, n_products + 1):
+        tags = rng.sample(TAG_VOCAB, rng.randint(2, 5))
+        products.append({
+            "id": i,
+            "name": f"Product {i}",
+            "description": f"Synthetic product {i}",
+            "price": round(rng.uniform(5, 2000), 2),
+            "tags": ",".join(tags),
+            "popularity": rng.randint(0, 100),
+        })
+    users = [{"id": i, "name": f"User {i}"} for i in range(1, n_users + 1)]
+    base = datetime(2025, 1, 1)
+    interactions = []
+    for i in range(1, n_interactions + 1):
+        interactions.append({
+            "id": i,
+            "user_id": rng.randint(1, n_users),
+            "product_id": rng.randint(1, n_products),
+            "event": rng.choice(EVENTS),
+            "timestamp": (base + timedelta(minutes=i)).strftime("%Y-%m-%dT%H:%M:%SZ"),
+        })
+    return {"products": products, "users": users, "interactions": interactions}
+
+
+def seed_engine(db_engine, dataset: Dict[str, List[dict]]) -> None:
+    SQLModel.metadata.create_all(db_engine)
+    with Session(db_engine) as session:
+        session.add_all(Product(**p) for p in dataset["products"])
+        session.add_all(User(**u) for u in dataset["users"])
+        session.commit()
+        session.add_all(
+            Interaction(
+                id=it["id"],
+                user_id=it["user_id"],
+                product_id=it["product_id"],
+                event=it["event"],
+                timestamp=datetime.strptime(it["timestamp"], "%Y-%m-%dT%H:%M:%SZ"),
+            )
+            for it in dataset["interactions"]
+        )
+        session.commit()
+
+
+def sqlite_engine(path: str):
+    if os.path.exists(path):
+        os.remove(path)
+    return create_engine(f"sqlite:///{path}", connect_args={"check_same_thread": False})
+
+
+def write_csvs(data_dir: str, dataset: Dict[str, List[dict]]) -> None:
+    os.makedirs(data_dir, exist_ok=True)
+    layout = {
+        "products.csv": ["id", "name", "description", "price", "tags", "popularity"],
+        "users.csv": ["id", "name"],
+        "interactions.csv": ["id", "user_id", "product_id", "event", "timestamp"],
+    }
+    for name, fields in layout.items():
+        rows = dataset[name.split(".")[0]]
+        with open(os.path.join(data_dir, name), "w", newline="", encoding="utf-8") as f:
+            writer = csv.DictWriter(f, fieldnames=fields)
+            writer.writeheader()
+            writer.writerows(rows)
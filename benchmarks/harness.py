@@ -0,0 +1,90 @@
+"""
+Small timing harness shared by the benchmark suites.
+
+Each suite returns a flat dict of metric name -> value; `run.py` merges them,
+writes JSON and checks the result against `thresholds.json`.
+"""
+import json
+import os
+import statistics
+import time
+from typing import Callable, Dict, List, Optional
+
+
+def time_calls(fn: Callable[[], object], repeat: int = 20, warmup: int = 2) -> Dict[str, float]:
+    """Call `fn` repeatedly and return latency stats in milliseconds."""
+    for _ in range(warmup):
+        fn()
+    samples: List[float] = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000.0)
+    return summarize(samples)
+
+
+def summarize(samples_ms: List[float]) -> Dict[str, float]:
+    ordered = sorted(samples_ms)
+    return {
+        "mean_ms": round(statistics.fmean(ordered), 4),
+        "p50_ms": round(percentile(ordered, 50), 4),
+        "p95_ms": round(percentile(ordered, 95), 4),
+        "p99_ms": round(percentile(ordered, 99), 4),
+        "min_ms": round(ordered[0], 4),
+        "n": len(ordered),
+    }
+
+
+def percentile(ordered: List[float], pct: float) -> float:
+    if not ordered:
+        return 0.0
+    idx = min(len(ordered) - 1, max(0, int(round(pct / 100.0 * (len(ordered) - 1)))))
+    return ordered[idx]
+
+
+def flatten(prefix: str, stats: Dict[str, float]) -> Dict[str, float]:
+    return {f"{prefix}.{key}": value for key, value in stats.items()}
+
+
+def load_json(path: str) -> dict:
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def write_json(path: str, payload: dict) -> None:
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(payload, f, indent=2, sort_keys=True)
+
+
+def check_thresholds(results: Dict[str, float], thresholds: Dict[str, dict]) -> List[str]:
+    """Return a list of human readable violations.
+
+    A threshold entry looks like {"max": 25.0} or {"min": 1000}; metrics that
+    were not produced in this run (e.g. a skipped size) are ignored.
+    """
+    failures = []
+    for metric, rule in thresholds.items():
+        if metric not in results:
+            continue
+        value = results[metric]
+        if "max" in rule and value > rule["max"]:
+            failures.append(f"{metric}={value} exceeds max {rule['max']}")
+        if "min" in rule and value < rule["min"]:
+            failures.append(f"{metric}={value} below min {rule['min']}")
+    return failures
+
+
+def check_baseline(results: Dict[str, float], baseline: Dict[str, float], tolerance: float) -> List[str]:
+    """Compare against a previous run; latencies may grow and throughput may
+    shrink by at most `tolerance` (0.2 == 20%)."""
+    failures = []
+    for metric, value in results.items():
+        old: Optional[float] = baseline.get(metric)
+        if not old:
+            continue
+        if metric.endswith("_ms") and not metric.endswith("min_ms") and value > old * (1 + tolerance):
+            failures.append(f"{metric}={value} regressed from {old}")
+        elif metric.endswith("_per_sec") and value < old * (1 - tolerance):
+            failures.append(f"{metric}={value} regressed from {old}")
+    return failures
@@ -0,0 +1,121 @@
+"""
+Local OpenAI-compatible stub for load tests.
+
+Serves POST /v1/chat/completions and /v1/completions (plus GET /v1/models)
+with a canned, prompt-dependent answer after a latency drawn from a
+configurable distribution, so /recommendations can be measured with
+realistic explanation latency and no OpenAI calls:
+
+    python -m benchmarks.llm_stub --port 8100 --latency lognormal:0.6,0.5
+    OPENAI_BASE_URL=http://127.0.0.1:8100/v1 OPENAI_API_KEY=stub LLM_BACKEND=openai uvicorn app.main:app
+
+Latency specs (seconds):
+    fixed:0.3             every call takes 0.3s
+    uniform:0.1,0.8       uniform between 0.1 and 0.8
+    normal:0.4,0.1        mean, standard deviation (clipped at 0)
+    lognormal:0.6,0.5     median, sigma of the underlying normal; long right tail
+`--error-rate 0.02` answers that share of calls with a 500 instead.
+"""
+import argparse
+import asyncio
+import hashlib
+import math
+import random
+import sys
+import time
+from typing import Callable, Optional
+
+Sampler = Callable[[random.Random], float]
+
+
+def parse_latency(spec: str) -> Sampler:
+    kind, _, args = spec.partition(":")
+    values = [float(v) for v in args.split(",") if v.strip()]
+    if kind == "fixed" and len(values) == 1:
+        return lambda rng: values[0]
+    if kind == "uniform" and len(values) == 2:
+        return lambda rng: rng.uniform(values[0], values[1])
+    if kind == "normal" and len(values) == 2:
+        return lambda rng: max(0.0, rng.gauss(values[0], values[1]))
+    if kind == "lognormal" and len(values) == 2:
+        mu = math.log(values[0]) if values[0] > 0 else 0.0
+        return lambda rng: rng.lognormvariate(mu, values[1]) if values[0] > 0 else 0.0
+    raise ValueError(f"bad latency spec {spec!r}; expected fixed:S, uniform:A,B, normal:MEAN,SD or lognormal:MEDIAN,SIGMA")
+
+
+def _answer(prompt: str) -> str:
+    digest = hashlib.sha1(prompt.encode()).hexdigest()[:8]
+    return f"Recommended because it matches what you have been browsing lately (stub {digest})."
+
+
+def _tokens(text: str) -> int:
+    return max(1, len(text.split()))
+
+
+def make_app(latency: str = "fixed:0", error_rate: float = 0.0, seed: Optional[int] = None):
+    from fastapi import FastAPI, Request
+    from fastapi.responses import JSONResponse
+
+    sample = parse_latency(latency)
+    rng = random.Random(seed)
+    app = FastAPI(title="LLM stub")
+    app.state.calls = 0
+
+    async def _respond(prompt: str, model: str, chat: bool):
+        app.state.calls += 1
+        await asyncio.sleep(sample(rng))
+        if error_rate and rng.random() < error_rate:
+            return JSONResponse(status_code=500, content={"error": {"message": "stub failure", "type": "server_error"}})
+        text = _answer(prompt)
+        choice = {"index": 0, "finish_reason": "stop"}
+        if chat:
+            choice["message"] = {"role": "assistant", "content": text}
+        else:
+            choice["text"] = text
+        return {
+            "id": f"stub-{app.state.calls}",
+            "object": "chat.completion" if chat else "text_completion",
+            "created": int(time.time()),
+            "model": model,
+            "choices": [choice],
+            "usage": {"prompt_tokens": _tokens(prompt), "completion_tokens": _tokens(text), "total_tokens": _tokens(prompt) + _tokens(text)},
+        }
+
+    @app.post("/v1/chat/completions")
+    async def chat_completions(request: Request):
+        body = await request.json()
+        prompt = "\n".join(str(m.get("content", "")) for m in body.get("messages", []))
+        return await _respond(prompt, body.get("model", "stub"), chat=True)
+
+    @app.post("/v1/completions")
+    async def completions(request: Request):
+        body = await request.json()
+        return await _respond(str(body.get("prompt", "")), body.get("model", "stub"), chat=False)
+
+    @app.get("/v1/models")
+    def models():
+        return {"object": "list", "data": [{"id": "stub", "object": "model", "owned_by": "stub"}]}
+
+    @app.get("/health")
+    def health():
+        return {"status": "ok", "calls": app.state.calls}
+
+    return app
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="OpenAI-compatible LLM stub with configurable latency")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8100)
+    parser.add_argument("--latency", default="lognormal:0.6,0.5", help="fixed:S | uniform:A,B | normal:MEAN,SD | lognormal:MEDIAN,SIGMA")
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--seed", type=int)
+    args = parser.parse_args(argv)
+
+    import uvicorn
+    uvicorn.run(make_app(args.latency, args.error_rate, args.seed), host=args.host, port=args.port, log_level="warning")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,339 @@
+"""
+Load test for /recommendations at several concurrency levels.
+
+    python -m benchmarks.loadtest                                   # self-hosted app + LLM stub
+    python -m benchmarks.loadtest --concurrency 1,16,64 --duration 20 --llm-latency lognormal:0.8,0.6
+    python -m benchmarks.loadtest --url http://staging:8000 --users 500 --products 5000
+    python -m benchmarks.loadtest --baseline benchmarks/results/loadtest/abc1234.json
+
+Without --url it starts benchmarks.llm_stub and `uvicorn app.main:app` as
+subprocesses. The app runs on a scratch SQLite database seeded with the
+benchmark fixtures and reaches the stub through OPENAI_BASE_URL. The result
+and explanation caches are off unless --cache is given, so every request
+pays for its explanations.
+
+Each level runs --concurrency closed-loop clients for --duration seconds,
+after a --warmup period. They send a mix of user_id and user_behavior
+requests (--behavior-ratio). The report gives requests/sec, p50/p95/p99
+latency and error rate, overall and per request kind. A failed LLM call
+still answers 200 with a deterministic explanation, so each level also
+reports `llm_fallbacks` and `llm_fallback_rate` (per LLM explanation) from the
+app's /metrics. The self-hosted app has METRICS_ENABLED=1; against --url they
+need it too, and with several app workers they are only a sample. Both error
+and fallback rates are held to --max-error-rate. The report is written to
+benchmarks/results/loadtest-latest.json and to
+benchmarks/results/loadtest/<label>.json, where the label defaults to the git
+commit. --baseline compares against an earlier report the way
+`benchmarks.run` does.
+"""
+import argparse
+import asyncio
+import os
+import platform
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Dict, List, Optional, Tuple
+
+from .fixtures import TAG_VOCAB, make_dataset, seed_engine, sqlite_engine
+from .harness import check_baseline, flatten, load_json, summarize, write_json
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(HERE)
+
+Sample = Tuple[str, float, bool]  # kind, latency ms, ok
+
+
+def _request(rng: random.Random, behavior_ratio: float, n_users: int, n_products: int, k: int) -> Tuple[str, dict]:
+    if rng.random() < behavior_ratio:
+        product_ids = [rng.randint(1, n_products) for _ in range(rng.randint(1, 3))]
+        return "behavior", {"user_behavior": {"product_ids": product_ids, "tags": rng.sample(TAG_VOCAB, 2)}, "k": k}
+    return "user", {"user_id": rng.randint(1, n_users), "k": k}
+
+
+async def _client_loop(client, deadline: float, samples: List[Sample], rng: random.Random, mix: dict) -> None:
+    import httpx
+    while time.perf_counter() < deadline:
+        kind, body = _request(rng, **mix)
+        start = time.perf_counter()
+        try:
+            ok = (await client.post("/recommendations", json=body)).status_code < 400
+        except httpx.HTTPError:
+            ok = False
+        samples.append((kind, (time.perf_counter() - start) * 1000.0, ok))
+
+
+async def _llm_counters(client) -> Optional[Tuple[float, float, bool]]:
+    """(LLM explanations attempted, fallbacks, recording) from the app's /metrics, or None
+    when it cannot be read. `recording` is False until the app has timed a
+    request, which it never does without METRICS_ENABLED."""
+    import httpx
+    try:
+        response = await client.get("/metrics")
+    except httpx.HTTPError:
+        return None
+    if response.status_code != 200:
+        return None
+    attempted = fallbacks = 0.0
+    for line in response.text.splitlines():
+        # each explain single-flight leader is one LLM explanation attempt
+        if line.startswith("recs_singleflight_calls_total{") and 'group="explain"' in line and 'role="leader"' in line:
+            attempted += float(line.rsplit(" ", 1)[1])
+        elif line.startswith("recs_llm_fallbacks_total"):
+            fallbacks += float(line.rsplit(" ", 1)[1])
+    return attempted, fallbacks, "\nrecs_stage_duration_seconds_count" in response.text
+
+
+def summarize_level(prefix: str, samples: List[Sample], elapsed: float) -> Dict[str, float]:
+    results: Dict[str, float] = {}
+    groups = {"": samples}
+    for kind in sorted({s[0] for s in samples}):
+        groups[f".{kind}"] = [s for s in samples if s[0] == kind]
+    for suffix, group in groups.items():
+        if not group:
+            continue
+        errors = sum(1 for s in group if not s[2])
+        results.update(flatten(prefix + suffix, summarize([s[1] for s in group])))
+        results[f"{prefix}{suffix}.requests_per_sec"] = round(len(group) / elapsed, 2) if elapsed else 0.0
+        results[f"{prefix}{suffix}.error_rate"] = round(errors / len(group), 4)
+    return results
+
+
+async def run_level(
+    client,
+    concurrency: int,
+    duration: float,
+    warmup: float = 0.0,
+    behavior_ratio: float = 0.3,
+    n_users: int = 100,
+    n_products: int = 1000,
+    k: int = 5,
+    seed: int = 0,
+) -> Dict[str, float]:
+    """Drive `client` (an httpx.AsyncClient on the app) with `concurrency` clients."""
+    mix = {"behavior_ratio": behavior_ratio, "n_users": n_users, "n_products": n_products, "k": k}
+    rngs = [random.Random(seed * 1000 + i) for i in range(concurrency)]
+    if warmup > 0:
+        deadline = time.perf_counter() + warmup
+        await asyncio.gather(*(_client_loop(client, deadline, [], rng, mix) for rng in rngs))
+    before = await _llm_counters(client)
+    samples: List[Sample] = []
+    start = time.perf_counter()
+    deadline = start + duration
+    await asyncio.gather(*(_client_loop(client, deadline, samples, rng, mix) for rng in rngs))
+    elapsed = time.perf_counter() - start
+    prefix = f"loadtest.c{concurrency}"
+    results = summarize_level(prefix, samples, elapsed)
+    after = await _llm_counters(client)
+    if before is not None and after is not None and after[2] and after[0] >= before[0] and after[1] >= before[1]:
+        attempted, fallbacks = after[0] - before[0], after[1] - before[1]
+        results[f"{prefix}.llm_fallbacks"] = fallbacks
+        results[f"{prefix}.llm_fallback_rate"] = round(fallbacks / attempted, 4) if attempted else 0.0
+    return results
+
+
+# -- self-hosted app and stub --------------------------------------------------
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _wait_ready(url: str, timeout: float, proc: subprocess.Popen) -> None:
+    import httpx
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if proc.poll() is not None:
+            raise RuntimeError(f"{proc.args} exited with status {proc.returncode}")
+        try:
+            if httpx.get(url, timeout=2).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.25)
+    raise RuntimeError(f"{url} not ready after {timeout}s")
+
+
+def _seed(db_path: str, n_products: int, n_users: int, n_interactions: int) -> None:
+    from sqlmodel import Session
+    from app.db.stats import refresh_stats
+    from app.recs.profiles import rebuild_profiles
+
+    db_engine = sqlite_engine(db_path)
+    seed_engine(db_engine, make_dataset(n_products, n_users, n_interactions))
+    with Session(db_engine) as session:
+        rebuild_profiles(session)
+        refresh_stats(session, source="loadtest")
+    db_engine.dispose()
+
+
+def start_stack(args, workdir: str) -> Tuple[str, List[subprocess.Popen]]:
+    """Start the LLM stub (unless --llm none) and the app; returns the app URL."""
+    db_path = os.path.join(workdir, "loadtest.db")
+    _seed(db_path, args.products, args.users, args.interactions)
+    env = {
+        **os.environ,
+        "DATABASE_URL": f"sqlite:///{db_path}",
+        "PYTHONPATH": ROOT,
+        "METRICS_ENABLED": "1",  # LLM fallback counts
+    }
+    if not args.cache:
+        env.update(RESULT_CACHE_TTL="0", EXPLANATION_CACHE_TTL="0")
+    procs: List[subprocess.Popen] = []
+    try:
+        if args.llm == "stub":
+            stub_port = _free_port()
+            stub = subprocess.Popen(
+                [sys.executable, "-m", "benchmarks.llm_stub", "--port", str(stub_port),
+                 "--latency", args.llm_latency, "--error-rate", str(args.llm_error_rate), "--seed", "1"],
+                cwd=ROOT, env=env,
+            )
+            procs.append(stub)
+            _wait_ready(f"http://127.0.0.1:{stub_port}/health", 30, stub)
+            env.update(LLM_BACKEND="openai", OPENAI_API_KEY="stub", OPENAI_BASE_URL=f"http://127.0.0.1:{stub_port}/v1")
+        else:
+            env.update(LLM_BACKEND="none")
+            env.pop("OPENAI_API_KEY", None)
+
+        app_port = _free_port()
+        app = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "app.main:app", "--host", "127.0.0.1", "--port", str(app_port),
+             "--workers", str(args.app_workers), "--log-level", "warning"],
+            cwd=ROOT, env=env,
+        )
+        procs.append(app)
+        url = f"http://127.0.0.1:{app_port}"
+        _wait_ready(f"{url}/ready", 120, app)
+    except BaseException:
+        stop_stack(procs)
+        raise
+    return url, procs
+
+
+def stop_stack(procs: List[subprocess.Popen]) -> None:
+    for proc in reversed(procs):
+        proc.terminate()
+    for proc in reversed(procs):
+        try:
+            proc.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+
+
+def _git_label() -> str:
+    try:
+        out = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True, timeout=10)
+        if out.returncode == 0 and out.stdout.strip():
+            return out.stdout.strip()
+    except (OSError, subprocess.SubprocessError):
+        pass
+    return time.strftime("%Y%m%dT%H%M%S")
+
+
+async def _run_levels(url: str, args, levels: List[int]) -> Dict[str, float]:
+    import httpx
+    results: Dict[str, float] = {}
+    for concurrency in levels:
+        limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+        async with httpx.AsyncClient(base_url=url, timeout=args.timeout, limits=limits) as client:
+            level = await run_level(
+                client, concurrency, args.duration, args.warmup, args.behavior_ratio,
+                args.users, args.products, args.k, seed=concurrency,
+            )
+        results.update(level)
+        prefix = f"loadtest.c{concurrency}"
+        fallback_rate = level.get(f"{prefix}.llm_fallback_rate")
+        print(
+            f"c={concurrency:<4d} {level[f'{prefix}.requests_per_sec']:>9.1f} req/s  "
+            f"p50 {level[f'{prefix}.p50_ms']:>8.1f}ms  p95 {level[f'{prefix}.p95_ms']:>8.1f}ms  "
+            f"p99 {level[f'{prefix}.p99_ms']:>8.1f}ms  errors {level[f'{prefix}.error_rate']:.2%}  "
+            f"llm fallbacks {'n/a' if fallback_rate is None else f'{fallback_rate:.2%}'}",
+            flush=True,
+        )
+    return results
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Load test /recommendations")
+    parser.add_argument("--url", help="app to test; default: start the app and an LLM stub locally")
+    parser.add_argument("--concurrency", default="1,8,32", help="comma separated concurrency levels")
+    parser.add_argument("--duration", type=float, default=10.0, help="measured seconds per level")
+    parser.add_argument("--warmup", type=float, default=2.0, help="unmeasured seconds before each level")
+    parser.add_argument("--behavior-ratio", type=float, default=0.3, help="share of user_behavior requests")
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--timeout", type=float, default=30.0)
+    parser.add_argument("--products", type=int, default=1000, help="catalog size (seeded, or the target's)")
+    parser.add_argument("--users", type=int, default=200, help="user ids to draw from (seeded, or the target's)")
+    parser.add_argument("--interactions", type=int, default=10000, help="seeded interactions (self-hosted)")
+    parser.add_argument("--app-workers", type=int, default=1, help="uvicorn workers (self-hosted)")
+    parser.add_argument("--llm", choices=("stub", "none"), default="stub", help="explanations via the stub, or deterministic")
+    parser.add_argument("--llm-latency", default="lognormal:0.6,0.5", help="stub latency spec, see benchmarks/llm_stub.py")
+    parser.add_argument("--llm-error-rate", type=float, default=0.0)
+    parser.add_argument("--cache", action="store_true", help="keep the result/explanation caches on (self-hosted)")
+    parser.add_argument("--label", help="report name for comparisons (default: git commit)")
+    parser.add_argument("--out", default=os.path.join(HERE, "results", "loadtest-latest.json"))
+    parser.add_argument("--baseline", help="previous load test report to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.25)
+    parser.add_argument("--max-error-rate", type=float, default=0.01)
+    args = parser.parse_args(argv)
+
+    levels = [int(c) for c in args.concurrency.split(",") if c.strip()]
+    label = args.label or _git_label()
+    started = time.time()
+    procs: List[subprocess.Popen] = []
+    url = args.url
+    with tempfile.TemporaryDirectory(prefix="recs-loadtest-") as workdir:
+        if url is None:
+            url, procs = start_stack(args, workdir)
+        try:
+            results = asyncio.run(_run_levels(url, args, levels))
+        finally:
+            stop_stack(procs)
+
+    failures = [
+        f"{metric}={value} exceeds max error rate {args.max_error_rate}"
+        for metric, value in results.items()
+        if metric.endswith((".error_rate", ".llm_fallback_rate")) and metric.count(".") == 2 and value > args.max_error_rate
+    ]
+    if args.baseline:
+        failures += check_baseline(results, load_json(args.baseline)["results"], args.tolerance)
+
+    report = {
+        "meta": {
+            "label": label,
+            "started": started,
+            "duration_s": round(time.time() - started, 2),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "url": args.url or "self-hosted",
+            "concurrency": levels,
+            "level_duration_s": args.duration,
+            "behavior_ratio": args.behavior_ratio,
+            "products": args.products,
+            "users": args.users,
+            "app_workers": None if args.url else args.app_workers,
+            "llm": None if args.url else args.llm,
+            "llm_latency": None if args.url or args.llm == "none" else args.llm_latency,
+            "cache": None if args.url else args.cache,
+        },
+        "results": results,
+        "failures": failures,
+    }
+    write_json(args.out, report)
+    archive = os.path.join(HERE, "results", "loadtest", f"{label}.json")
+    write_json(archive, report)
+    print(f"\nreport written to {args.out} and {archive}")
+    if failures:
+        print("\nFAILURES:")
+        for failure in failures:
+            print("  " + failure)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,106 @@
+"""
+Run the benchmark suites and check them against regression thresholds.
+
+    python -m benchmarks.run                       # all suites, default sizes
+    python -m benchmarks.run --suite engine --sizes 1000,10000
+    python -m benchmarks.run --suite db --duration 5   # SQLite WAL vs rollback journal
+    python -m benchmarks.run --suite sharded --shard-size 200000 --shards 1,2,4,8
+    python -m benchmarks.run --baseline benchmarks/results/main.json --tolerance 0.2
+
+Writes a JSON report (default benchmarks/results/latest.json) and exits with
+status 1 when a threshold or baseline comparison fails.
+"""
+import argparse
+import os
+import platform
+import sys
+import tempfile
+import time
+
+from .harness import check_baseline, check_thresholds, load_json, write_json
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+SUITES = ("engine", "api", "import", "db", "diversity", "sharded")
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Product recommender benchmarks")
+    parser.add_argument("--suite", action="append", choices=SUITES, help="suite to run (repeatable, default: all)")
+    parser.add_argument("--sizes", default="100,1000,10000", help="comma separated catalog sizes")
+    parser.add_argument("--api-size", type=int, default=1000, help="catalog size for the API suite")
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--shard-size", type=int, default=100000, help="catalog size for the sharded suite")
+    parser.add_argument("--shards", default=",".join(str(2 ** i) for i in range((os.cpu_count() or 1).bit_length())),
+                        help="comma separated worker counts for the sharded suite (default: 1,2,4.. up to the core count)")
+    parser.add_argument("--duration", type=float, default=3.0, help="seconds per mixed read/write run (db suite)")
+    parser.add_argument("--out", default=os.path.join(HERE, "results", "latest.json"))
+    parser.add_argument("--thresholds", default=os.path.join(HERE, "thresholds.json"))
+    parser.add_argument("--baseline", help="previous report to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.25)
+    args = parser.parse_args(argv)
+
+    suites = args.suite or list(SUITES)
+    sizes = [int(s) for s in args.sizes.split(",") if s.strip()]
+    workdir = tempfile.mkdtemp(prefix="recs-bench-")
+
+    # the app reads these at import time, so set them before anything imports app.main
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(workdir, 'api.db')}"
+    os.environ["LLM_BACKEND"] = "none"
+    os.environ.pop("OPENAI_API_KEY", None)
+
+    results = {}
+    started = time.time()
+    if "engine" in suites:
+        from . import bench_engine
+        results.update(bench_engine.run(workdir, sizes, repeat=args.repeat))
+    if "api" in suites:
+        from . import bench_api
+        results.update(bench_api.run(args.api_size, repeat=args.repeat))
+    if "import" in suites:
+        from . import bench_import
+        results.update(bench_import.run(workdir, [s * 5 for s in sizes]))
+    if "db" in suites:
+        from . import bench_db_concurrency
+        results.update(bench_db_concurrency.run(workdir, size=args.api_size, duration=args.duration))
+    if "diversity" in suites:
+        from . import bench_diversity
+        results.update(bench_diversity.run([s * 10 for s in sizes], repeat=args.repeat))
+    if "sharded" in suites:
+        from . import bench_sharded
+        shard_counts = [int(n) for n in args.shards.split(",") if n.strip()]
+        results.update(bench_sharded.run(workdir, args.shard_size, shard_counts, repeat=args.repeat))
+
+    failures = []
+    if os.path.exists(args.thresholds):
+        failures += check_thresholds(results, load_json(args.thresholds))
+    if args.baseline:
+        failures += check_baseline(results, load_json(args.baseline)["results"], args.tolerance)
+
+    report = {
+        "meta": {
+            "started": started,
+            "duration_s": round(time.time() - started, 2),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "suites": suites,
+            "sizes": sizes,
+            "repeat": args.repeat,
+        },
+        "results": results,
+        "failures": failures,
+    }
+    write_json(args.out, report)
+
+    for metric in sorted(results):
+        print(f"{metric:70s} {results[metric]}")
+    print(f"\nreport written to {args.out}")
+    if failures:
+        print("\nREGRESSIONS:")
+        for failure in failures:
+            print("  " + failure)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,45 @@
+"""
+Compact old interactions into aggregates and archive the raw rows to Parquet.
+
+    python -m scripts.compact_interactions                       # older than INTERACTION_RETENTION_DAYS (90)
+    python -m scripts.compact_interactions --older-than-days 30 --archive-dir /data/archive
+    python -m scripts.compact_interactions --before 2025-01-01 --no-archive
+
+Uses DATABASE_URL like the API. Safe to rerun; archives are named by id range.
+"""
+import argparse
+import json
+import sys
+from datetime import datetime, timedelta, timezone
+
+from sqlmodel import Session
+
+from app.db.compaction import ARCHIVE_DIR, RETENTION_DAYS, compact_interactions
+from app.db.database import engine, init_db
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Compact and archive old interactions")
+    parser.add_argument("--older-than-days", type=float, default=RETENTION_DAYS)
+    parser.add_argument("--before", help="ISO timestamp cutoff (UTC); overrides --older-than-days")
+    parser.add_argument("--archive-dir", default=ARCHIVE_DIR)
+    parser.add_argument("--no-archive", action="store_true", help="drop compacted raw rows without writing Parquet")
+    parser.add_argument("--batch-size", type=int, default=50000)
+    args = parser.parse_args(argv)
+
+    if args.before:
+        before = datetime.fromisoformat(args.before.replace("Z", "+00:00"))
+        if before.tzinfo is not None:  # stored timestamps are naive UTC
+            before = before.astimezone(timezone.utc).replace(tzinfo=None)
+    else:
+        before = datetime.utcnow() - timedelta(days=args.older_than_days)
+
+    init_db()
+    with Session(engine) as session:
+        result = compact_interactions(session, before, None if args.no_archive else args.archive_dir, args.batch_size)
+    print(json.dumps({"before": before.isoformat(), **result}))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,274 @@
+"""
+Offline evaluation of the recommendation engine.
+
+Splits data/interactions.csv by time, loads the earlier part into a scratch
+SQLite database (with profiles rebuilt from it) and replays every user with
+held-out events against the engine, across a process pool:
+
+    python -m scripts.evaluate                         # data/, 80/20 split, k=10
+    python -m scripts.evaluate --k 5 --workers 8 --mode behavior
+    python -m scripts.evaluate --max-per-tag 2 --out eval.json
+
+Reports precision@k, recall@k and NDCG@k (binary relevance: a held-out
+product the user interacted with) plus queries/sec and p50/p99 latency of
+the engine call.
+"""
+import argparse
+import csv
+import json
+import math
+import os
+import shutil
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from typing import Dict, List, Optional, Sequence, Set, Tuple
+
+from sqlmodel import SQLModel, Session
+
+from app.db.database import build_engine
+from app.db.models import Product, User, Interaction
+from app.recs import seen
+from app.recs.engine import score_for_user, score_from_behavior
+from app.recs.profiles import rebuild_profiles
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+
+
+def _parse_ts(value: str) -> datetime:
+    return datetime.fromisoformat(value.replace("Z", "+00:00")).replace(tzinfo=None)
+
+
+def _read_csv(path: str) -> List[dict]:
+    if not os.path.exists(path):
+        return []
+    with open(path, newline="", encoding="utf-8") as f:
+        return list(csv.DictReader(f))
+
+
+def split_by_time(interactions: List[dict], train_fraction: float) -> Tuple[List[dict], List[dict]]:
+    """Earliest `train_fraction` of events (by timestamp, then id) for training, the rest held out."""
+    ordered = sorted(interactions, key=lambda r: (r["ts"], r["id"]))
+    cut = int(len(ordered) * train_fraction)
+    return ordered[:cut], ordered[cut:]
+
+
+def build_train_db(db_path: str, products: List[dict], users: List[dict], train: List[dict]) -> None:
+    db_engine = build_engine(f"sqlite:///{db_path}")
+    SQLModel.metadata.create_all(db_engine)
+    with Session(db_engine) as session:
+        session.add_all(
+            Product(
+                id=int(p["id"]),
+                name=p.get("name", ""),
+                description=p.get("description", ""),
+                price=float(p.get("price", 0) or 0),
+                tags=p.get("tags", ""),
+                popularity=int(p.get("popularity", 0) or 0),
+            )
+            for p in products
+        )
+        session.add_all(User(id=int(u["id"]), name=u.get("name", "")) for u in users)
+        session.commit()
+        session.add_all(
+            Interaction(user_id=r["user_id"], product_id=r["product_id"], event=r["event"], timestamp=r["ts"])
+            for r in train
+        )
+        session.commit()
+        rebuild_profiles(session)
+    db_engine.dispose()
+
+
+# -- worker side -------------------------------------------------------------
+
+_worker: Dict[str, object] = {}
+
+
+def _init_worker(db_path: str, options: dict) -> None:
+    _worker["engine"] = build_engine(f"sqlite:///{db_path}")
+    _worker["options"] = options
+
+
+def _replay(chunk: Sequence[Tuple[int, List[int]]]) -> List[Tuple[int, List[int], float]]:
+    """Run the engine for each (user_id, train product ids); returns (user_id, rec ids, seconds)."""
+    opts = _worker["options"]
+    out = []
+    with Session(_worker["engine"]) as session:
+        for user_id, history in chunk:
+            start = time.perf_counter()
+            if opts["mode"] == "behavior":
+                scored = score_from_behavior(session, history, None, opts["k"], opts["max_per_tag"])
+            else:
+                exclude = seen.exclusion_for(session, user_id, opts["exclude_purchased"], opts["exclude_viewed"])
+                scored = score_for_user(session, user_id, opts["k"], max_per_tag=opts["max_per_tag"], exclude=exclude)
+            out.append((user_id, [s.product.id for s in scored], time.perf_counter() - start))
+    return out
+
+
+# -- metrics -----------------------------------------------------------------
+
+def precision_recall_ndcg(recs: List[int], relevant: Set[int], k: int) -> Tuple[float, float, float]:
+    hits = [1 if pid in relevant else 0 for pid in recs[:k]]
+    dcg = sum(h / math.log2(i + 2) for i, h in enumerate(hits))
+    idcg = sum(1 / math.log2(i + 2) for i in range(min(len(relevant), k)))
+    n_hits = sum(hits)
+    return n_hits / k, n_hits / len(relevant), (dcg / idcg if idcg else 0.0)
+
+
+def _percentile(values: List[float], pct: float) -> float:
+    ordered = sorted(values)
+    idx = min(len(ordered) - 1, max(0, math.ceil(pct / 100 * len(ordered)) - 1))
+    return ordered[idx]
+
+
+def evaluate(
+    data_dir: str,
+    k: int = 10,
+    train_fraction: float = 0.8,
+    workers: int = 0,
+    mode: str = "user",
+    events: Optional[Sequence[str]] = None,
+    max_per_tag: Optional[int] = None,
+    exclude_purchased: bool = True,
+    exclude_viewed: bool = False,
+    max_users: Optional[int] = None,
+    chunk_size: int = 64,
+    workdir: Optional[str] = None,
+) -> dict:
+    """Run the evaluation and return the report; workers=0 replays in-process."""
+    products = _read_csv(os.path.join(data_dir, "products.csv"))
+    users = _read_csv(os.path.join(data_dir, "users.csv"))
+    interactions = []
+    for row in _read_csv(os.path.join(data_dir, "interactions.csv")):
+        if not row.get("timestamp"):
+            continue
+        interactions.append({
+            "id": int(row["id"]) if row.get("id") else 0,
+            "user_id": int(row["user_id"]),
+            "product_id": int(row["product_id"]),
+            "event": row.get("event", "view"),
+            "ts": _parse_ts(row["timestamp"]),
+        })
+    train, test = split_by_time(interactions, train_fraction)
+
+    history: Dict[int, List[int]] = defaultdict(list)
+    for r in train:
+        history[r["user_id"]].append(r["product_id"])
+    relevant: Dict[int, Set[int]] = defaultdict(set)
+    for r in test:
+        if events and r["event"] not in events:
+            continue
+        relevant[r["user_id"]].add(r["product_id"])
+    # only users the engine knows something about can be scored fairly
+    queries = [(uid, history[uid]) for uid in sorted(relevant) if uid in history]
+    if max_users:
+        queries = queries[:max_users]
+
+    scratch = None
+    if workdir is None:
+        scratch = workdir = tempfile.mkdtemp(prefix="recs-eval-")
+    try:
+        db_path = os.path.join(workdir, "train.db")
+        if os.path.exists(db_path):
+            os.remove(db_path)
+        build_train_db(db_path, products, users, train)
+
+        options = {
+            "k": k,
+            "mode": mode,
+            "max_per_tag": max_per_tag,
+            "exclude_purchased": exclude_purchased,
+            "exclude_viewed": exclude_viewed,
+        }
+        chunks = [queries[i:i + chunk_size] for i in range(0, len(queries), chunk_size)]
+        started = time.perf_counter()
+        if workers > 0:
+            with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(db_path, options)) as pool:
+                results = [row for part in pool.map(_replay, chunks) for row in part]
+        else:
+            _init_worker(db_path, options)
+            try:
+                results = [row for chunk in chunks for row in _replay(chunk)]
+            finally:
+                _worker.pop("engine").dispose()
+    finally:
+        if scratch is not None:
+            shutil.rmtree(scratch, ignore_errors=True)
+    wall = time.perf_counter() - started
+
+    sums = [0.0, 0.0, 0.0]
+    latencies = []
+    for user_id, recs, seconds in results:
+        for i, value in enumerate(precision_recall_ndcg(recs, relevant[user_id], k)):
+            sums[i] += value
+        latencies.append(seconds)
+    n = len(results)
+    return {
+        "meta": {
+            "data_dir": data_dir,
+            "mode": mode,
+            "k": k,
+            "train_fraction": train_fraction,
+            "train_events": len(train),
+            "test_events": len(test),
+            "users_evaluated": n,
+            "workers": workers,
+            "max_per_tag": max_per_tag,
+        },
+        "quality": {
+            f"precision@{k}": round(sums[0] / n, 4) if n else 0.0,
+            f"recall@{k}": round(sums[1] / n, 4) if n else 0.0,
+            f"ndcg@{k}": round(sums[2] / n, 4) if n else 0.0,
+        },
+        "throughput": {
+            "wall_s": round(wall, 3),
+            "qps": round(n / wall, 1) if wall else 0.0,
+            "p50_ms": round(_percentile(latencies, 50) * 1000, 3) if latencies else 0.0,
+            "p99_ms": round(_percentile(latencies, 99) * 1000, 3) if latencies else 0.0,
+        },
+    }
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Offline evaluation of the recommendation engine")
+    parser.add_argument("--data-dir", default=os.path.join(ROOT, "data"))
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--train-fraction", type=float, default=0.8, help="earliest share of events used for training")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="process pool size (0 = in-process)")
+    parser.add_argument("--mode", choices=("user", "behavior"), default="user",
+                        help="score_for_user on rebuilt profiles, or score_from_behavior on the training product ids")
+    parser.add_argument("--events", help="comma separated held-out events that count as relevant (default: all)")
+    parser.add_argument("--max-per-tag", type=int)
+    parser.add_argument("--keep-purchased", action="store_true", help="do not exclude products bought in training")
+    parser.add_argument("--exclude-viewed", action="store_true")
+    parser.add_argument("--max-users", type=int)
+    parser.add_argument("--chunk-size", type=int, default=64)
+    parser.add_argument("--out", help="write the JSON report here as well")
+    args = parser.parse_args(argv)
+
+    report = evaluate(
+        args.data_dir,
+        k=args.k,
+        train_fraction=args.train_fraction,
+        workers=args.workers,
+        mode=args.mode,
+        events=[e.strip() for e in args.events.split(",")] if args.events else None,
+        max_per_tag=args.max_per_tag,
+        exclude_purchased=not args.keep_purchased,
+        exclude_viewed=args.exclude_viewed,
+        max_users=args.max_users,
+        chunk_size=args.chunk_size,
+    )
+    text = json.dumps(report, indent=2, default=str)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            f.write(text)
+    print(text)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
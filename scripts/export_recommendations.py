@@ -0,0 +1,289 @@
+"""
+Bulk export of recommendations for every user, for offline channels.
+
+    python -m scripts.export_recommendations --out exports/2026-10-19
+    python -m scripts.export_recommendations --out exports/nightly --format csv --k 20 --workers 8
+    python -m scripts.export_recommendations --out exports/nightly --restart
+
+Reads DATABASE_URL directly; the HTTP API is not involved. The parent takes
+one snapshot of the product catalog and cuts the user id space into
+partitions of --chunk-size users. A process pool scores each partition with
+the engine against that snapshot, loading the partition's profiles and
+seen-sets with one query each, and writes part-NNNNN.parquet (or .csv) with
+columns user_id, rank, product_id, score.
+
+Finished partitions are recorded in _manifest.json in the output directory,
+so rerunning with the same --out resumes where a failed run stopped. A resume
+is refused if the options or the catalog version changed in between (use
+--restart). Progress and rows/sec go to stderr, the summary JSON to stdout.
+"""
+import argparse
+import csv
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+from typing import Dict, Iterator, List, Optional, TextIO, Tuple
+
+from sqlmodel import Session, select
+
+from app.db.database import DB_URL, build_engine
+from app.db.models import User
+from app.recs import seen, sharded
+from app.recs.catalog import Catalog, load_catalog, pin
+from app.recs.engine import score_profile
+from app.recs.profiles import load_profiles, profile_from_history
+
+MANIFEST = "_manifest.json"
+FORMATS = ("parquet", "csv")
+
+Row = Tuple[int, int, int, float]  # user_id, rank, product_id, score
+
+
+def _write_json(path: str, data: dict) -> None:
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=2)
+    os.replace(tmp, path)
+
+
+def _write_part(path: str, rows: List[Row], fmt: str) -> None:
+    tmp = path + ".tmp"
+    if fmt == "parquet":
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError as e:
+            raise RuntimeError("parquet output needs pyarrow (pip install pyarrow), or use --format csv") from e
+        table = pa.table({
+            "user_id": pa.array([r[0] for r in rows], pa.int64()),
+            "rank": pa.array([r[1] for r in rows], pa.int32()),
+            "product_id": pa.array([r[2] for r in rows], pa.int64()),
+            "score": pa.array([r[3] for r in rows], pa.float64()),
+        })
+        pq.write_table(table, tmp, compression="zstd")
+    else:
+        with open(tmp, "w", newline="", encoding="utf-8") as f:
+            writer = csv.writer(f)
+            writer.writerow(("user_id", "rank", "product_id", "score"))
+            writer.writerows((u, r, p, round(s, 6)) for u, r, p, s in rows)
+    os.replace(tmp, path)
+
+
+def part_path(out_dir: str, index: int, fmt: str) -> str:
+    return os.path.join(out_dir, f"part-{index:05d}.{fmt}")
+
+
+def _partitions(session: Session, chunk_size: int) -> Iterator[Tuple[int, int]]:
+    """(first, last) user id of each run of `chunk_size` users, in id order."""
+    ids = session.exec(select(User.id).order_by(User.id).execution_options(yield_per=50000))
+    first, count, last = None, 0, None
+    for user_id in ids:
+        if first is None:
+            first = user_id
+        last = user_id
+        count += 1
+        if count == chunk_size:
+            yield first, last
+            first, count = None, 0
+    if first is not None:
+        yield first, last
+
+
+# -- worker side -------------------------------------------------------------
+
+_worker: Dict[str, object] = {}
+
+
+def _init_worker(db_url: str, catalog: Catalog, options: dict) -> None:
+    sharded.SHARDS = 0  # users are already spread over processes
+    db_engine = build_engine(db_url)
+    with Session(db_engine) as session:
+        pin(session, catalog)
+    _worker["engine"] = db_engine
+    _worker["options"] = options
+
+
+def _export_part(index: int, first: int, last: int, path: str) -> dict:
+    """Score users with ids in [first, last] and write their partition file."""
+    opts = _worker["options"]
+    started = time.perf_counter()
+    rows: List[Row] = []
+    with Session(_worker["engine"]) as session:
+        user_ids = session.exec(select(User.id).where(User.id >= first, User.id <= last).order_by(User.id)).all()
+        profiles = load_profiles(session, first, last)
+        excluding = opts["exclude_purchased"] or opts["exclude_viewed"]
+        seen_sets = seen.load_range(session, first, last) if excluding else {}
+        for user_id in user_ids:
+            liked = profiles.get(user_id)
+            if liked is None:
+                liked = profile_from_history(session, user_id)
+            entry = seen_sets.get(user_id)
+            # a per-user frozenset probes faster than the bisecting Exclusion view
+            exclude = frozenset(entry.exclusion(opts["exclude_purchased"], opts["exclude_viewed"])) if entry else None
+            scored = score_profile(session, liked, opts["k"], opts["max_per_tag"], exclude)
+            rows.extend((user_id, rank, s.product.id, s.score) for rank, s in enumerate(scored, 1))
+    _write_part(path, rows, opts["format"])
+    return {"index": index, "users": len(user_ids), "rows": len(rows), "seconds": round(time.perf_counter() - started, 3)}
+
+
+# -- driver ------------------------------------------------------------------
+
+def _progress(stream: Optional[TextIO], manifest: dict, rows: int, started: float) -> None:
+    if stream is None:
+        return
+    done = manifest["done"].values()
+    elapsed = time.perf_counter() - started
+    rate = rows / elapsed if elapsed else 0.0
+    parts, total = len(manifest["done"]), len(manifest["partitions"])
+    users = sum(d["users"] for d in done)
+    this_run = parts - manifest["resumed_parts"]
+    eta = elapsed / this_run * (total - parts) if this_run else 0.0
+    print(
+        f"[export] {parts}/{total} parts, {users} users, {rows} rows this run, "
+        f"{rate:,.0f} rows/s, eta {eta:,.0f}s",
+        file=stream, flush=True,
+    )
+
+
+def export(
+    out_dir: str,
+    db_url: str = DB_URL,
+    k: int = 10,
+    fmt: str = "parquet",
+    workers: int = 0,
+    chunk_size: int = 10000,
+    max_per_tag: Optional[int] = None,
+    exclude_purchased: bool = True,
+    exclude_viewed: bool = False,
+    restart: bool = False,
+    progress: Optional[TextIO] = sys.stderr,
+) -> dict:
+    """Export (or resume exporting) every user's top-k; workers=0 scores in-process."""
+    if fmt not in FORMATS:
+        raise ValueError(f"format must be one of {FORMATS}")
+    os.makedirs(out_dir, exist_ok=True)
+    manifest_path = os.path.join(out_dir, MANIFEST)
+    options = {
+        "k": k,
+        "format": fmt,
+        "chunk_size": chunk_size,
+        "max_per_tag": max_per_tag,
+        "exclude_purchased": exclude_purchased,
+        "exclude_viewed": exclude_viewed,
+    }
+
+    db_engine = build_engine(db_url)
+    with Session(db_engine) as session:
+        catalog = load_catalog(session)
+        manifest = None
+        if not restart and os.path.exists(manifest_path):
+            with open(manifest_path, encoding="utf-8") as f:
+                manifest = json.load(f)
+            if manifest["options"] != options or manifest["catalog_version"] != catalog.version:
+                raise RuntimeError(
+                    f"{manifest_path} was written with other options or catalog version "
+                    f"{manifest['catalog_version']} (now {catalog.version}); rerun with --restart"
+                )
+        if manifest is None:
+            for name in os.listdir(out_dir):
+                if name.startswith("part-"):
+                    os.remove(os.path.join(out_dir, name))  # a previous run's partitions
+            manifest = {
+                "options": options,
+                "catalog_version": catalog.version,
+                "products": len(catalog),
+                "started_at": datetime.utcnow().isoformat(),
+                "completed_at": None,
+                "partitions": list(_partitions(session, chunk_size)),
+                "done": {},
+            }
+    db_engine.dispose()
+
+    # a part only counts as done if its file is still there
+    manifest["done"] = {
+        i: d for i, d in manifest["done"].items() if os.path.exists(part_path(out_dir, int(i), fmt))
+    }
+    manifest["resumed_parts"] = len(manifest["done"])
+    _write_json(manifest_path, manifest)
+    pending = [
+        (i, first, last, part_path(out_dir, i, fmt))
+        for i, (first, last) in enumerate(manifest["partitions"])
+        if str(i) not in manifest["done"]
+    ]
+
+    started = time.perf_counter()
+    rows = 0
+
+    def finished(result: dict) -> None:
+        nonlocal rows
+        rows += result["rows"]
+        manifest["done"][str(result["index"])] = {key: v for key, v in result.items() if key != "index"}
+        _write_json(manifest_path, manifest)
+        _progress(progress, manifest, rows, started)
+
+    if workers > 0 and pending:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(db_url, catalog, options)) as pool:
+            for future in as_completed([pool.submit(_export_part, *args) for args in pending]):
+                finished(future.result())
+    elif pending:
+        _init_worker(db_url, catalog, options)
+        for args in pending:
+            finished(_export_part(*args))
+    wall = time.perf_counter() - started
+
+    manifest["completed_at"] = datetime.utcnow().isoformat()
+    _write_json(manifest_path, manifest)
+    done = manifest["done"].values()
+    return {
+        "out": out_dir,
+        "format": fmt,
+        "catalog_version": catalog.version,
+        "parts": len(manifest["partitions"]),
+        "resumed_parts": manifest["resumed_parts"],
+        "users": sum(d["users"] for d in done),
+        "rows": sum(d["rows"] for d in done),
+        "rows_this_run": rows,
+        "wall_s": round(wall, 3),
+        "rows_per_s": round(rows / wall, 1) if wall else 0.0,
+    }
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Export recommendations for every user")
+    parser.add_argument("--out", required=True, help="output directory (partition files and _manifest.json)")
+    parser.add_argument("--database-url", default=DB_URL)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--format", choices=FORMATS, default="parquet")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="process pool size (0 = in-process)")
+    parser.add_argument("--chunk-size", type=int, default=10000, help="users per partition")
+    parser.add_argument("--max-per-tag", type=int)
+    parser.add_argument("--keep-purchased", action="store_true", help="do not exclude purchased products")
+    parser.add_argument("--exclude-viewed", action="store_true")
+    parser.add_argument("--restart", action="store_true", help="ignore an existing manifest and export everything")
+    args = parser.parse_args(argv)
+
+    try:
+        summary = export(
+            args.out,
+            db_url=args.database_url,
+            k=args.k,
+            fmt=args.format,
+            workers=args.workers,
+            chunk_size=args.chunk_size,
+            max_per_tag=args.max_per_tag,
+            exclude_purchased=not args.keep_purchased,
+            exclude_viewed=args.exclude_viewed,
+            restart=args.restart,
+        )
+    except RuntimeError as e:
+        print(f"export failed: {e}", file=sys.stderr)
+        return 1
+    print(json.dumps(summary))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,16 +1,116 @@
-import requests
+"""
+Product data from public APIs (DummyJSON, with Fake Store as a fallback),
+plus generated users and interactions to go with it.
+
+Pages are fetched concurrently over one pooled async httpx client, with
+retries and backoff for transport errors and 429/5xx. Responses are kept in
+an ETag-aware on-disk cache (FETCH_CACHE_DIR, "" disables it): a refetch sends
+If-None-Match / If-Modified-Since and reuses the stored body on a 304.
+DUMMYJSON_URL and FAKESTORE_URL point the fetchers at another host, e.g. a
+local stub server in tests.
+
+    python -m scripts.fetch_real_products     # writes data/*.csv
+"""
+import asyncio
 import csv
+import hashlib
+import json
+import os
 import random
 from pathlib import Path
 from datetime import datetime, timedelta
-import time
+from typing import List, Optional
+
+ROOT = Path(__file__).resolve().parent.parent
+DUMMYJSON_URL = os.getenv("DUMMYJSON_URL", "https://dummyjson.com")
+FAKESTORE_URL = os.getenv("FAKESTORE_URL", "https://fakestoreapi.com")
+FETCH_CACHE_DIR = os.getenv("FETCH_CACHE_DIR", str(ROOT / ".cache" / "http"))
+FETCH_CONCURRENCY = int(os.getenv("FETCH_CONCURRENCY", "8"))
+FETCH_RETRIES = int(os.getenv("FETCH_RETRIES", "3"))
+FETCH_BACKOFF = float(os.getenv("FETCH_BACKOFF", "0.5"))  # seconds, doubled per retry
+FETCH_TIMEOUT = float(os.getenv("FETCH_TIMEOUT", "10"))
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+class ResponseCache:
+    """On-disk JSON response cache keyed by URL, with the validators to revalidate it."""
+
+    def __init__(self, directory: str):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+
+    def _path(self, url: str) -> Path:
+        return self.directory / (hashlib.sha256(url.encode()).hexdigest()[:32] + ".json")
+
+    def load(self, url: str) -> Optional[dict]:
+        try:
+            with open(self._path(url), encoding="utf-8") as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+        return entry if entry.get("url") == url else None
+
+    def store(self, url: str, etag: Optional[str], last_modified: Optional[str], body) -> None:
+        path = self._path(url)
+        tmp = path.with_suffix(".tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"url": url, "etag": etag, "last_modified": last_modified, "body": body}, f)
+        os.replace(tmp, path)
+
+
+def _retry_delay(response, attempt: int, backoff: float) -> float:
+    retry_after = response.headers.get("retry-after") if response is not None else None
+    if retry_after and retry_after.isdigit():
+        return min(float(retry_after), 30.0)
+    return backoff * 2 ** attempt
+
+
+async def fetch_json(client, url: str, cache: Optional[ResponseCache] = None, retries: Optional[int] = None, backoff: Optional[float] = None):
+    """GET `url` as JSON, revalidating a cached copy and retrying transient failures."""
+    import httpx
+    retries = FETCH_RETRIES if retries is None else retries
+    backoff = FETCH_BACKOFF if backoff is None else backoff
+    cached = cache.load(url) if cache else None
+    headers = {}
+    if cached and cached.get("etag"):
+        headers["If-None-Match"] = cached["etag"]
+    if cached and cached.get("last_modified"):
+        headers["If-Modified-Since"] = cached["last_modified"]
+    for attempt in range(retries + 1):
+        response = None
+        try:
+            response = await client.get(url, headers=headers)
+        except httpx.TransportError:
+            if attempt == retries:
+                raise
+        else:
+            if response.status_code == 304 and cached:
+                return cached["body"]
+            if response.status_code not in RETRY_STATUSES or attempt == retries:
+                response.raise_for_status()
+                body = response.json()
+                etag, last_modified = response.headers.get("etag"), response.headers.get("last-modified")
+                if cache and (etag or last_modified):
+                    cache.store(url, etag, last_modified, body)
+                return body
+        await asyncio.sleep(_retry_delay(response, attempt, backoff))
+
+
+def _client(concurrency: int = FETCH_CONCURRENCY):
+    import httpx  # only needed when actually fetching
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    return httpx.AsyncClient(limits=limits, timeout=FETCH_TIMEOUT, follow_redirects=True)
 
 
-def fetch_fakestore_products():
+def _cache(cache_dir: Optional[str]) -> Optional[ResponseCache]:
+    cache_dir = FETCH_CACHE_DIR if cache_dir is None else cache_dir
+    return ResponseCache(cache_dir) if cache_dir else None
+
+
+async def fetch_fakestore_products_async(client, cache: Optional[ResponseCache] = None, base_url: Optional[str] = None) -> List[dict]:
     print("Fetching products from Fake Store API...")
-    url = "https://fakestoreapi.com/products"
-    response = requests.get(url)
-    products_data = response.json()
+    products_data = await fetch_json(client, f"{(base_url or FAKESTORE_URL).rstrip('/')}/products", cache)
     products = []
     for idx, item in enumerate(products_data, 1):
         category = item.get('category', 'general').replace(' ', ',').replace("'", '')
@@ -26,13 +126,31 @@ def fetch_fakestore_products():
     return products
 
 
-def fetch_dummyjson_products():
+async def fetch_dummyjson_products_async(
+    client,
+    cache: Optional[ResponseCache] = None,
+    base_url: Optional[str] = None,
+    page_size: int = 30,
+    concurrency: int = FETCH_CONCURRENCY,
+) -> List[dict]:
+    """Every DummyJSON product: the first page gives the total, the rest are fetched concurrently."""
     print("Fetching products from DummyJSON API...")
+    base = (base_url or DUMMYJSON_URL).rstrip("/")
+
+    def page_url(skip: int) -> str:
+        return f"{base}/products?limit={page_size}&skip={skip}"
+
+    first = await fetch_json(client, page_url(0), cache)
+    total = int(first.get("total", 0))
+    gate = asyncio.Semaphore(concurrency)
+
+    async def page(skip: int):
+        async with gate:
+            return await fetch_json(client, page_url(skip), cache)
+
+    pages = [first, *await asyncio.gather(*(page(skip) for skip in range(page_size, total, page_size)))]
     products = []
-    for skip in [0, 30, 60]:
-        url = f"https://dummyjson.com/products?limit=30&skip={skip}"
-        response = requests.get(url)
-        data = response.json()
+    for data in pages:
         for item in data.get('products', []):
             products.append({
                 'id': item['id'],
@@ -42,11 +160,39 @@ def fetch_dummyjson_products():
                 'tags': f"{item.get('category', 'general')},{item.get('brand', '')}".strip(','),
                 'popularity': int(item.get('rating', 4) * 20)
             })
-        time.sleep(0.5)
     print(f"Fetched {len(products)} products")
     return products
 
 
+async def fetch_products_async(cache_dir: Optional[str] = None) -> List[dict]:
+    """DummyJSON products, falling back to Fake Store if DummyJSON fails."""
+    cache = _cache(cache_dir)
+    async with _client() as client:
+        try:
+            return await fetch_dummyjson_products_async(client, cache)
+        except Exception as e:
+            print(f"DummyJSON failed: {e}")
+            print("Trying Fake Store API...")
+            return await fetch_fakestore_products_async(client, cache)
+
+
+async def _with_client(fetch, cache_dir: Optional[str]) -> List[dict]:
+    async with _client() as client:
+        return await fetch(client, _cache(cache_dir))
+
+
+def fetch_fakestore_products(cache_dir: Optional[str] = None) -> List[dict]:
+    return asyncio.run(_with_client(fetch_fakestore_products_async, cache_dir))
+
+
+def fetch_dummyjson_products(cache_dir: Optional[str] = None) -> List[dict]:
+    return asyncio.run(_with_client(fetch_dummyjson_products_async, cache_dir))
+
+
+def fetch_products(cache_dir: Optional[str] = None) -> List[dict]:
+    return asyncio.run(fetch_products_async(cache_dir))
+
+
 def generate_realistic_users(count=20):
     first_names = ['Emma', 'Liam', 'Olivia', 'Noah', 'Ava', 'Ethan', 'Sophia', 'Mason', 'Isabella', 'William',
                    'Mia', 'James', 'Charlotte', 'Benjamin', 'Amelia', 'Lucas', 'Harper', 'Henry', 'Evelyn', 'Alexander']
@@ -100,12 +246,7 @@ def save_datasets():
     data_dir = Path(__file__).parent.parent / "data"
     data_dir.mkdir(exist_ok=True)
     print("Real Data Fetcher (Public APIs)")
-    try:
-        products = fetch_dummyjson_products()
-    except Exception as e:
-        print(f"DummyJSON failed: {e}")
-        print("Trying Fake Store API...")
-        products = fetch_fakestore_products()
+    products = fetch_products()
     users = generate_realistic_users(20)
     interactions = generate_interactions(products, users, 200)
     print(f"Generated {len(users)} users")
@@ -4,8 +4,12 @@ If DATABASE_URL is not set, the script will exit with an error explaining how to
 """
 import os
 import sys
-from sqlmodel import SQLModel, create_engine, Session
+from sqlmodel import SQLModel, Session
+from app.db.database import build_engine
 from app.db.models import Product, User, Interaction
+from app.db.stats import refresh_stats
+from app.recs.profiles import rebuild_profiles
+from datetime import datetime
 import csv
 from pathlib import Path
 
@@ -14,11 +18,7 @@ if not DB_URL:
     print("ERROR: DATABASE_URL is not set. Start the local Postgres with: docker compose up -d")
     sys.exit(1)
 
-connect_args = {}
-if DB_URL.startswith("sqlite"):
-    connect_args = {"check_same_thread": False}
-
-engine = create_engine(DB_URL, echo=False, connect_args=connect_args)
+engine = build_engine(DB_URL)
 
 print("Using DATABASE_URL:", DB_URL)
 print("Creating tables...")
@@ -65,9 +65,13 @@ with Session(engine) as session:
                     product_id=int(row.get("product_id")),
                     event=row.get("event", "view"),
                 )
+                if row.get("timestamp"):
+                    it.timestamp = datetime.fromisoformat(row["timestamp"].replace("Z", "+00:00")).replace(tzinfo=None)
                 session.add(it)
                 created["interactions"] += 1
         session.commit()
+    rebuild_profiles(session)
+    refresh_stats(session, source="csv")
 
 print("Import complete:", created)
 print("You can now set DATABASE_URL to your Postgres and run the backend.")
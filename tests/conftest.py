@@ -0,0 +1,6 @@
+import os
+import tempfile
+
+# app.db.database binds its engine at import time; keep the suite off ./recs.db
+os.environ.setdefault("DATABASE_URL", "sqlite:///" + os.path.join(tempfile.mkdtemp(prefix="recs-test-"), "test.db"))
+os.environ.setdefault("LLM_BACKEND", "none")
@@ -1,4 +1,12 @@
+import time
+
 from fastapi.testclient import TestClient
+from sqlmodel import Session, delete, select
+
+from app.db.database import engine
+from app.db.models import DatasetStats
+from app import main, warmup
+from app.llm import explainer
 from app.main import app
 
 client = TestClient(app)
@@ -12,3 +20,122 @@ def test_sample_flow():
     assert isinstance(data, list)
     if data:
         assert "explanation" in data[0]
+
+
+def test_active_users_pagination():
+    client.post("/load-sample-data")
+    r = client.get("/active-users", params={"limit": 1})
+    assert r.status_code == 200
+    first = r.json()
+    assert len(first) == 1
+    cursor = r.headers["X-Next-Cursor"]
+
+    r = client.get("/active-users", params={"limit": 1, "after_id": cursor})
+    second = r.json()
+    assert len(second) == 1 and second[0]["id"] > first[0]["id"]
+
+    r = client.get("/active-users/count")
+    assert r.json()["count"] == 2
+    assert client.get("/active-users", params={"since": "2999-01-01T00:00:00Z"}).json() == []
+
+
+def test_active_count_cache_is_bounded(monkeypatch):
+    client.post("/load-sample-data")
+    monkeypatch.setattr(main, "ACTIVE_USERS_COUNT_MAX", 3)
+    for hour in range(6):  # a rolling window sends a new `since` every call
+        client.get("/active-users/count", params={"since": f"2020-01-01T{hour:02d}:00:00Z"})
+    assert len(main._active_count_cache) == 3
+
+
+def test_data_info_tracks_ingestion():
+    client.post("/load-sample-data")
+    before = client.get("/data-info").json()
+    assert before["stats"]["products"] == 6
+    r = client.post("/interactions", json={"user_id": 1, "product_id": 4, "event": "view"})
+    assert r.status_code == 201
+    after = client.get("/data-info").json()
+    assert after["stats"]["interactions"] == before["stats"]["interactions"] + 1
+    assert client.post("/interactions", json={"user_id": 999, "product_id": 4}).status_code == 404
+
+
+def test_data_info_stores_missing_stats_row():
+    client.post("/load-sample-data")
+    expected = client.get("/data-info").json()["stats"]
+    with Session(engine) as session:  # a database from before the stats row existed
+        session.exec(delete(DatasetStats))
+        session.commit()
+
+    assert client.get("/data-info").json()["stats"] == expected
+    with Session(engine) as session:
+        assert session.get(DatasetStats, 1).interactions == expected["interactions"]
+
+
+def test_synthetic_warmup_request_skips_the_llm(monkeypatch):
+    client.post("/load-sample-data")
+    calls = []
+
+    async def paid_call(name, signals, prompt):
+        calls.append(name)
+        return "from the model"
+
+    monkeypatch.setattr(explainer, "BACKEND", "openai")
+    monkeypatch.setattr(explainer, "_openai_explain", paid_call)
+    monkeypatch.setattr(main, "RESULT_CACHE_TTL", 0)
+    main._synthetic_recommendation()
+    assert calls == []
+
+
+def test_ready_after_warmup():
+    assert client.get("/health").json() == {"status": "ok"}
+    with TestClient(app) as started:  # runs startup, which kicks off warm-up
+        deadline = time.time() + 10
+        while not warmup.is_ready() and time.time() < deadline:
+            time.sleep(0.05)
+        r = started.get("/ready")
+        assert r.status_code == 200
+        assert "synthetic_recommendation" in r.json()["steps"]
+
+
+def test_recommendations_exclude_seen():
+    client.post("/load-sample-data")
+    ids = lambda body: {p["id"] for p in client.post("/recommendations", json=body).json()}
+    alice = {"user_id": 1, "k": 6}
+    assert 3 not in ids(alice)  # Yoga Mat was purchased
+    assert 3 in ids({**alice, "exclude_purchased": False})
+    assert 1 not in ids({**alice, "exclude_viewed": True})
+
+    client.post("/interactions", json={"user_id": 1, "product_id": 4, "event": "purchase"})
+    assert 4 not in ids(alice)
+
+
+def test_catalog_refreshes_on_load():
+    from app.recs import catalog
+    client.post("/load-sample-data")
+    r = client.post("/recommendations", json={"user_behavior": {"tags": ["yoga"]}, "k": 1, "exclude_purchased": False})
+    assert r.json()[0]["tags"] == ["yoga", "fitness", "mat"]
+    before = client.get("/data-info").json()["sample_products"]
+
+    r = client.post("/load-data-source", params={"source": "sample"})
+    assert r.json()["status"] == "loaded"
+    assert client.get("/data-info").json()["sample_products"] == before
+    assert all(c.version >= 1 for c in catalog._catalogs.values())
+
+
+def test_failed_sample_reload_keeps_dataset(monkeypatch):
+    from app.db.models import UserTagScore
+    client.post("/load-sample-data")
+    before = client.get("/data-info").json()
+    with Session(engine) as s:
+        profiles = len(s.exec(select(UserTagScore)).all())
+    assert profiles
+
+    def boom(*args, **kwargs):
+        raise RuntimeError("profiles failed")
+
+    monkeypatch.setattr(main, "rebuild_profiles", boom)
+    r = client.post("/load-data-source", params={"source": "sample"})
+    assert r.json() == {"status": "error", "message": "profiles failed"}
+    monkeypatch.undo()
+    assert client.get("/data-info").json() == before
+    with Session(engine) as s:
+        assert len(s.exec(select(UserTagScore)).all()) == profiles
@@ -0,0 +1,63 @@
+import asyncio
+import time
+
+import pytest
+
+from app import cache as cache_mod
+from app.cache import LocalCache, RedisCache
+from app.llm import explainer
+
+
+@pytest.mark.parametrize("backend", ["local", "redis"])
+def test_batch_and_versioned_invalidation(backend, monkeypatch):
+    monkeypatch.setattr(cache_mod, "VERSION_CHECK_SECONDS", 0)
+    if backend == "local":
+        c = LocalCache(max_entries=100)
+    else:
+        fakeredis = pytest.importorskip("fakeredis")
+        c = RedisCache(client=fakeredis.FakeRedis(decode_responses=True))
+
+    keys = [c.key("explain", name) for name in ("a", "b", "c")]
+    c.set_many({keys[0]: "A", keys[2]: "C"}, ttl=60)
+    assert c.get_many(keys) == ["A", None, "C"]
+
+    user_key = c.key("recs", c.user_version(7))
+    c.bump_user(7)
+    assert c.key("recs", c.user_version(7)) != user_key
+
+    c.bump_version()
+    assert c.get_many([c.key("explain", name) for name in ("a", "b", "c")]) == [None, None, None]
+
+
+def test_user_versions_expire():
+    c = LocalCache(max_entries=100)
+    c.bump_user(7, ttl=0.01)
+    assert c.user_version(7) > 0
+    time.sleep(0.02)
+    assert c.user_version(7) == 0
+
+    c.bump_user(8)
+    c.bump_version()
+    assert not c._data and list(c._counters) == [f"{cache_mod.PREFIX}:version"]
+
+    fakeredis = pytest.importorskip("fakeredis")
+    r = RedisCache(client=fakeredis.FakeRedis(decode_responses=True))
+    r.bump_user(7)
+    assert 0 < r.client.ttl(f"{cache_mod.PREFIX}:v0:user:7") <= cache_mod.USER_VERSION_TTL
+
+
+def test_explain_many_caches_llm_output(monkeypatch):
+    calls = []
+
+    async def fake_hf(name, signals, prompt):
+        calls.append(name)
+        return f"{name} via model"
+
+    monkeypatch.setattr(explainer, "BACKEND", "hf")
+    monkeypatch.setattr(explainer, "_hf_explain", fake_hf)
+    monkeypatch.setattr(cache_mod, "_CACHE", LocalCache())
+    items = [("Yoga Mat", "aligned with interests: yoga"), ("Dumbbells", "aligned with interests: strength")]
+
+    assert asyncio.run(explainer.explain_many(items)) == ["Yoga Mat via model", "Dumbbells via model"]
+    assert asyncio.run(explainer.explain_many(items)) == ["Yoga Mat via model", "Dumbbells via model"]
+    assert calls == ["Yoga Mat", "Dumbbells"]
@@ -0,0 +1,56 @@
+from datetime import datetime, timedelta
+
+import pytest
+from sqlmodel import SQLModel, Session, create_engine, select
+
+from app.db.compaction import compact_interactions
+from app.db.models import Interaction, InteractionAggregate, Product, User, UserTagScore
+from app.db.stats import refresh_stats
+from app.recs import profiles, seen
+
+
+@pytest.fixture
+def session():
+    engine = create_engine("sqlite://")
+    SQLModel.metadata.create_all(engine)
+    with Session(engine) as session:
+        session.add_all([Product(id=1, name="Trail Shoes", tags="running,trail"), Product(id=2, name="Yoga Mat", tags="yoga")])
+        session.add_all([User(id=1, name="Alice"), User(id=2, name="Bob")])
+        base = datetime(2025, 1, 1)
+        events = [(1, 1, "view", 0), (1, 1, "view", 3), (1, 2, "purchase", 5), (1, 1, "view", 1),
+                  (2, 2, "view", 2), (1, 2, "view", 40), (2, 1, "purchase", 41)]
+        session.add_all(Interaction(user_id=u, product_id=p, event=e, timestamp=base + timedelta(days=d)) for u, p, e, d in events)
+        session.commit()
+        yield session
+
+
+def _stored_profiles(session):
+    return {(r.user_id, r.tag): r.score for r in session.exec(select(UserTagScore))}
+
+
+def test_compaction_preserves_profiles_stats_and_archives(session, tmp_path):
+    pyarrow_parquet = pytest.importorskip("pyarrow.parquet")
+    before_profile = profiles.profile_from_history(session, 1)
+    profiles.rebuild_profiles(session)
+    before_stored = _stored_profiles(session)
+    before_stats = refresh_stats(session).interactions
+    before_seen = list(seen.seen_set(session, 1).exclusion(True, True))
+
+    result = compact_interactions(session, datetime(2025, 2, 1), str(tmp_path), batch_size=3)
+    assert result["compacted"] == 5 and result["batches"] == 2
+    assert len(session.exec(select(Interaction)).all()) == 2
+    agg = session.get(InteractionAggregate, (1, 1, "view"))
+    assert agg.count == 3 and agg.last_timestamp == datetime(2025, 1, 4)
+    archived = sum(pyarrow_parquet.read_table(p).num_rows for p in tmp_path.glob("*.parquet"))
+    assert archived == 5
+
+    after_profile = profiles.profile_from_history(session, 1)
+    assert after_profile.keys() == before_profile.keys()
+    assert all(after_profile[t] == pytest.approx(before_profile[t]) for t in before_profile)
+    profiles.rebuild_profiles(session)
+    after_stored = _stored_profiles(session)
+    assert after_stored.keys() == before_stored.keys()
+    assert all(after_stored[k] == pytest.approx(before_stored[k]) for k in before_stored)
+    assert refresh_stats(session).interactions == before_stats
+    seen.clear()  # reload from the compacted tables
+    assert list(seen.seen_set(session, 1).exclusion(True, True)) == before_seen
@@ -0,0 +1,30 @@
+import random
+
+from app.recs.diversity import diversified_top_k, top_k
+
+
+def _candidates(n, seed=0):
+    rng = random.Random(seed)
+    return [(float(rng.randint(0, 20)), i, [f"t{rng.randint(0, 5)}", f"u{rng.randint(0, 3)}"]) for i in range(n)]
+
+
+def test_top_k_matches_stable_sort():
+    cands = _candidates(500)
+    assert top_k(cands, 10) == sorted(cands, key=lambda c: c[0], reverse=True)[:10]
+
+
+def test_caps_spread_tags_and_backfill():
+    shoes = [(10.0 - i, f"shoe{i}", ["running", "shoes"]) for i in range(5)]
+    other = [(1.0, "mat", ["yoga"]), (0.5, "bottle", ["hydration"])]
+    picked = diversified_top_k(shoes + other, 4, max_per_tag=2)
+    assert [c[1] for c in picked] == ["shoe0", "shoe1", "mat", "bottle"]
+
+    # caps that cannot be met still return k results, best skipped first
+    picked = diversified_top_k(shoes, 3, max_per_tag=1)
+    assert [c[1] for c in picked] == ["shoe0", "shoe1", "shoe2"]
+    assert diversified_top_k(shoes, 0, max_per_tag=1) == top_k(shoes, 0) == []
+
+
+def test_loose_caps_equal_plain_top_k():
+    cands = _candidates(300, seed=3)
+    assert diversified_top_k(cands, 8, max_per_tag=1000) == top_k(cands, 8)
@@ -0,0 +1,29 @@
+import tempfile
+
+import pytest
+
+from benchmarks.fixtures import make_dataset, write_csvs
+from scripts.evaluate import evaluate, precision_recall_ndcg
+
+
+def test_metrics_on_known_ranking():
+    p, r, ndcg = precision_recall_ndcg([5, 1, 7], {1, 9}, k=3)
+    assert p == pytest.approx(1 / 3) and r == 0.5
+    assert ndcg == pytest.approx((1 / 1.5849625) / (1 + 1 / 1.5849625), rel=1e-6)
+
+
+def test_evaluate_small_dataset(tmp_path):
+    write_csvs(str(tmp_path / "data"), make_dataset(60, 15, 300, seed=7))
+    report = evaluate(str(tmp_path / "data"), k=5, workers=0, workdir=str(tmp_path))
+    assert report["meta"]["users_evaluated"] > 0
+    assert all(0.0 <= v <= 1.0 for v in report["quality"].values())
+    assert report["throughput"]["qps"] > 0
+
+
+def test_scratch_workdir_is_removed(tmp_path, monkeypatch):
+    write_csvs(str(tmp_path / "data"), make_dataset(30, 8, 120, seed=2))
+    scratch_root = tmp_path / "tmp"
+    scratch_root.mkdir()
+    monkeypatch.setattr(tempfile, "tempdir", str(scratch_root))
+    evaluate(str(tmp_path / "data"), k=3, workers=0)
+    assert list(scratch_root.iterdir()) == []
@@ -0,0 +1,24 @@
+from app.llm.explainer import _deterministic_explain
+from app.llm.signals import RecentItem, UserSignalContext, behavior_signals
+
+
+def test_structured_signals_match_string_path():
+    context = UserSignalContext([
+        RecentItem(name="Trail Running Shoes", event="purchase", tags=["running", "trail", "shoes"]),
+        RecentItem(name="Yoga Mat", event="view", tags=["yoga", "mat"]),
+    ])
+    signals = context.for_product(["running", "shoes"], popularity=9)
+    assert [o.recent_name for o in signals.overlaps] == ["Trail Running Shoes"]
+    assert signals.overlaps[0].common_tags == ["running", "shoes"]
+
+    structured = _deterministic_explain("Road Running Shoes", signals)
+    parsed = _deterministic_explain("Road Running Shoes", signals.to_text())
+    assert structured == parsed
+    assert "shares tags running, shoes with Trail Running Shoes (purchase)" in structured
+
+
+def test_behavior_signals():
+    signals = behavior_signals("aligned with interests: yoga", popularity=7)
+    out = _deterministic_explain("Yoga Mat", signals)
+    assert out == _deterministic_explain("Yoga Mat", signals.to_text())
+    assert out.endswith("It also has popularity score 7.")
@@ -0,0 +1,89 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.main import app
+from scripts import fetch_real_products as fetch
+
+TOTAL = 70
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    """DummyJSON-shaped /products pages with ETags; the first request for skip=30 fails."""
+
+    def do_GET(self):
+        query = parse_qs(urlparse(self.path).query)
+        limit, skip = int(query["limit"][0]), int(query["skip"][0])
+        server = self.server
+        with server.lock:
+            server.requests.append(self.path)
+            fail = skip == 30 and not server.failed
+            server.failed = server.failed or fail
+        if fail:
+            self.send_response(503)
+            self.end_headers()
+            return
+        etag = f'"page-{skip}"'
+        if self.headers.get("If-None-Match") == etag:
+            server.not_modified += 1
+            self.send_response(304)
+            self.end_headers()
+            return
+        products = [
+            {"id": i, "title": f"Item {i}", "description": "stub", "price": 1.5, "category": "stub", "brand": "acme", "rating": 4.5}
+            for i in range(skip + 1, min(skip + limit, TOTAL) + 1)
+        ]
+        body = json.dumps({"products": products, "total": TOTAL, "skip": skip, "limit": limit}).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("ETag", etag)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def stub(monkeypatch, tmp_path):
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubHandler)
+    server.lock, server.requests, server.failed, server.not_modified = threading.Lock(), [], False, 0
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    monkeypatch.setattr(fetch, "DUMMYJSON_URL", f"http://127.0.0.1:{server.server_address[1]}")
+    monkeypatch.setattr(fetch, "FETCH_CACHE_DIR", str(tmp_path / "http-cache"))
+    monkeypatch.setattr(fetch, "FETCH_BACKOFF", 0.01)
+    yield server
+    server.shutdown()
+
+
+def test_paginated_fetch_retries_and_revalidates(stub):
+    products = fetch.fetch_dummyjson_products()
+    assert [p["id"] for p in products] == list(range(1, TOTAL + 1))
+    assert products[0]["tags"] == "stub,acme" and products[0]["popularity"] == 90
+    assert len(stub.requests) == 4  # 3 pages + one retry
+
+    assert fetch.fetch_dummyjson_products() == products
+    assert stub.not_modified == 3
+
+
+def test_api_load_runs_as_job(stub):
+    client = TestClient(app)
+    r = client.post("/load-data-source", params={"source": "api"})
+    assert r.status_code == 202 and r.json()["status"] == "accepted"
+    status_url = r.json()["status_url"]
+    deadline = time.monotonic() + 30
+    while (job := client.get(status_url).json())["status"] not in ("succeeded", "failed"):
+        assert time.monotonic() < deadline
+        time.sleep(0.05)
+    assert job["status"] == "succeeded", job["error"]
+    assert job["result"]["import_result"]["products"] == TOTAL
+    assert client.get("/data-info").json()["stats"]["products"] == TOTAL
+    assert client.get("/jobs").json()[0]["id"] == job["id"]
+    assert client.get("/jobs/nope").status_code == 404
+
+    client.post("/load-data-source", params={"source": "sample"})  # leave the shared DB as other tests expect
@@ -0,0 +1,55 @@
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from app.llm import explainer, hf_worker
+
+
+@pytest.fixture
+def pool(monkeypatch):
+    release = threading.Event()
+
+    def fake_generate(prompt, kwargs):
+        release.wait(5)
+        return f"model says: {prompt[:10]}"
+
+    monkeypatch.setattr(hf_worker, "_generate", fake_generate)
+    pool = hf_worker.HFWorkerPool(workers=1, queue_size=1)
+    pool._executor.shutdown()  # no process was spawned yet; run "workers" as threads
+    pool._executor = ThreadPoolExecutor(max_workers=1)
+    pool.release = release
+    yield pool
+    release.set()
+    pool.shutdown()
+
+
+def test_generate_rejects_beyond_queue_size(pool):
+    async def run():
+        first = asyncio.ensure_future(pool.generate("Explain Yoga Mat"))
+        await asyncio.sleep(0.05)
+        with pytest.raises(hf_worker.QueueFull):
+            await pool.generate("Explain Dumbbells")
+        pool.release.set()
+        return await first
+
+    assert asyncio.run(run()) == "model says: Explain Yo"
+    assert pool._pending == 0
+
+
+def test_process_mode_falls_back_when_queue_is_full(pool, monkeypatch):
+    monkeypatch.setattr(hf_worker, "WORKER_MODE", "process")
+    monkeypatch.setattr(hf_worker, "_POOL", pool)
+    signals = "aligned with interests: yoga"
+
+    async def run():
+        busy = asyncio.ensure_future(explainer._hf_explain("Yoga Mat", signals, "Explain Yoga Mat"))
+        await asyncio.sleep(0.05)
+        fallback = await explainer._hf_explain("Dumbbells", signals, "Explain Dumbbells")
+        pool.release.set()
+        return await busy, fallback
+
+    served, fallback = asyncio.run(run())
+    assert served.startswith("model says:")
+    assert fallback == explainer._deterministic_explain("Dumbbells", signals)
@@ -0,0 +1,26 @@
+import os
+import re
+import subprocess
+import sys
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+BUDGET_MS = float(os.getenv("IMPORT_TIME_BUDGET_MS", "3000"))
+HEAVY = ("openai", "transformers", "torch", "pandas", "requests", "multiprocessing")
+
+
+def _run(code: str) -> subprocess.CompletedProcess:
+    env = dict(os.environ, PYTHONPATH=ROOT, LLM_BACKEND="auto", OPENAI_API_KEY="")
+    return subprocess.run([sys.executable, "-X", "importtime", "-c", code], cwd=ROOT, env=env, capture_output=True, text=True, check=True)
+
+
+def test_app_import_stays_within_budget():
+    proc = _run("import app.main")
+    match = re.search(r"import time:\s+\d+ \|\s+(\d+) \| app\.main$", proc.stderr, re.MULTILINE)
+    assert match, proc.stderr[-2000:]
+    cumulative_ms = int(match.group(1)) / 1000.0
+    assert cumulative_ms < BUDGET_MS, f"import app.main took {cumulative_ms:.0f}ms (budget {BUDGET_MS:.0f}ms)"
+
+
+def test_optional_backends_are_not_imported():
+    proc = _run(f"import sys, app.main; print([m for m in {HEAVY!r} if m in sys.modules])")
+    assert proc.stdout.strip() == "[]"
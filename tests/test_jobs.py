@@ -0,0 +1,65 @@
+import json
+import threading
+import time
+
+from fastapi.testclient import TestClient
+from sqlmodel import Session, func, select
+
+from app import jobs, main
+from app.db.database import engine
+from app.db.models import Job, Product
+from benchmarks.fixtures import make_dataset, write_csvs
+
+client = TestClient(main.app)
+
+
+def _wait(job_id, timeout=30):
+    deadline = time.monotonic() + timeout
+    while (job := client.get(f"/jobs/{job_id}").json())["status"] not in jobs.TERMINAL:
+        assert time.monotonic() < deadline
+        time.sleep(0.02)
+    return job
+
+
+def test_csv_import_job_streams_progress_and_persists(tmp_path):
+    write_csvs(str(tmp_path), make_dataset(30, 12, 2500, seed=5))
+    job = jobs.get_runner().submit("import:csv", main._import_csv_job, str(tmp_path))
+
+    with client.stream("GET", f"/jobs/{job['id']}/events") as r:
+        events = [json.loads(line[len("data: "):]) for line in r.iter_lines() if line.startswith("data: ")]
+    assert events[-1]["status"] == "succeeded"
+    assert events[-1]["result"] == {"status": "imported", "products": 30, "users": 12, "interactions": 2500}
+
+    with Session(engine) as session:
+        row = session.get(Job, job["id"])
+        assert row.status == "succeeded" and row.finished_at is not None and row.stage == "swapping"
+    assert client.get("/data-info").json()["stats"]["interactions"] == 2500
+    assert client.get("/jobs").json()[0]["id"] == job["id"]
+
+
+def test_cancelled_load_leaves_previous_dataset(tmp_path):
+    client.post("/load-data-source", params={"source": "sample"})
+    inside = threading.Event()
+
+    def half_load(job):
+        def fill():
+            session.add(Product(name="Half Loaded"))
+            session.flush()
+            inside.set()
+            while True:
+                job.check_cancelled()
+                time.sleep(0.01)
+
+        with Session(engine) as session:
+            return main._swap_dataset(session, "csv", fill, job)
+
+    job = jobs.get_runner().submit("load:test", half_load)
+    assert inside.wait(10)
+    with Session(engine) as reader:
+        # mid-swap, readers still see the whole previous catalog
+        assert reader.exec(select(func.count(Product.id))).one() == 6
+    r = client.post(f"/jobs/{job['id']}/cancel")
+    assert r.status_code == 200 and r.json()["cancel_requested"]
+    assert _wait(job["id"])["status"] == "cancelled"
+    assert client.get("/data-info").json()["stats"]["products"] == 6
+    assert client.post("/jobs/nope/cancel").status_code == 404
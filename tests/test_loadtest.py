@@ -0,0 +1,73 @@
+import asyncio
+import random
+
+import httpx
+import pytest
+from fastapi.testclient import TestClient
+
+from app import main, metrics
+from app.llm import explainer
+from app.main import app
+from benchmarks.llm_stub import make_app, parse_latency
+from benchmarks.loadtest import run_level
+
+
+def test_latency_specs():
+    rng = random.Random(1)
+    assert parse_latency("fixed:0.25")(rng) == 0.25
+    assert all(0.1 <= parse_latency("uniform:0.1,0.2")(rng) <= 0.2 for _ in range(50))
+    assert all(parse_latency("normal:0.01,1")(rng) >= 0 for _ in range(50))
+    samples = sorted(parse_latency("lognormal:0.5,0.4")(rng) for _ in range(2001))
+    assert samples[1000] == pytest.approx(0.5, rel=0.1)
+    with pytest.raises(ValueError):
+        parse_latency("pareto:1")
+
+
+def test_stub_speaks_openai_chat_completions():
+    stub = TestClient(make_app("fixed:0"))
+    body = {"model": "gpt-4o-mini", "messages": [{"role": "user", "content": "Explain Yoga Mat"}]}
+    r = stub.post("/v1/chat/completions", json=body)
+    assert r.status_code == 200
+    data = r.json()
+    assert data["choices"][0]["message"]["role"] == "assistant" and "stub" in data["choices"][0]["message"]["content"]
+    assert data["usage"]["total_tokens"] > 0
+    assert TestClient(make_app("fixed:0", error_rate=1.0)).post("/v1/chat/completions", json=body).status_code == 500
+
+
+def _drive():
+    async def drive():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://app") as client:
+            return await run_level(client, concurrency=2, duration=0.5, behavior_ratio=0.5, n_users=2, n_products=6)
+
+    return asyncio.run(drive())
+
+
+def test_run_level_reports_mixed_traffic():
+    TestClient(app).post("/load-sample-data")
+    results = _drive()
+    assert results["loadtest.c2.n"] > 0 and results["loadtest.c2.error_rate"] == 0.0
+    assert results["loadtest.c2.requests_per_sec"] > 0
+    assert results["loadtest.c2.p50_ms"] <= results["loadtest.c2.p99_ms"]
+    assert {"loadtest.c2.user.n", "loadtest.c2.behavior.n"} <= results.keys()
+    assert "loadtest.c2.llm_fallback_rate" not in results  # the app records no metrics
+
+
+def test_run_level_counts_llm_fallbacks(monkeypatch):
+    TestClient(app).post("/load-sample-data")
+
+    def unreachable():
+        raise ConnectionError("LLM down")
+
+    monkeypatch.setattr(metrics, "ENABLED", True)
+    monkeypatch.setattr(explainer, "BACKEND", "openai")
+    monkeypatch.setattr(explainer, "_openai_client", unreachable)
+    monkeypatch.setattr(explainer, "EXPLANATION_CACHE_TTL", 0)
+    monkeypatch.setattr(main, "RESULT_CACHE_TTL", 0)
+    try:
+        results = _drive()
+    finally:
+        metrics.reset()
+    # every request still succeeds, but every explanation fell back
+    assert results["loadtest.c2.error_rate"] == 0.0
+    assert results["loadtest.c2.llm_fallbacks"] > 0 and results["loadtest.c2.llm_fallback_rate"] == 1.0
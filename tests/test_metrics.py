@@ -0,0 +1,24 @@
+from app import metrics
+
+
+def test_span_and_render(monkeypatch):
+    monkeypatch.setattr(metrics, "ENABLED", True)
+    metrics.reset()
+    with metrics.span("engine.sort"):
+        pass
+    metrics.cache_hit("hf_pipeline")
+    metrics.cache_miss("hf_pipeline")
+
+    text = metrics.render()
+    assert 'recs_stage_duration_seconds_count{stage="engine.sort"} 1' in text
+    assert 'recs_stage_duration_seconds_bucket{stage="engine.sort",le="+Inf"} 1' in text
+    assert 'recs_cache_requests_total{cache="hf_pipeline",result="hit"} 1' in text
+    metrics.reset()
+
+
+def test_disabled_span_is_noop(monkeypatch):
+    monkeypatch.setattr(metrics, "ENABLED", False)
+    metrics.reset()
+    with metrics.span("engine.sort"):
+        pass
+    assert "engine.sort" not in metrics.render()
@@ -0,0 +1,74 @@
+from datetime import datetime, timedelta
+
+import pytest
+from sqlmodel import SQLModel, Session, create_engine
+
+from app.db.models import Product, User, Interaction
+from app.recs import profiles
+
+
+@pytest.fixture
+def session(monkeypatch):
+    monkeypatch.setattr(profiles, "HALF_LIFE_DAYS", 10.0)
+    engine = create_engine("sqlite://")
+    SQLModel.metadata.create_all(engine)
+    with Session(engine) as session:
+        session.add(Product(id=1, name="Trail Shoes", tags="running,trail"))
+        session.add(Product(id=2, name="Yoga Mat", tags="yoga"))
+        session.add(User(id=1, name="Alice"))
+        session.commit()
+        yield session
+
+
+def _events(session, events):
+    for pid, event, ts in events:
+        session.add(Interaction(user_id=1, product_id=pid, event=event, timestamp=ts))
+        tags = profiles.parse_tags(session.get(Product, pid).tags)
+        profiles.apply_event(session, 1, tags, event, ts)
+    session.commit()
+
+
+def test_incremental_profile_matches_history(session):
+    t0 = datetime(2025, 1, 1)
+    _events(session, [
+        (2, "purchase", t0),
+        (1, "view", t0 + timedelta(days=10)),
+        (1, "add_to_cart", t0 + timedelta(days=20)),
+    ])
+    stored = profiles.load_profile(session, 1)
+    scanned = profiles.profile_from_history(session, 1)
+    assert stored.keys() == scanned.keys()
+    for tag in stored:
+        assert stored[tag] == pytest.approx(scanned[tag])
+    # a purchase 20 days (two half-lives) before the latest event keeps a quarter of its weight
+    assert stored["yoga"] == pytest.approx(5 / 4)
+    assert stored["running"] == pytest.approx(3 + 1 / 2)
+
+
+def test_max_history_bounds_contribution(session):
+    t0 = datetime(2025, 1, 1)
+    _events(session, [(2, "purchase", t0)] + [(1, "view", t0 + timedelta(hours=i + 1)) for i in range(5)])
+    recent_only = profiles.profile_from_history(session, 1, max_history=5)
+    assert "yoga" not in recent_only
+
+    assert profiles.rebuild_profiles(session, max_history=5) == 1
+    assert "yoga" not in profiles.load_profile(session, 1)
+
+
+def test_first_event_seeds_missing_profile_from_history(session):
+    t0 = datetime(2025, 1, 1)
+    session.add_all(Interaction(user_id=1, product_id=1, event="purchase", timestamp=t0 + timedelta(hours=i)) for i in range(4))
+    session.commit()
+    assert profiles.load_profile(session, 1) is None
+
+    _events(session, [(2, "view", t0 + timedelta(days=1))])
+    stored = profiles.load_profile(session, 1)
+    assert stored == pytest.approx(profiles.profile_from_history(session, 1))
+    assert stored["running"] > stored["yoga"] > 0
+
+
+def test_explicit_max_history_bypasses_stored_profile(session):
+    t0 = datetime(2025, 1, 1)
+    _events(session, [(2, "purchase", t0), (1, "view", t0 + timedelta(hours=1))])
+    assert "yoga" in profiles.user_profile(session, 1)
+    assert profiles.user_profile(session, 1, max_history=1) == pytest.approx({"running": 1.0, "trail": 1.0})
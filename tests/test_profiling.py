@@ -0,0 +1,42 @@
+import os
+import pstats
+
+from fastapi.testclient import TestClient
+
+from app import main, profiling
+from app.main import app
+
+
+def test_profiled_request_is_dumped_and_listed(tmp_path, monkeypatch):
+    monkeypatch.setattr(profiling, "ENABLED", True)
+    monkeypatch.setattr(profiling, "PROFILE_DIR", str(tmp_path))
+    monkeypatch.setattr(main, "RESULT_CACHE_TTL", 0)  # the profiled request must reach the engine
+    client = TestClient(profiling.ProfilingMiddleware(app))
+    client.post("/load-sample-data")
+
+    assert client.post("/recommendations", json={"user_id": 1, "k": 3}).status_code == 200
+    assert client.get("/debug/profiles").json()["profiles"] == []
+    assert client.post("/recommendations", json={"user_id": 1, "k": 3}, headers={"X-Profile": "1"}).status_code == 200
+
+    listing = client.get("/debug/profiles").json()
+    assert listing["enabled"] is True
+    [entry] = listing["profiles"]
+    assert entry["name"].endswith(".prof") and "recommendations" in entry["name"]
+    # engine work runs inline while profiling, so it shows up in the dump
+    functions = {func for _, _, func in pstats.Stats(str(tmp_path / entry["name"])).stats}
+    assert {"score_for_user", "_rank"} <= functions
+
+    download = client.get(f"/debug/profiles/{entry['name']}")
+    assert download.status_code == 200 and download.content == (tmp_path / entry["name"]).read_bytes()
+
+
+def test_profile_path_rejects_traversal(tmp_path, monkeypatch):
+    monkeypatch.setattr(profiling, "PROFILE_DIR", str(tmp_path / "profiles"))
+    os.makedirs(profiling.PROFILE_DIR)
+    (tmp_path / "profiles" / "ok.prof").write_bytes(b"")
+    (tmp_path / "secret.prof").write_bytes(b"")
+
+    assert profiling.profile_path("ok.prof") == os.path.join(profiling.PROFILE_DIR, "ok.prof")
+    for name in ("../secret.prof", "..", "/etc/passwd", "sub/ok.prof", "ok.txt", "missing.prof"):
+        assert profiling.profile_path(name) is None
+    assert TestClient(app).get("/debug/profiles/..%2Fsecret.prof").status_code == 404
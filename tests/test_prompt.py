@@ -0,0 +1,56 @@
+import asyncio
+
+from app import cache as cache_mod
+from app.cache import LocalCache
+from app.llm import explainer, hf_worker, prompt
+from app.llm.prompt import PROMPT_TEMPLATE, TOKEN_BUDGET, build_prompt, estimate_tokens
+from app.metrics import PROMPT_TOKENS
+from app.llm.signals import RecentItem, UserSignalContext, behavior_signals
+
+
+def _signals():
+    recent = [RecentItem(name=f"Item {i}", event="view", tags=["running", "shoes", f"t{i}"]) for i in range(10)]
+    recent.insert(3, RecentItem(name="Trail Shoes", event="purchase", tags=["running", "shoes", "trail"]))
+    return UserSignalContext(recent).for_product(["running", "shoes", "trail"], popularity=9)
+
+
+def test_unbounded_prompt_embeds_all_signals():
+    signals = _signals()
+    assert build_prompt("Road Shoes", signals, budget=0) == PROMPT_TEMPLATE.format(name="Road Shoes", signals=signals.to_text())
+
+
+def test_budget_keeps_heaviest_signals():
+    signals = _signals()
+    full = build_prompt("Road Shoes", signals, budget=0)
+    trimmed = build_prompt("Road Shoes", signals, budget=120)
+    assert estimate_tokens(trimmed) <= 120 < estimate_tokens(full)
+    # the purchase with three shared tags outranks the viewed items
+    assert "shared tags running, shoes, trail with Trail Shoes (purchase)" in trimmed
+    assert "Item 9 (view)" not in trimmed
+
+
+def test_prompt_tokens_count_only_sent_prompts(monkeypatch):
+    monkeypatch.setattr(prompt, "METRICS_ENABLED", True)
+    monkeypatch.setattr(explainer, "BACKEND", "hf")
+    monkeypatch.setattr(hf_worker, "WORKER_MODE", "thread")
+    monkeypatch.setattr(explainer, "_HF_PIPELINE", lambda text, **kwargs: [{"generated_text": "Because you run."}])
+    monkeypatch.setattr(cache_mod, "_CACHE", LocalCache())
+    PROMPT_TOKENS.reset()
+    items = [("Road Shoes", _signals())]
+
+    assert asyncio.run(explainer.explain_many(items)) == ["Because you run."]  # miss: one prompt sent
+    assert asyncio.run(explainer.explain_many(items)) == ["Because you run."]  # hit: nothing sent
+    assert PROMPT_TOKENS._series[()][-1] == 1
+    PROMPT_TOKENS.reset()
+
+
+def test_long_behavior_note_is_shortened_not_dropped():
+    names = ", ".join(f"Product number {i}" for i in range(25))
+    signals = behavior_signals(f"similar to items you interacted with: {names}; aligned with interests: yoga, running", 50)
+    assert build_prompt("Yoga Mat", signals, budget=0) == PROMPT_TEMPLATE.format(name="Yoga Mat", signals=signals.to_text())
+
+    trimmed = build_prompt("Yoga Mat", signals)
+    assert estimate_tokens(trimmed) <= TOKEN_BUDGET
+    assert "similar to items you interacted with: Product number 0, Product number 1" in trimmed
+    assert "Product number 24" not in trimmed
+    assert "aligned with interests: yoga, running" in trimmed
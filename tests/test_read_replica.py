@@ -0,0 +1,39 @@
+import os
+import tempfile
+
+from fastapi.testclient import TestClient
+from sqlmodel import Session, SQLModel
+
+from app.db import database
+from app.db.models import Product, User
+from app.db.stats import refresh_stats
+from app.main import app
+
+
+def test_reads_go_to_replica_until_a_write():
+    path = os.path.join(tempfile.mkdtemp(prefix="recs-replica-"), "replica.db")
+    replica = database.build_engine(f"sqlite:///{path}")
+    SQLModel.metadata.create_all(replica)
+    with Session(replica) as session:
+        session.add(Product(name="Replica Only", tags="replica"))
+        session.add(User(name="Reader"))
+        session.commit()
+        refresh_stats(session, source="replica")
+
+    client = TestClient(app)
+    client.post("/load-sample-data")
+    database.read_engines[:] = [replica]
+    try:
+        assert client.get("/data-info").json()["source"] == "replica"
+
+        r = client.post("/interactions", json={"user_id": 1, "product_id": 1})
+        assert r.status_code == 201
+        assert database.STICKY_COOKIE in r.cookies
+        # read-your-writes: this client now reads from the primary
+        assert client.get("/data-info").json()["source"] != "replica"
+
+        client.cookies.clear()
+        assert client.get("/data-info").json()["source"] == "replica"
+    finally:
+        database.read_engines[:] = []
+        replica.dispose()
@@ -0,0 +1,52 @@
+import random
+
+import pytest
+from sqlmodel import Session
+
+from app.recs import engine, sharded
+from app.recs.catalog import get_catalog
+from app.recs.seen import SeenSet
+from benchmarks.fixtures import TAG_VOCAB, make_dataset, seed_engine, sqlite_engine
+
+
+def test_sharded_matches_single_process(tmp_path):
+    db_engine = sqlite_engine(str(tmp_path / "catalog.db"))
+    dataset = make_dataset(500, 5, 10)
+    for p in dataset["products"][::7]:
+        p["tags"] = p["tags"].upper()  # mixed case goes through parse_tags on both paths
+    seed_engine(db_engine, dataset)
+    rng = random.Random(3)
+
+    with Session(db_engine) as session:
+        scorer = sharded.ShardedScorer(get_catalog(session), shards=2)
+        try:
+            for _ in range(5):
+                liked = {t: rng.choice([1.0, 2.5, 3]) for t in rng.sample(TAG_VOCAB, 4)}
+                exclude = SeenSet(purchased=rng.sample(range(1, 501), 30)).exclusion()
+                expected = engine._rank(session, liked, 10, exclude=exclude)
+                got = engine._rank_sharded(session, scorer, liked, 10, exclude)
+                assert [(s.product.id, s.score, s.matched_tags) for s in got] == \
+                    [(s.product.id, s.score, s.matched_tags) for s in expected]
+        finally:
+            scorer.close()
+
+
+def test_replaced_scorer_outlives_calls_in_flight(tmp_path, monkeypatch):
+    monkeypatch.setattr(sharded, "SHARDS", 2)
+    monkeypatch.setattr(sharded, "MIN_PRODUCTS", 1)
+    db_engine = sqlite_engine(str(tmp_path / "catalog.db"))
+    seed_engine(db_engine, make_dataset(50, 2, 4))
+
+    with Session(db_engine) as session:
+        try:
+            with sharded.acquire(session) as scorer:
+                with sharded.acquire(session) as again:
+                    assert again is scorer
+                sharded.reset()  # e.g. a load in another thread
+                assert len(scorer.top_k({TAG_VOCAB[0]: 1.0}, 3)) == 3
+            with pytest.raises(RuntimeError):
+                scorer.top_k({TAG_VOCAB[0]: 1.0}, 3)  # closed once released
+            with sharded.acquire(session) as fresh:
+                assert fresh is not scorer
+        finally:
+            sharded.reset()
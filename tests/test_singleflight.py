@@ -0,0 +1,61 @@
+import asyncio
+
+import pytest
+
+from app.llm import explainer
+from app.singleflight import SingleFlight
+
+
+def test_concurrent_identical_calls_share_one_run():
+    flight = SingleFlight("test")
+    runs = []
+
+    async def work(key):
+        runs.append(key)
+        await asyncio.sleep(0.01)
+        return key.upper()
+
+    async def main():
+        results = await asyncio.gather(*(flight.do(k, lambda k=k: work(k)) for k in ["a"] * 5 + ["b"] * 3))
+        assert flight.in_flight() == 0
+        return results
+
+    assert asyncio.run(main()) == ["A"] * 5 + ["B"] * 3
+    assert sorted(runs) == ["a", "b"]
+
+
+def test_errors_reach_every_caller_and_are_not_kept():
+    flight = SingleFlight("test")
+    calls = []
+
+    async def boom():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        raise ValueError("engine failed")
+
+    async def main():
+        results = await asyncio.gather(*(flight.do("k", boom) for _ in range(3)), return_exceptions=True)
+        assert all(isinstance(r, ValueError) for r in results)
+        with pytest.raises(ValueError):
+            await flight.do("k", boom)
+
+    asyncio.run(main())
+    assert len(calls) == 2
+
+
+def test_explain_coalesces_identical_prompts(monkeypatch):
+    calls = []
+
+    async def fake_hf(name, signals, prompt):
+        calls.append(name)
+        await asyncio.sleep(0.01)
+        return f"{name} via model"
+
+    monkeypatch.setattr(explainer, "BACKEND", "hf")
+    monkeypatch.setattr(explainer, "_hf_explain", fake_hf)
+
+    async def main():
+        return await asyncio.gather(*(explainer.explain("Yoga Mat", "aligned with interests: yoga") for _ in range(4)))
+
+    assert asyncio.run(main()) == ["Yoga Mat via model"] * 4
+    assert calls == ["Yoga Mat"]